@@ -9,6 +9,7 @@ from typing import Dict, List, Optional
 import requests
 
 from adapters.kis_auth import BASE_PROD, BASE_VTS, ensure_token
+from adapters.kis_rate_limit import KISRateLimiter, get_rate_limiter
 from core.entities import Position
 from ports.broker import IBroker, OrderResult
 
@@ -52,6 +53,7 @@ class BrokerKIS(IBroker):
         timeout: float = 10.0,
         risk_config=None,
         mode: str = "mock",
+        rate_limiter: KISRateLimiter | None = None,
     ) -> None:
         self.storage = storage
         self.provider = "kis"
@@ -59,7 +61,9 @@ class BrokerKIS(IBroker):
         self.paper = paper
         self.timeout = timeout
         self.mode = mode
+        self._owns_session = session is None
         self._session = session or requests.Session()
+        self._rate_limiter = rate_limiter or get_rate_limiter(paper)
         self._auth = self._load_keys()
         self.enabled = self._auth is not None
         self._bearer: str | None = None
@@ -71,6 +75,10 @@ class BrokerKIS(IBroker):
             (self._auth.account.get("accno") if self._auth else "")
         )
 
+    def close(self) -> None:
+        if self._owns_session:
+            self._session.close()
+
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
@@ -135,6 +143,7 @@ class BrokerKIS(IBroker):
         url = f"{self._base_url}{path}"
         headers = self._headers(tr_id)
         try:
+            self._rate_limiter.acquire(tr_id)
             response = self._session.request(
                 method,
                 url,
@@ -147,6 +156,7 @@ class BrokerKIS(IBroker):
                 if not self._ensure_token():
                     response.raise_for_status()
                 headers = self._headers(tr_id)
+                self._rate_limiter.acquire(tr_id)
                 response = self._session.request(
                     method,
                     url,
@@ -262,12 +272,18 @@ class BrokerKIS(IBroker):
         output = response.get("output", {})
         order_id = output.get("ODNO") or response.get("order_no")
         timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        # 체결 통보가 아니라 주문 접수 시점에 기록하므로 실현 손익 원장은 근사치다.
+        # 시장가 매도는 곧바로 체결된다고 보고 보유 종목 현재가(주문 직전 조회값)로 잡고,
+        # 체결 여부를 알 수 없는 지정가 주문은 거래만 남기고 일중 손익(daily_pnl)에는 넣지 않는다.
+        fill_price = price_val or (position.last_price if side_norm == "SELL" and position else 0.0)
         self.storage.record_trade(
             order_id or f"kis-{timestamp}",
+            avg_cost=position.avg_price if side_norm == "SELL" and position else None,
+            ledger=price_type == "market",
             symbol=symbol,
             side=side_norm,
             qty=qty,
-            price=price_val,
+            price=fill_price,
             ts=timestamp,
         )
         self.storage.log_event(
@@ -310,6 +326,7 @@ class BrokerKIS(IBroker):
         tr_id = BALANCE_TR_ID[self.paper]
         url = f"{self._base_url}{BALANCE_PATH}"
         try:
+            self._rate_limiter.acquire(tr_id)
             response = self._session.get(
                 url,
                 headers=self._headers(tr_id),
@@ -320,6 +337,7 @@ class BrokerKIS(IBroker):
                 logger.warning("KIS 포지션 조회 오류(%s) → 토큰 재발급", response.status_code)
                 if not self._ensure_token():
                     response.raise_for_status()
+                self._rate_limiter.acquire(tr_id)
                 response = self._session.get(
                     url,
                     headers=self._headers(tr_id),
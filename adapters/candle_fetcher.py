@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable
+
+from core.entities import Candle, CandleFrame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def _fetch_one(market, symbol: str, timeframe: str, limit: int, as_frame: bool):
+    try:
+        candles = market.get_candles(symbol, timeframe=timeframe, limit=limit)
+        if as_frame and isinstance(candles, CandleFrame):
+            return candles  # 링 버퍼 뷰를 복사 없이 그대로 사용
+        candles = list(candles)
+    except Exception as exc:  # pragma: no cover - defensive
+        logger.warning("캔들 조회 실패(%s): %s", symbol, exc)
+        candles = []
+    return CandleFrame.from_candles(candles, symbol) if as_frame else candles
+
+
+def fetch_candles(
+    market,
+    symbols: Iterable[str],
+    *,
+    timeframe: str = "D",
+    limit: int = 120,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    as_frames: bool = False,
+) -> Dict[str, list[Candle]] | Dict[str, CandleFrame]:
+    """Fetch candles for many symbols on a bounded thread pool.
+
+    The result keeps the order of ``symbols``. A failing symbol maps to an empty
+    series instead of aborting the whole scan. With ``as_frames`` each series is
+    converted to a ``CandleFrame`` inside the worker thread.
+    """
+
+    ordered = list(dict.fromkeys(symbols))
+    workers = min(max(int(max_workers or 1), 1), len(ordered))
+    if workers <= 1:
+        return {symbol: _fetch_one(market, symbol, timeframe, limit, as_frames) for symbol in ordered}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="v5-candles") as pool:
+        results = pool.map(lambda symbol: _fetch_one(market, symbol, timeframe, limit, as_frames), ordered)
+        return dict(zip(ordered, results))
+
+
+__all__ = ["DEFAULT_MAX_WORKERS", "fetch_candles"]
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# KIS는 계좌(앱키) 단위로 초당 호출 수를 제한한다. 모의투자(VTS)는 훨씬 엄격하다.
+DEFAULT_RATE_PROD = 18.0
+DEFAULT_RATE_VTS = 4.0
+
+
+@dataclass(slots=True)
+class _Bucket:
+    rate: float
+    capacity: float
+    tokens: float
+    updated: float
+
+    def refill(self, now: float) -> None:
+        elapsed = max(now - self.updated, 0.0)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take one token (possibly going into debt) and return the wait in seconds."""
+
+        self.tokens -= 1.0
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+@dataclass(slots=True)
+class _TRStats:
+    calls: int = 0
+    waited: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def record(self, wait: float) -> None:
+        self.calls += 1
+        if wait > 0:
+            self.waited += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "calls": self.calls,
+            "waited": self.waited,
+            "total_wait_sec": round(self.total_wait, 6),
+            "avg_wait_sec": round(self.total_wait / self.calls, 6) if self.calls else 0.0,
+            "max_wait_sec": round(self.max_wait, 6),
+        }
+
+
+class KISRateLimiter:
+    """Token-bucket scheduler that paces KIS REST calls instead of failing them.
+
+    Every call consumes one token from the global bucket and, when configured,
+    one from the bucket of its TR id. Tokens are reserved under a lock, so
+    concurrent callers are served in arrival order and simply sleep until their
+    slot comes up.
+    """
+
+    def __init__(
+        self,
+        rate_per_sec: float,
+        tr_limits: Mapping[str, float] | None = None,
+        *,
+        burst: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._global = self._new_bucket(rate_per_sec, burst)
+        self._tr_buckets: Dict[str, _Bucket] = {}
+        self._stats: Dict[str, _TRStats] = {}
+        self._queue_depth = 0
+        self._max_queue_depth = 0
+        self.configure(rate_per_sec, tr_limits, burst=burst)
+
+    def _new_bucket(self, rate: float, burst: float | None) -> _Bucket:
+        rate = max(float(rate), 1e-3)
+        capacity = max(float(burst) if burst else rate, 1.0)
+        return _Bucket(rate=rate, capacity=capacity, tokens=capacity, updated=self._clock())
+
+    def configure(
+        self,
+        rate_per_sec: float,
+        tr_limits: Mapping[str, float] | None = None,
+        *,
+        burst: float | None = None,
+    ) -> None:
+        with self._lock:
+            if rate_per_sec != self._global.rate:
+                self._global = self._new_bucket(rate_per_sec, burst)
+            tr_limits = dict(tr_limits or {})
+            # 설정에서 빠진 TR의 개별 한도는 더 이상 적용하지 않는다.
+            for tr_id in set(self._tr_buckets) - set(tr_limits):
+                del self._tr_buckets[tr_id]
+            for tr_id, rate in tr_limits.items():
+                current = self._tr_buckets.get(tr_id)
+                if current is None or current.rate != rate:
+                    self._tr_buckets[tr_id] = self._new_bucket(rate, None)
+
+    def acquire(self, tr_id: str) -> float:
+        """Block until ``tr_id`` may be sent and return the time spent waiting."""
+
+        with self._lock:
+            now = self._clock()
+            self._global.refill(now)
+            wait = self._global.reserve()
+            bucket = self._tr_buckets.get(tr_id)
+            if bucket is not None:
+                bucket.refill(now)
+                wait = max(wait, bucket.reserve())
+            self._stats.setdefault(tr_id, _TRStats()).record(wait)
+            if wait > 0:
+                self._queue_depth += 1
+                self._max_queue_depth = max(self._max_queue_depth, self._queue_depth)
+
+        if wait <= 0:
+            return 0.0
+        logger.debug("KIS 호출 대기 tr_id=%s wait=%.3fs", tr_id, wait)
+        try:
+            self._sleep(wait)
+        finally:
+            with self._lock:
+                self._queue_depth -= 1
+        return wait
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue_depth
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            by_tr = {tr_id: stats.as_dict() for tr_id, stats in self._stats.items()}
+            return {
+                "rate_per_sec": self._global.rate,
+                "tr_limits": {tr_id: bucket.rate for tr_id, bucket in self._tr_buckets.items()},
+                "queue_depth": self._queue_depth,
+                "max_queue_depth": self._max_queue_depth,
+                "calls": sum(stats["calls"] for stats in by_tr.values()),
+                "total_wait_sec": round(sum(stats["total_wait_sec"] for stats in by_tr.values()), 6),
+                "by_tr": by_tr,
+            }
+
+
+_SHARED: Dict[bool, KISRateLimiter] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def get_rate_limiter(
+    paper: bool,
+    *,
+    rate_per_sec: Optional[float] = None,
+    tr_limits: Mapping[str, float] | None = None,
+) -> KISRateLimiter:
+    """Return the process-wide limiter for the VTS (paper) or PROD host.
+
+    An existing limiter is reconfigured only when ``rate_per_sec`` or
+    ``tr_limits`` is passed; otherwise it is returned unchanged.
+    """
+
+    rate = rate_per_sec or (DEFAULT_RATE_VTS if paper else DEFAULT_RATE_PROD)
+    with _SHARED_LOCK:
+        limiter = _SHARED.get(bool(paper))
+        if limiter is None:
+            limiter = KISRateLimiter(rate, tr_limits)
+            _SHARED[bool(paper)] = limiter
+            return limiter
+    if rate_per_sec is not None or tr_limits is not None:
+        limiter.configure(rate, tr_limits)
+    return limiter
+
+
+def rate_limiter_from_settings(kis_settings) -> KISRateLimiter:
+    return get_rate_limiter(
+        bool(getattr(kis_settings, "paper", True)),
+        rate_per_sec=getattr(kis_settings, "rate_per_sec", None),
+        tr_limits=getattr(kis_settings, "tr_rate_limits", None),
+    )
+
+
+def rate_limit_stats() -> dict[str, dict[str, object]]:
+    with _SHARED_LOCK:
+        limiters = dict(_SHARED)
+    return {("vts" if paper else "prod"): limiter.stats() for paper, limiter in limiters.items()}
+
+
+__all__ = [
+    "DEFAULT_RATE_PROD",
+    "DEFAULT_RATE_VTS",
+    "KISRateLimiter",
+    "get_rate_limiter",
+    "rate_limit_stats",
+    "rate_limiter_from_settings",
+]
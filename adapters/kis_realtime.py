@@ -0,0 +1,232 @@
+"""KIS real-time trade stream (H0STCNT0) and a local stand-in server.
+
+KIS pushes real-time trades as text frames::
+
+    0|H0STCNT0|002|005930^093001^71000^...^<46 fields>^000660^093001^...
+
+(``0`` = plain text, then TR id, record count and ``^``-separated fields,
+``count`` records back to back). :func:`parse_kis_frame` turns such a frame
+into ``PriceTick`` events; JSON control messages (subscription replies,
+PINGPONG) and encrypted frames are ignored.
+
+``KISRealtimeStream`` reads newline-delimited frames from a TCP endpoint and
+``FakeKISRealtimeServer`` serves a random walk in the same format at a
+configurable event rate, so the monitor, scanner and push endpoints can be
+load-tested offline. The production endpoint is a WebSocket with an approval
+key; only the frame format is shared here.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+from datetime import date, datetime, time, timedelta, timezone
+from typing import AsyncIterator, Collection, Iterable, Mapping
+
+from core.entities import MarketEvent, PriceTick
+from ports.market_stream import IMarketStream
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "FakeKISRealtimeServer",
+    "KISRealtimeStream",
+    "TR_REALTIME_TRADE",
+    "format_kis_frame",
+    "parse_kis_frame",
+]
+
+TR_REALTIME_TRADE = "H0STCNT0"
+TRADE_FIELDS = 46  # H0STCNT0 레코드당 필드 수
+_PRICE, _VOLUME = 2, 12
+KST = timezone(timedelta(hours=9))
+
+
+def _code(symbol: str) -> str:
+    return symbol.split(".", 1)[0]
+
+
+def parse_kis_frame(
+    frame: str,
+    symbols_by_code: Mapping[str, str] | None = None,
+    day: date | None = None,
+) -> list[PriceTick]:
+    """Parse one H0STCNT0 frame; codes are mapped back to ``symbols_by_code`` (e.g. ``005930.KS``)."""
+
+    parts = frame.strip().split("|", 3)
+    if len(parts) != 4 or parts[0] != "0" or parts[1] != TR_REALTIME_TRADE:
+        return []
+    try:
+        count = max(int(parts[2]), 1)
+    except ValueError:
+        return []
+    fields = parts[3].split("^")
+    width = len(fields) // count
+    if width < _VOLUME + 1:
+        return []
+    day = day or datetime.now(KST).date()
+    ticks: list[PriceTick] = []
+    for offset in range(0, width * count, width):
+        record = fields[offset : offset + width]
+        try:
+            hhmmss = record[1].rjust(6, "0")
+            stamp = datetime.combine(
+                day, time(int(hhmmss[:2]), int(hhmmss[2:4]), int(hhmmss[4:6])), tzinfo=KST
+            )
+            price = float(record[_PRICE])
+            volume = float(record[_VOLUME] or 0)
+        except (ValueError, IndexError):
+            logger.debug("KIS 실시간 레코드 파싱 실패: %s", record[:3])
+            continue
+        code = record[0]
+        symbol = symbols_by_code.get(code, code) if symbols_by_code else code
+        ticks.append(PriceTick(symbol, price, stamp, volume))
+    return ticks
+
+
+def format_kis_frame(ticks: Iterable[PriceTick]) -> str:
+    """Encode ticks as one H0STCNT0 frame (fields the parser does not read are zero)."""
+
+    records = []
+    for tick in ticks:
+        record = ["0"] * TRADE_FIELDS
+        record[0] = _code(tick.symbol)
+        record[1] = tick.timestamp.astimezone(KST).strftime("%H%M%S")
+        record[_PRICE] = f"{tick.price:.0f}"
+        record[_VOLUME] = f"{tick.volume:.0f}"
+        records.append("^".join(record))
+    return f"0|{TR_REALTIME_TRADE}|{len(records):03d}|{'^'.join(records)}"
+
+
+def _subscribe_message(code: str, approval_key: str = "") -> str:
+    return json.dumps(
+        {
+            "header": {"approval_key": approval_key, "custtype": "P", "tr_type": "1", "content-type": "utf-8"},
+            "body": {"input": {"tr_id": TR_REALTIME_TRADE, "tr_key": code}},
+        }
+    )
+
+
+class KISRealtimeStream(IMarketStream):
+    """Real-time trades from a KIS-format line stream (e.g. ``FakeKISRealtimeServer``)."""
+
+    def __init__(self, host: str, port: int, symbols: Collection[str] = (), approval_key: str = "") -> None:
+        self.host = host
+        self.port = port
+        self.symbols = list(symbols)
+        self.approval_key = approval_key
+
+    async def events(self, symbols: Collection[str] | None = None) -> AsyncIterator[MarketEvent]:
+        wanted = list(symbols) if symbols is not None else self.symbols
+        by_code = {_code(symbol): symbol for symbol in wanted}
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=1 << 20)
+        try:
+            for code in by_code:
+                writer.write((_subscribe_message(code, self.approval_key) + "\n").encode())
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                for tick in parse_kis_frame(line.decode("utf-8", "replace"), by_code):
+                    yield tick
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:  # pragma: no cover - peer already gone
+                pass
+
+
+class FakeKISRealtimeServer:
+    """Local stand-in for the KIS real-time endpoint.
+
+    Every connection gets a seeded random walk for the codes it subscribed to,
+    ``rate`` ticks per second in frames of up to ``batch`` records, and is
+    closed after ``total`` ticks when that is set.
+    """
+
+    def __init__(
+        self,
+        rate: float = 1000.0,
+        *,
+        batch: int = 10,
+        total: int | None = None,
+        seed: int = 42,
+        base_price: float = 50_000.0,
+    ) -> None:
+        self.rate = max(float(rate), 1.0)
+        self.batch = max(int(batch), 1)
+        self.total = total
+        self.seed = seed
+        self.base_price = base_price
+        self.sent = 0
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "FakeKISRealtimeServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1] if self._server else 0
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        codes: list[str] = []
+        try:
+            # 첫 구독 메시지를 받은 뒤 잠시 더 모아서 전송을 시작한다.
+            line = await reader.readline()
+            while line:
+                try:
+                    codes.append(json.loads(line)["body"]["input"]["tr_key"])
+                except (ValueError, KeyError, TypeError):
+                    logger.debug("알 수 없는 구독 메시지: %r", line[:80])
+                try:
+                    line = await asyncio.wait_for(reader.readline(), 0.05)
+                except asyncio.TimeoutError:
+                    break
+            if codes:
+                await self._emit(writer, codes)
+        except ConnectionError:  # pragma: no cover - client went away
+            pass
+        finally:
+            writer.close()
+
+    async def _emit(self, writer: asyncio.StreamWriter, codes: list[str]) -> None:
+        rng = random.Random(self.seed)
+        prices = {code: self.base_price * (0.5 + rng.random()) for code in codes}
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        emitted = 0
+        while self.total is None or emitted < self.total:
+            # 목표 속도에 맞춰 지금까지 보냈어야 할 틱 수만큼 프레임을 쓴다.
+            due = int((loop.time() - started) * self.rate) + self.batch
+            if self.total is not None:
+                due = min(due, self.total)
+            now = datetime.now(KST)
+            while emitted < due:
+                size = min(self.batch, due - emitted)
+                ticks = []
+                for _ in range(size):
+                    code = codes[emitted % len(codes)]
+                    prices[code] = max(prices[code] * (1 + rng.gauss(0, 0.001)), 1.0)
+                    ticks.append(PriceTick(code, round(prices[code]), now, rng.randint(1, 500)))
+                    emitted += 1
+                writer.write((format_kis_frame(ticks) + "\n").encode())
+                self.sent += size
+            await writer.drain()
+            await asyncio.sleep(self.batch / self.rate)
@@ -0,0 +1,189 @@
+"""Retention for the SQLite ``logs`` table.
+
+Every scan and every Streamlit rerun appends to ``logs``, so without pruning
+the database only grows. ``LogRetention`` trims each level by age
+(``max_age_days``) and row count (``max_rows``), with ``"*"`` as the fallback
+for levels without their own entry. Rows are removed oldest first in batches
+of ``batch_size``, each batch a separate write so other writers are not held
+up. Freed pages are returned with an incremental VACUUM. When ``archive_dir``
+is set, rows are appended to ``logs-<level>-<YYYYMMDD>.jsonl.gz`` before they
+are deleted.
+
+``start()`` runs a pass immediately and then every ``interval`` seconds on a
+daemon thread; ``SQLiteStorage.close()`` stops it. ``start_log_retention``
+keeps at most one running instance per database file in the process.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Mapping
+
+from adapters.storage_sqlite import SQLiteStorage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEVEL = "*"
+_RUNNING: dict[Path, "LogRetention"] = {}
+_RUNNING_LOCK = threading.Lock()
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S"  # SQLite datetime('now') 형식(UTC)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class LogRetention:
+    """Trim ``logs`` per level by age and row caps, optionally archiving what is removed."""
+
+    def __init__(
+        self,
+        storage: SQLiteStorage,
+        *,
+        max_age_days: Mapping[str, float] | None = None,
+        max_rows: Mapping[str, int] | None = None,
+        batch_size: int = 1000,
+        interval: float = 3600.0,
+        vacuum_pages: int = 0,
+        archive_dir: Path | str | None = None,
+        clock: Callable[[], datetime] = _utcnow,
+    ) -> None:
+        self.storage = storage
+        self.max_age_days = dict(max_age_days or {})
+        self.max_rows = dict(max_rows or {})
+        self.batch_size = max(int(batch_size), 1)
+        self.interval = max(float(interval), 0.0)
+        self.vacuum_pages = max(int(vacuum_pages), 0)
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+        self._clock = clock
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._converted = False
+        self.deleted = 0
+        self.archived = 0
+
+    def policy(self, level: str) -> tuple[float | None, int | None]:
+        """``(max_age_days, max_rows)`` for ``level``; ``None`` means unbounded."""
+
+        age = self.max_age_days.get(level, self.max_age_days.get(DEFAULT_LEVEL))
+        rows = self.max_rows.get(level, self.max_rows.get(DEFAULT_LEVEL))
+        return age, rows
+
+    def _archive(self, level: str, rows: list[tuple], now: datetime) -> None:
+        if self.archive_dir is None or not rows:
+            return
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        safe = re.sub(r"[^0-9A-Za-z_-]+", "_", level) or "_"
+        path = self.archive_dir / f"logs-{safe}-{now:%Y%m%d}.jsonl.gz"
+        # gzip 멤버를 이어 붙이므로 여러 번 실행해도 하나의 유효한 파일로 읽힌다.
+        with gzip.open(path, "at", encoding="utf-8") as fh:
+            for log_id, row_level, msg, ts in rows:
+                fh.write(json.dumps({"id": log_id, "level": row_level, "msg": msg, "ts": ts}, ensure_ascii=False))
+                fh.write("\n")
+        self.archived += len(rows)
+
+    def _trim(self, level: str, now: datetime, *, before: str | None = None, excess: int | None = None) -> int:
+        removed = 0
+        while excess is None or removed < excess:
+            limit = self.batch_size if excess is None else min(self.batch_size, excess - removed)
+            rows = self.storage.oldest_logs(level, limit, before)
+            if not rows:
+                break
+            # 보관 파일을 먼저 쓰고 지운다: 중간에 실패해도 행이 사라지지는 않는다.
+            self._archive(level, rows, now)
+            removed += self.storage.delete_logs(row[0] for row in rows)
+            if len(rows) < limit:
+                break
+        return removed
+
+    def run_once(self) -> dict[str, int]:
+        """One retention pass; returns the number of rows deleted per level."""
+
+        if not self._converted:
+            if self.storage.convert_incremental_vacuum():
+                logger.info("로그 DB를 증분 VACUUM 모드로 전환했습니다.")
+            self._converted = True
+        now = self._clock()
+        deleted: dict[str, int] = {}
+        for level, count in self.storage.log_level_counts().items():
+            max_age, max_rows = self.policy(level)
+            removed = 0
+            if max_age is not None:
+                cutoff = (now - timedelta(days=float(max_age))).strftime(_TS_FORMAT)
+                removed += self._trim(level, now, before=cutoff)
+            if max_rows is not None and count - removed > max_rows:
+                removed += self._trim(level, now, excess=count - removed - int(max_rows))
+            if removed:
+                deleted[level] = removed
+        total = sum(deleted.values())
+        if total:
+            self.deleted += total
+            free = self.storage.incremental_vacuum(self.vacuum_pages)
+            logger.info(
+                "로그 정리: %s (남은 여유 페이지 %d)",
+                ", ".join(f"{level}={count}" for level, count in sorted(deleted.items())),
+                free,
+            )
+        return deleted
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.run_once()
+            except Exception as exc:  # pragma: no cover - defensive
+                logger.warning("로그 정리 실패: %s", exc)
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self) -> "LogRetention":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="v5-log-retention", daemon=True)
+            self._thread.start()
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+
+def start_log_retention(storage: SQLiteStorage, settings) -> LogRetention | None:
+    """Start retention for ``storage`` from ``[retention]`` settings (``None`` when disabled).
+
+    When one is already running for the same database file it is returned instead.
+    """
+
+    if not settings.enabled:
+        return None
+    key = storage.path.resolve()
+    with _RUNNING_LOCK:
+        running = _RUNNING.get(key)
+        if running is not None and running.running:
+            # 같은 DB로 build_dependencies가 다시 불려도(Streamlit 재실행 등) 정리 스레드는 하나만 돈다.
+            return running
+        retention = LogRetention(
+            storage,
+            max_age_days=settings.max_age_days,
+            max_rows=settings.max_rows,
+            batch_size=settings.batch_size,
+            interval=settings.interval_sec,
+            vacuum_pages=settings.vacuum_pages,
+            archive_dir=settings.archive_dir or None,
+        )
+        storage.retention = retention
+        _RUNNING[key] = retention.start()
+    return retention
+
+
+__all__ = ["DEFAULT_LEVEL", "LogRetention", "start_log_retention"]
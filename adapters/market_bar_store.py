@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import logging
+from typing import Sequence
+
+from core.bars import DEFAULT_CAPACITY, BarStore, timeframe_minutes
+from core.entities import CandleFrame, is_quote_bar
+from ports.market_data import IMarketData
+
+logger = logging.getLogger(__name__)
+
+
+class BarStoreMarket(IMarketData):
+    """Keep fetched bars in fixed-capacity ring buffers and serve them as zero-copy windows.
+
+    Every ``get_candles`` result is merged into the ``BarStore`` ring for
+    (symbol, timeframe) by bar period, and the caller gets a ``CandleFrame``
+    view of the last ``limit`` bars. Memory stays bounded by ``capacity`` bars
+    per key no matter how long the process runs. When the wrapped adapter
+    returns nothing, or only the current-price fallback bar, the bars already
+    held are served; a ``limit`` above ``capacity`` is served from the fetched
+    series directly.
+    """
+
+    def __init__(self, inner: IMarketData, store: BarStore | None = None, *, capacity: int = DEFAULT_CAPACITY) -> None:
+        self.inner = inner
+        self.store = store if store is not None else BarStore(capacity)
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
+
+    def get_candles(self, symbol: str, timeframe: str = "D", limit: int = 120) -> CandleFrame:
+        raw = self.inner.get_candles(symbol, timeframe=timeframe, limit=limit)
+        candles = raw if isinstance(raw, Sequence) else list(raw)
+        if not candles:
+            logger.debug("캔들 수신 없음(%s %s): 보유 봉으로 응답", symbol, timeframe)
+        elif timeframe_minutes(timeframe) is None and is_quote_bar(candles):
+            # 일봉 대신 받은 현재가 한 봉은 링에 넣지 않는다.
+            ring = self.store.get(symbol, timeframe)
+            if ring is not None and len(ring):
+                return ring.window(limit)
+            return CandleFrame.from_candles(candles, symbol)
+        ring = self.store.merge(symbol, timeframe, candles)
+        if limit > self.store.capacity and len(candles) > len(ring):
+            logger.debug("요청 봉 수(%d)가 링 용량(%d)을 넘어 수신 캔들로 응답", limit, self.store.capacity)
+            frame = candles if isinstance(candles, CandleFrame) else CandleFrame.from_candles(candles, symbol)
+            return frame.tail(limit)
+        return ring.window(limit)
+
+    def get_themes(self) -> list[str]:
+        return self.inner.get_themes()
+
+    def get_universe(self, name: str, custom: list[str] | None = None) -> list[str]:
+        return self.inner.get_universe(name, custom)
+
+    def get_name(self, symbol: str) -> str:
+        return self.inner.get_name(symbol)
+
+    def stats(self) -> dict[str, int]:
+        return {"series": len(self.store), "capacity": self.store.capacity, "bytes": self.store.nbytes}
+
+
+__all__ = ["BarStoreMarket"]
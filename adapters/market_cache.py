@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterable, Mapping
+
+from adapters.singleflight import CandleSingleFlight, tail
+from core.entities import Candle
+from ports.market_data import IMarketData
+
+DEFAULT_TTL_BY_TIMEFRAME: dict[str, float] = {"D": 30.0, "1m": 5.0}
+DEFAULT_TTL = 10.0
+
+CacheKey = tuple[str, str]
+
+
+@dataclass(slots=True)
+class _Entry:
+    expires_at: float
+    limit: int
+    candles: tuple[Candle, ...]
+
+
+class CachedMarket(IMarketData):
+    """TTL + LRU cache in front of any ``IMarketData`` adapter.
+
+    Entries are kept per (symbol, timeframe); a request for fewer bars than a
+    fresh entry holds is served from its tail. Misses go through
+    ``CandleSingleFlight`` so concurrent callers share one upstream request.
+    Empty results are not cached so a failed fetch is retried on the next call.
+    ``max_entries=0`` keeps the coalescing but disables caching.
+    """
+
+    def __init__(
+        self,
+        inner: IMarketData,
+        *,
+        max_entries: int = 512,
+        ttl_by_timeframe: Mapping[str, float] | None = None,
+        default_ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.inner = inner
+        self.max_entries = max(int(max_entries), 0)
+        self.ttl_by_timeframe = dict(DEFAULT_TTL_BY_TIMEFRAME)
+        self.ttl_by_timeframe.update(ttl_by_timeframe or {})
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[CacheKey, _Entry] = OrderedDict()
+        self._flights = CandleSingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
+
+    def _ttl(self, timeframe: str) -> float:
+        return self.ttl_by_timeframe.get(timeframe, self.default_ttl)
+
+    def get_candles(self, symbol: str, timeframe: str = "D", limit: int = 120) -> Iterable[Candle]:
+        key: CacheKey = (symbol, timeframe)
+        limit = int(limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.limit >= limit and entry.expires_at > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(tail(entry.candles, limit))
+
+        candles, leader = self._flights.run(
+            symbol,
+            timeframe,
+            limit,
+            lambda: self.inner.get_candles(symbol, timeframe=timeframe, limit=limit),
+        )
+        with self._lock:
+            if leader:
+                self.misses += 1
+                if candles:
+                    self._store(key, limit, candles, timeframe)
+            else:
+                self.coalesced += 1
+        return list(candles)
+
+    def _store(self, key: CacheKey, limit: int, candles: tuple[Candle, ...], timeframe: str) -> None:
+        if not self.max_entries:
+            return
+        now = self._clock()
+        current = self._entries.get(key)
+        if current is not None and current.limit > limit and current.expires_at > now:
+            return
+        self._entries[key] = _Entry(now + self._ttl(timeframe), limit, candles)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, symbol: str | None = None) -> None:
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+                return
+            for timeframe in [key[1] for key in self._entries if key[0] == symbol]:
+                del self._entries[(symbol, timeframe)]
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            }
+
+    def get_themes(self) -> list[str]:
+        return self.inner.get_themes()
+
+    def get_universe(self, name: str, custom: list[str] | None = None) -> list[str]:
+        return self.inner.get_universe(name, custom)
+
+    def get_name(self, symbol: str) -> str:
+        return self.inner.get_name(symbol)
+
+
+__all__ = ["CachedMarket", "DEFAULT_TTL", "DEFAULT_TTL_BY_TIMEFRAME"]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime
+from typing import Callable, Iterable
+
+from adapters.storage_sqlite import SQLiteStorage
+from core.entities import Candle, is_quote_bar
+from ports.market_data import IMarketData
+
+logger = logging.getLogger(__name__)
+
+
+def _daily_bar(candle: Candle) -> Candle:
+    ts = candle.timestamp
+    return Candle(
+        symbol=candle.symbol,
+        timestamp=datetime(ts.year, ts.month, ts.day),
+        open=candle.open,
+        high=candle.high,
+        low=candle.low,
+        close=candle.close,
+        volume=candle.volume,
+    )
+
+
+class CandleStoreMarket(IMarketData):
+    """Serve daily history from SQLite and fetch only the bars the store is missing.
+
+    The first request for a symbol (or a deeper ``limit`` than ever requested)
+    backfills the full window; a shorter answer means the provider has no
+    more history. Later requests only ask the wrapped adapter for
+    the bars since the last stored date, re-fetching that last bar because
+    today's candle keeps changing during the session.
+    """
+
+    def __init__(
+        self,
+        inner: IMarketData,
+        storage: SQLiteStorage,
+        *,
+        timeframes: Iterable[str] = ("D",),
+        today: Callable[[], date] = date.today,
+    ) -> None:
+        self.inner = inner
+        self.storage = storage
+        self.timeframes = frozenset(timeframes)
+        self._today = today
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
+
+    def get_candles(self, symbol: str, timeframe: str = "D", limit: int = 120) -> Iterable[Candle]:
+        if timeframe not in self.timeframes:
+            return self.inner.get_candles(symbol, timeframe=timeframe, limit=limit)
+
+        stored = self.storage.load_candles(symbol, timeframe, limit)
+        backfill = not stored or self.storage.get_candle_depth(symbol, timeframe) < limit
+        if backfill:
+            fetch_limit = limit
+        else:
+            gap_days = (self._today() - stored[-1].timestamp.date()).days
+            fetch_limit = max(1, min(limit, gap_days + 1))
+
+        raw = list(self.inner.get_candles(symbol, timeframe=timeframe, limit=fetch_limit))
+        if is_quote_bar(raw):
+            # 일봉 조회 실패 시의 현재가 한 봉은 저장하지 않고 깊이도 기록하지 않는다.
+            logger.debug("캔들 저장소(%s %s): 현재가 폴백 봉은 저장하지 않음", symbol, timeframe)
+            return stored or raw
+        fresh = [_daily_bar(candle) for candle in raw]
+        if fresh:
+            self.storage.upsert_candles(timeframe, fresh)
+            if backfill:
+                # 요청보다 짧은 응답(KIS 일봉은 최근 약 30거래일, 신규 상장 종목)은 받을 수 있는 이력을
+                # 모두 받은 것으로 보고 요청 깊이를 기록한다: 이후에는 빈 구간만 조회한다.
+                self.storage.set_candle_depth(symbol, timeframe, limit)
+        logger.debug(
+            "캔들 저장소(%s %s): 보유 %d개, 신규 요청 %d개, 수신 %d개",
+            symbol,
+            timeframe,
+            len(stored),
+            fetch_limit,
+            len(fresh),
+        )
+
+        merged = {candle.timestamp: candle for candle in stored}
+        merged.update((candle.timestamp, candle) for candle in fresh)
+        return [merged[ts] for ts in sorted(merged)][-limit:]
+
+    def get_themes(self) -> list[str]:
+        return self.inner.get_themes()
+
+    def get_universe(self, name: str, custom: list[str] | None = None) -> list[str]:
+        return self.inner.get_universe(name, custom)
+
+    def get_name(self, symbol: str) -> str:
+        return self.inner.get_name(symbol)
+
+
+__all__ = ["CandleStoreMarket"]
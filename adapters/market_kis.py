@@ -2,11 +2,17 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
+import time
+from datetime import timedelta
 from typing import Dict, Iterable, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from adapters.kis_auth import BASE_PROD, BASE_VTS, DEFAULT_TIMEOUT, ensure_token
+from adapters.kis_rate_limit import KISRateLimiter, rate_limiter_from_settings
 from adapters.storage_sqlite import (
     SQLiteStorage,
     get_symbol_name as storage_get_symbol_name,
@@ -14,7 +20,8 @@ from adapters.storage_sqlite import (
     upsert_symbol as storage_upsert_symbol,
 )
 from config.schema import AppSettings as Settings
-from core.entities import Candle
+from core.bars import BarAggregator, BarStore
+from core.entities import Candle, CandleFrame
 from core.symbols import DEFAULT_SYMBOLS, get_name as fallback_symbol_name  # noqa: F401
 from ports.market_data import IMarketData
 
@@ -29,14 +36,43 @@ _NAME_CACHE: Dict[str, str] = {}
 
 TR_DAILY = "FHKST01010400"
 TR_PRICE = "FHKST01010100"
+TR_MINUTE = "FHKST03010200"
 
 PATH_DAILY = "/uapi/domestic-stock/v1/quotations/inquire-daily-price"
 PATH_PRICE = "/uapi/domestic-stock/v1/quotations/inquire-price"
+PATH_MINUTE = "/uapi/domestic-stock/v1/quotations/inquire-time-itemchartprice"
+
+# 당일 분봉 조회는 요청 시각부터 과거로 30건씩 내려준다.
+SESSION_OPEN = "090000"
+MAX_MINUTE_PAGES = 14
 
 JSON = dict[str, object]
 
 KOSDAQ_FALLBACK = ["096770.KQ", "051910.KS", "068270.KS", "035720.KS"]
 
+# 401/403/500은 `_call`에서 토큰 재발급 후 재시도하므로 여기서는 제외한다.
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+def build_session(pool_size: int = 16, max_retries: int = 3, backoff_factor: float = 0.3) -> requests.Session:
+    """Return a keep-alive session with a sized connection pool and retry policy."""
+
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
 def _strip_suffix(symbol: str) -> str:
     return symbol.split(".")[0].strip()
@@ -92,6 +128,26 @@ def _parse_candle(symbol: str, item: JSON) -> Optional[Candle]:
         return None
 
 
+def _parse_minute(symbol: str, item: JSON) -> Optional[Candle]:
+    from datetime import datetime
+
+    try:
+        stamp = f"{item.get('stck_bsop_date')}{str(item.get('stck_cntg_hour', '')).rjust(6, '0')}"
+        timestamp = datetime.strptime(stamp, "%Y%m%d%H%M%S")
+    except ValueError:
+        return None
+    close_price = _safe_float(item.get("stck_prpr"))
+    return Candle(
+        symbol=symbol,
+        timestamp=timestamp,
+        open=_safe_float(item.get("stck_oprc"), default=close_price),
+        high=_safe_float(item.get("stck_hgpr"), default=close_price),
+        low=_safe_float(item.get("stck_lwpr"), default=close_price),
+        close=close_price,
+        volume=_safe_float(item.get("cntg_vol")),
+    )
+
+
 def _candle_from_price(symbol: str, data: JSON) -> Optional[Candle]:
     try:
         price = _safe_float(data.get("stck_prpr"))
@@ -115,7 +171,13 @@ class MarketKIS(IMarketData):
 
     provider = "kis"
 
-    def __init__(self, settings: Settings, storage: SQLiteStorage | None = None) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        storage: SQLiteStorage | None = None,
+        rate_limiter: KISRateLimiter | None = None,
+        bar_store: BarStore | None = None,
+    ) -> None:
         self.settings = settings
         self.keys_path = settings.kis.keys_path
         self.is_vts = bool(settings.kis.paper)
@@ -129,6 +191,21 @@ class MarketKIS(IMarketData):
         self.storage = storage
         if storage is not None:
             set_default_storage(storage)
+        self.rate_limiter = rate_limiter or rate_limiter_from_settings(settings.kis)
+        self._session = build_session(
+            pool_size=getattr(settings.kis, "pool_size", 16),
+            max_retries=getattr(settings.kis, "max_retries", 3),
+            backoff_factor=getattr(settings.kis, "backoff_factor", 0.3),
+        )
+        market_settings = getattr(settings, "market", None)
+        self.bars = BarAggregator(
+            getattr(market_settings, "intraday_timeframes", ("1m", "5m", "15m")),
+            maxlen=getattr(market_settings, "bar_capacity", 512),
+            store=bar_store,
+        )
+        self.intraday_refresh = float(getattr(market_settings, "intraday_refresh_sec", 5.0))
+        self._synced: dict[str, float] = {}
+        self._sync_lock = threading.Lock()
 
     def _load_credentials(self) -> None:
         if not os.path.exists(self.keys_path):
@@ -158,9 +235,13 @@ class MarketKIS(IMarketData):
             "custtype": "P",
         }
 
+    def close(self) -> None:
+        """Release pooled connections. Safe to call more than once."""
+
+        self._session.close()
+
     def _call(
         self,
-        session: requests.Session,
         path: str,
         tr_id: str,
         params: dict[str, str],
@@ -173,7 +254,8 @@ class MarketKIS(IMarketData):
         logger.debug(
             "KIS 요청 path=%s base=%s tr_id=%s params=%s", path, self._base(), tr_id, params
         )
-        response = session.get(url, headers=headers, params=params, timeout=DEFAULT_TIMEOUT)
+        self.rate_limiter.acquire(tr_id)
+        response = self._session.get(url, headers=headers, params=params, timeout=DEFAULT_TIMEOUT)
         if response.status_code in (401, 403, 500):
             logger.warning(
                 "KIS %s -> 재발급/재시도: %s params=%s",
@@ -185,7 +267,8 @@ class MarketKIS(IMarketData):
             if not self.bearer:
                 response.raise_for_status()
             headers = self._headers(self.bearer, tr_id)
-            response = session.get(
+            self.rate_limiter.acquire(tr_id)
+            response = self._session.get(
                 url,
                 headers=headers,
                 params=params,
@@ -199,7 +282,9 @@ class MarketKIS(IMarketData):
             logger.error("KIS: 토큰 미확보로 시세를 가져올 수 없습니다.")
             return []
         if timeframe != "D":
-            logger.warning("KIS 어댑터는 현재 일봉(D)만 지원합니다. (요청: %s)", timeframe)
+            if self.bars.supports(timeframe):
+                return self._intraday_candles(symbol, timeframe, limit)
+            logger.warning("KIS 어댑터가 지원하지 않는 타임프레임입니다. (요청: %s)", timeframe)
             return []
 
         sym6 = _strip_suffix(symbol)
@@ -215,52 +300,133 @@ class MarketKIS(IMarketData):
         }
 
         candles: List[Candle] = []
-        with requests.Session() as session:
-            try:
-                response = self._call(session, PATH_DAILY, TR_DAILY, params_daily)
-                data = response.json()
-                output = data.get("output", {})
-                items = output.get("prc") if isinstance(output, dict) else output
-                if not isinstance(items, list):
-                    items = []
-                for item in items[:limit]:
-                    candle = _parse_candle(symbol, item)
-                    if candle:
-                        candles.append(candle)
-                candles.sort(key=lambda candle: candle.timestamp)
-                if candles:
-                    return candles
-            except requests.HTTPError as exc:
-                logger.error("KIS 시세 조회 실패(%s): %s", symbol, exc)
-                logger.debug(
-                    "KIS 실패 상세(base=%s, mode=%s, tr_id=%s, params=%s)",
-                    self._base(),
-                    "VTS" if self.is_vts else "PROD",
-                    TR_DAILY,
-                    params_daily,
-                )
-            except Exception as exc:
-                logger.exception("KIS 일별 시세 처리 중 예외(%s): %s", symbol, exc)
-
-            try:
-                response = self._call(session, PATH_PRICE, TR_PRICE, params_price)
-                payload = response.json()
-                output = payload.get("output", {}) if isinstance(payload, dict) else {}
-                candle = _candle_from_price(symbol, output)
+        try:
+            response = self._call(PATH_DAILY, TR_DAILY, params_daily)
+            data = response.json()
+            output = data.get("output", {})
+            items = output.get("prc") if isinstance(output, dict) else output
+            if not isinstance(items, list):
+                items = []
+            for item in items[:limit]:
+                candle = _parse_candle(symbol, item)
                 if candle:
                     candles.append(candle)
-            except Exception as exc:
-                logger.error("KIS 현재가 폴백 실패(%s): %s", symbol, exc)
-                logger.debug(
-                    "KIS 폴백 상세(base=%s, mode=%s, tr_id=%s, params=%s)",
-                    self._base(),
-                    "VTS" if self.is_vts else "PROD",
-                    TR_PRICE,
-                    params_price,
-                )
+            candles.sort(key=lambda candle: candle.timestamp)
+            if candles:
+                return candles
+        except requests.HTTPError as exc:
+            logger.error("KIS 시세 조회 실패(%s): %s", symbol, exc)
+            logger.debug(
+                "KIS 실패 상세(base=%s, mode=%s, tr_id=%s, params=%s)",
+                self._base(),
+                "VTS" if self.is_vts else "PROD",
+                TR_DAILY,
+                params_daily,
+            )
+        except Exception as exc:
+            logger.exception("KIS 일별 시세 처리 중 예외(%s): %s", symbol, exc)
+
+        try:
+            response = self._call(PATH_PRICE, TR_PRICE, params_price)
+            payload = response.json()
+            output = payload.get("output", {}) if isinstance(payload, dict) else {}
+            candle = _candle_from_price(symbol, output)
+            if candle:
+                candles.append(candle)
+        except Exception as exc:
+            logger.error("KIS 현재가 폴백 실패(%s): %s", symbol, exc)
+            logger.debug(
+                "KIS 폴백 상세(base=%s, mode=%s, tr_id=%s, params=%s)",
+                self._base(),
+                "VTS" if self.is_vts else "PROD",
+                TR_PRICE,
+                params_price,
+            )
 
         return candles
 
+    def _intraday_candles(self, symbol: str, timeframe: str, limit: int) -> CandleFrame:
+        """Serve any aggregated timeframe from the shared 1m store, syncing it first if stale."""
+
+        now = time.monotonic()
+        with self._sync_lock:
+            synced = self._synced.get(symbol)
+            stale = synced is None or now - synced >= self.intraday_refresh
+            if stale:
+                self._synced[symbol] = now
+        if stale:
+            self.sync_minutes(symbol)
+        return self.bars.bars(symbol, timeframe, limit)
+
+    def sync_minutes(self, symbol: str) -> int:
+        """Fetch 1m bars newer than the stored ones (the whole session on a new day).
+
+        Returns how many bars were applied. Higher timeframes are rolled up
+        from these, so they never trigger a fetch of their own.
+        """
+
+        last = self.bars.last_minute(symbol)
+        today = _now_dt().date()
+        if last is not None and last.date() != today:
+            self.bars.reset(symbol)
+            last = None
+        try:
+            fresh = self._fetch_minutes(symbol, since=last)
+        except Exception as exc:
+            logger.error("KIS 분봉 조회 실패(%s): %s", symbol, exc)
+            return 0
+        for candle in fresh:
+            self.bars.add_bar(candle)
+        self.bars.close_due(_now_dt())
+        return len(fresh)
+
+    def _fetch_minutes(self, symbol: str, since=None) -> List[Candle]:
+        sym6 = _strip_suffix(symbol)
+        hour = _now_dt().strftime("%H%M%S")
+        by_time: dict = {}
+        for _ in range(MAX_MINUTE_PAGES):
+            params = {
+                "FID_ETC_CLS_CODE": "",
+                "FID_COND_MRKT_DIV_CODE": "J",
+                "FID_INPUT_ISCD": sym6,
+                "FID_INPUT_HOUR_1": hour,
+                "FID_PW_DATA_INCU_YN": "N",
+            }
+            payload = self._call(PATH_MINUTE, TR_MINUTE, params).json()
+            items = payload.get("output2") if isinstance(payload, dict) else None
+            page = [c for c in (_parse_minute(symbol, item) for item in items or []) if c is not None]
+            if not page:
+                break
+            for candle in page:
+                by_time[candle.timestamp] = candle
+            earliest = min(candle.timestamp for candle in page)
+            if since is not None and earliest <= since:
+                break
+            if earliest.strftime("%H%M%S") <= SESSION_OPEN:
+                break
+            hour = (earliest - timedelta(minutes=1)).strftime("%H%M%S")
+        # 마지막 저장 분봉(진행 중이던 봉)은 최신 값으로 다시 반영한다.
+        return [by_time[ts] for ts in sorted(by_time) if since is None or ts >= since]
+
+    def get_price(self, symbol: str) -> float | None:
+        """Current price from ``inquire-price`` (``None`` when unavailable)."""
+
+        if not self.bearer:
+            return None
+        params = {
+            "fid_cond_mrkt_div_code": "J",
+            "fid_input_iscd": _strip_suffix(symbol),
+        }
+        try:
+            response = self._call(PATH_PRICE, TR_PRICE, params)
+            payload = response.json()
+        except Exception as exc:
+            logger.warning("KIS 현재가 조회 실패(%s): %s", symbol, exc)
+            return None
+        output = payload.get("output", {}) if isinstance(payload, dict) else {}
+        candle = _candle_from_price(symbol, output)
+        return candle.close if candle and candle.close > 0 else None
+
     def get_themes(self) -> list[str]:
         return []
 
@@ -299,18 +465,17 @@ class MarketKIS(IMarketData):
                 "fid_cond_mrkt_div_code": "J",
                 "fid_input_iscd": _strip_suffix(clean_symbol),
             }
-            with requests.Session() as session:
-                try:
-                    response = self._call(session, PATH_PRICE, TR_PRICE, params)
-                    payload = response.json()
-                    if isinstance(payload, dict):
-                        output = payload.get("output", {})
-                        if isinstance(output, dict):
-                            raw_name = output.get("hts_kor_isnm")
-                            if isinstance(raw_name, str) and raw_name.strip():
-                                name = raw_name.strip()
-                except Exception as exc:  # pragma: no cover - defensive fallback
-                    logger.debug("KIS 종목명 조회 실패(%s): %s", clean_symbol, exc)
+            try:
+                response = self._call(PATH_PRICE, TR_PRICE, params)
+                payload = response.json()
+                if isinstance(payload, dict):
+                    output = payload.get("output", {})
+                    if isinstance(output, dict):
+                        raw_name = output.get("hts_kor_isnm")
+                        if isinstance(raw_name, str) and raw_name.strip():
+                            name = raw_name.strip()
+            except Exception as exc:  # pragma: no cover - defensive fallback
+                logger.debug("KIS 종목명 조회 실패(%s): %s", clean_symbol, exc)
 
         if not name:
             name = fallback_symbol_name(clean_symbol)
@@ -0,0 +1,117 @@
+"""Price feeds for the real-time exit monitor.
+
+``PollingPriceFeed`` polls the current price of the requested symbols every
+``interval`` seconds: KIS ``inquire-price`` through ``MarketKIS.get_price``,
+or the latest candle for markets without a quote endpoint (mock). Requests
+run in worker threads and still pass through the shared KIS rate limiter.
+
+``StreamPriceFeed`` adapts a streaming market port (``IMarketStream``: KIS
+real-time, file replay) to the monitor: quotes and bar closes for the held
+symbols become ticks.
+
+``FakePriceFeed`` replays scripted ticks or ticks pushed at run time, for
+tests and local replays.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Collection, Iterable
+
+from core.entities import BarEvent, PriceTick
+from ports.market_stream import IMarketStream
+from ports.price_feed import IPriceFeed
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["FakePriceFeed", "PollingPriceFeed", "StreamPriceFeed"]
+
+
+class PollingPriceFeed(IPriceFeed):
+    """Poll current prices for the held symbols on a fixed interval."""
+
+    def __init__(self, market, interval: float = 1.0, max_concurrency: int = 4) -> None:
+        self.market = market
+        self.interval = max(float(interval), 0.0)
+        self.max_concurrency = max(int(max_concurrency), 1)
+
+    def _fetch(self, symbol: str) -> float | None:
+        try:
+            get_price = getattr(self.market, "get_price", None)
+            if callable(get_price):
+                return get_price(symbol)
+            candles = list(self.market.get_candles(symbol, timeframe="D", limit=1))
+            return candles[-1].close if candles else None
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.warning("현재가 폴링 실패(%s): %s", symbol, exc)
+            return None
+
+    async def stream(self, symbols: Callable[[], Collection[str]]) -> AsyncIterator[PriceTick]:
+        loop = asyncio.get_running_loop()
+        gate = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(symbol: str) -> float | None:
+            async with gate:
+                return await asyncio.to_thread(self._fetch, symbol)
+
+        while True:
+            started = loop.time()
+            current = sorted(symbols())
+            if current:
+                prices = await asyncio.gather(*(fetch(symbol) for symbol in current))
+                now = datetime.now(timezone.utc)
+                for symbol, price in zip(current, prices):
+                    if price:
+                        yield PriceTick(symbol, float(price), now)
+            await asyncio.sleep(max(self.interval - (loop.time() - started), 0.0))
+
+
+class StreamPriceFeed(IPriceFeed):
+    """Ticks for the held symbols from a streaming market port; bars contribute their close."""
+
+    def __init__(self, market_stream: IMarketStream, universe: Collection[str] | None = None) -> None:
+        self.market_stream = market_stream
+        self.universe = universe
+
+    async def stream(self, symbols: Callable[[], Collection[str]]) -> AsyncIterator[PriceTick]:
+        # 보유 종목은 실행 중에 바뀌므로 구독은 universe(없으면 전체)로 하고 여기서 거른다.
+        async for event in self.market_stream.events(self.universe):
+            if event.symbol not in symbols():
+                continue
+            if isinstance(event, BarEvent):
+                candle = event.candle
+                yield PriceTick(candle.symbol, candle.close, candle.timestamp, candle.volume)
+            else:
+                yield event
+
+
+class FakePriceFeed(IPriceFeed):
+    """Scripted feed: yields the given ticks, then anything ``push``-ed until ``close()``.
+
+    Ticks for symbols that are not currently requested are dropped, like a
+    real subscription would.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self, ticks: Iterable[PriceTick] = (), *, close_when_drained: bool = False) -> None:
+        self._queue: asyncio.Queue = asyncio.Queue()
+        for tick in ticks:
+            self._queue.put_nowait(tick)
+        if close_when_drained:
+            self._queue.put_nowait(self._CLOSED)
+
+    def push(self, symbol: str, price: float, timestamp: datetime | None = None) -> None:
+        self._queue.put_nowait(PriceTick(symbol, float(price), timestamp or datetime.now(timezone.utc)))
+
+    def close(self) -> None:
+        self._queue.put_nowait(self._CLOSED)
+
+    async def stream(self, symbols: Callable[[], Collection[str]]) -> AsyncIterator[PriceTick]:
+        while True:
+            tick = await self._queue.get()
+            if tick is self._CLOSED:
+                return
+            if tick.symbol in symbols():
+                yield tick
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+from core.entities import Candle
+
+
+def tail(candles: tuple[Candle, ...], limit: int) -> tuple[Candle, ...]:
+    """Return the last ``limit`` candles, the way ``get_candles(limit=...)`` would."""
+
+    if limit <= 0:
+        return ()
+    return candles[-limit:] if limit < len(candles) else candles
+
+
+@dataclass(slots=True)
+class _Call:
+    limit: int
+    done: threading.Event = field(default_factory=threading.Event)
+    candles: tuple[Candle, ...] = ()
+    error: BaseException | None = None
+
+
+class CandleSingleFlight:
+    """Coalesce concurrent ``get_candles`` calls for the same symbol and timeframe.
+
+    A caller joins any in-flight request whose ``limit`` is at least its own and
+    receives the tail of that result; otherwise it becomes the leader of a new
+    upstream request. Errors are re-raised to every caller of the flight.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[tuple[str, str], list[_Call]] = {}
+        self.upstream = 0
+        self.shared = 0
+
+    def run(
+        self,
+        symbol: str,
+        timeframe: str,
+        limit: int,
+        fetch: Callable[[], Iterable[Candle]],
+    ) -> tuple[tuple[Candle, ...], bool]:
+        """Return ``(candles, leader)`` where ``leader`` is True for the caller that hit upstream."""
+
+        key = (symbol, timeframe)
+        with self._lock:
+            calls = self._calls.setdefault(key, [])
+            call = next((c for c in calls if c.limit >= limit), None)
+            leader = call is None
+            if leader:
+                call = _Call(limit)
+                calls.append(call)
+                self.upstream += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return tail(call.candles, limit), False
+
+        try:
+            call.candles = tuple(fetch())
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                calls = self._calls.get(key, [])
+                calls.remove(call)
+                if not calls:
+                    self._calls.pop(key, None)
+            call.done.set()
+        return call.candles, True
+
+
+__all__ = ["CandleSingleFlight", "tail"]
@@ -1,32 +1,227 @@
+"""SQLite persistence for trades, positions, logs, symbols and candles.
+
+The database runs in WAL mode with ``synchronous=NORMAL``. All writes go
+through one writer thread: callers enqueue a unit of work and wait on its
+future, and the writer commits whatever has queued up (up to
+``write_batch`` units) in a single transaction, each unit inside its own
+savepoint so one failing statement does not discard the others. Reads use a
+connection per thread and never wait for the writer.
+
+``record_trade`` also keeps a realized-PnL ledger in the same write: an
+average-cost lot per symbol (``ledger_lots``), one ``realized_pnl`` row per
+closing sell and per-day totals in ``daily_pnl``, so the daily loss check is
+a primary-key lookup. Brokers record orders when they are accepted, not from
+execution reports, so the ledger approximates actual fills: see
+``record_trade`` and ``BrokerKIS.place_order``.
+"""
 from __future__ import annotations
 
 import logging
 import os
+import queue
 import sqlite3
-from datetime import date
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Iterable, Iterator, List, Optional, TypeVar
 
-from core.entities import Position
+from core.entities import Candle, Position
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
 
 _DEFAULT_STORAGE: "SQLiteStorage" | None = None
+_STOP = object()
+BUSY_TIMEOUT_MS = 5000
+DEFAULT_RISK_PCT = 0.07  # RiskSettings.stop_loss_pct 기본값: 1R = 매입 금액 x 손절 비율
+KST = timezone(timedelta(hours=9))
+
+# 값이 하나도 바뀌지 않은 행은 갱신하지 않는다(DO UPDATE ... WHERE).
+_UPSERT_POSITION = """
+INSERT INTO positions(
+    symbol, qty, avg_price, last_price, pnl_pct,
+    trail_stop, hard_stop, take_profit_price, updated_at
+)
+VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(symbol) DO UPDATE SET
+    qty=excluded.qty,
+    avg_price=excluded.avg_price,
+    last_price=excluded.last_price,
+    pnl_pct=excluded.pnl_pct,
+    trail_stop=excluded.trail_stop,
+    hard_stop=excluded.hard_stop,
+    take_profit_price=excluded.take_profit_price,
+    updated_at=excluded.updated_at
+WHERE qty IS NOT excluded.qty
+    OR avg_price IS NOT excluded.avg_price
+    OR last_price IS NOT excluded.last_price
+    OR pnl_pct IS NOT excluded.pnl_pct
+    OR trail_stop IS NOT excluded.trail_stop
+    OR hard_stop IS NOT excluded.hard_stop
+    OR take_profit_price IS NOT excluded.take_profit_price
+"""
 
 
 class SQLiteStorage:
-    def __init__(self, path: Path) -> None:
+    def __init__(self, path: Path, *, write_batch: int = 256, risk_pct: float = DEFAULT_RISK_PCT) -> None:
         self.path = Path(path)
         if self.path.parent and not self.path.parent.exists():
             self.path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(self.path)
-        self.conn.row_factory = sqlite3.Row
+        self.write_batch = max(int(write_batch), 1)
+        self.risk_pct = max(float(risk_pct), 0.0)
+        self.commits = 0
+        self.writes = 0
+        self._closed = False
+        self._enqueue_lock = threading.Lock()  # _closed 확인과 큐 추가를 close()와 직렬화
+        self._local = threading.local()
+        self._readers: dict[threading.Thread, sqlite3.Connection] = {}
+        self._readers_lock = threading.Lock()
+        self._alerts_lock = threading.Lock()
+        self._alert_day: str | None = None
+        self._alerts_seen: set[tuple[str, str, str]] = set()
+        # 쓰기 연결은 스키마 준비 후 전용 쓰기 스레드만 사용한다.
+        self._conn = self._connect()
+        # 새 DB는 증분 VACUUM으로 만든다(기존 DB는 convert_incremental_vacuum으로 전환).
+        self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode = WAL")
         self._ensure_tables()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._run_writer, name="v5-sqlite-writer", daemon=True)
+        self._writer.start()
+        self.retention = None  # adapters.log_retention.LogRetention, 닫을 때 함께 정지
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """Return this thread's read connection, opening it on first use."""
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+            conn = self._connect()
+            conn.execute("PRAGMA query_only = ON")
+            with self._readers_lock:
+                # 종료된 스레드(조회용 스레드 풀 등)의 연결은 여기서 정리한다.
+                for thread in [thread for thread in self._readers if not thread.is_alive()]:
+                    self._readers.pop(thread).close()
+                self._readers[threading.current_thread()] = conn
+            self._local.conn = conn
+        return conn
+
+    def _write(self, work: Callable[[sqlite3.Connection], T], *, transactional: bool = True) -> T:
+        """Run ``work`` on the writer connection and wait until its batch is committed.
+
+        ``transactional=False`` runs it alone outside any transaction (VACUUM).
+        """
+
+        if threading.current_thread() is self._writer:
+            return work(self._conn)
+        future: Future = Future()
+        with self._enqueue_lock:
+            # close()가 _STOP을 넣은 뒤에는 큐에 넣지 않는다: 쓰기 스레드가 처리하지 않아 영원히 기다리게 된다.
+            if self._closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+            self._queue.put((work, future, transactional))
+        return future.result()
+
+    def _run_writer(self) -> None:
+        pending = None
+        while True:
+            item, pending = (pending if pending is not None else self._queue.get()), None
+            if item is _STOP:
+                break
+            if not item[2]:
+                self._run_alone(item)
+                continue
+            batch = [item]
+            stop = False
+            while len(batch) < self.write_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                if not item[2]:
+                    pending = item
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                break
+        # 종료 직전에 들어온 작업은 실패로 돌려준다.
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[1].set_exception(sqlite3.ProgrammingError("Cannot operate on a closed database."))
+
+    def _run_alone(self, item: tuple[Callable, Future, bool]) -> None:
+        work, future, _ = item
+        try:
+            value = work(self._conn)
+        except Exception as exc:
+            future.set_exception(exc)
+        else:
+            future.set_result(value)
+
+    def _commit(self, batch: list[tuple[Callable, Future, bool]]) -> None:
+        conn = self._conn
+        outcomes: list[tuple[Future, object, BaseException | None]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for work, future, _ in batch:
+                conn.execute("SAVEPOINT job")
+                try:
+                    value = work(conn)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, None, exc))
+                else:
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, value, None))
+            conn.execute("COMMIT")
+        except Exception as exc:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.warning("SQLite 일괄 커밋 실패(%d건): %s", len(batch), exc)
+            for _, future, _ in batch:
+                future.set_exception(exc)
+            return
+        self.commits += 1
+        self.writes += len(batch)
+        for future, value, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(value)
+
+    def flush(self) -> None:
+        """Wait until every write queued so far is committed."""
+
+        self._write(lambda conn: None)
 
     def _ensure_tables(self) -> None:
-        with self.conn:
-            self.conn.execute(
+        with self._transaction():
+            self._conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS trades (
                     id TEXT PRIMARY KEY,
@@ -38,7 +233,7 @@ class SQLiteStorage:
                 )
                 """
             )
-            self.conn.execute(
+            self._conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS positions (
                     symbol TEXT PRIMARY KEY,
@@ -53,7 +248,7 @@ class SQLiteStorage:
                 )
                 """
             )
-            self.conn.execute(
+            self._conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS logs (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -63,7 +258,7 @@ class SQLiteStorage:
                 )
                 """
             )
-            self.conn.execute(
+            self._conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS symbols (
                     code TEXT PRIMARY KEY,
@@ -72,10 +267,121 @@ class SQLiteStorage:
                 )
                 """
             )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS candles (
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    ts TEXT NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume REAL,
+                    PRIMARY KEY (symbol, timeframe, ts)
+                ) WITHOUT ROWID
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS candle_sync (
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    depth INTEGER NOT NULL,
+                    synced_at TEXT,
+                    PRIMARY KEY (symbol, timeframe)
+                )
+                """
+            )
+            has_alerts = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alerts'"
+            ).fetchone()
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS alerts (
+                    symbol TEXT NOT NULL,
+                    signal_type TEXT NOT NULL,
+                    event_date TEXT NOT NULL,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (symbol, signal_type, event_date)
+                ) WITHOUT ROWID
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_level_ts ON logs(level, ts)")
+            if not has_alerts:
+                self._migrate_alert_logs()
+            has_ledger = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_pnl'"
+            ).fetchone()
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ledger_lots (
+                    symbol TEXT PRIMARY KEY,
+                    qty INTEGER NOT NULL,
+                    avg_cost REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS realized_pnl (
+                    trade_id TEXT PRIMARY KEY,
+                    trade_date TEXT NOT NULL,
+                    symbol TEXT,
+                    qty INTEGER,
+                    price REAL,
+                    avg_cost REAL,
+                    pnl REAL,
+                    r REAL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS daily_pnl (
+                    trade_date TEXT PRIMARY KEY,
+                    realized REAL NOT NULL DEFAULT 0,
+                    r REAL NOT NULL DEFAULT 0,
+                    trades INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT
+                ) WITHOUT ROWID
+                """
+            )
+            if not has_ledger:
+                self._replay_trades()
         self._migrate_positions()
 
+    def _migrate_alert_logs(self) -> None:
+        # 예전 버전은 알림 중복 키를 logs(level='alert', msg='종목:신호:날짜')에 남겼다.
+        rows = []
+        for (msg,) in self._conn.execute("SELECT msg FROM logs WHERE level = 'alert'"):
+            parts = (msg or "").rsplit(":", 2)
+            if len(parts) == 3:
+                rows.append(tuple(parts))
+        if rows:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO alerts(symbol, signal_type, event_date) VALUES(?, ?, ?)", rows
+            )
+
+    def _replay_trades(self) -> None:
+        # 원장 테이블이 없던 DB는 기존 trades를 체결 순서대로 한 번 재생해 채운다.
+        rows = self._conn.execute("SELECT id, symbol, side, qty, price, ts FROM trades ORDER BY ts, rowid").fetchall()
+        for row in rows:
+            self._apply_fill(self._conn, row["id"], row["symbol"], row["side"], row["qty"], row["price"], row["ts"])
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        # 쓰기 스레드 시작 전 스키마 준비용. 연결이 autocommit 모드라 명시적으로 묶는다.
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
     def _migrate_positions(self) -> None:
-        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(positions)")}
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(positions)")}
         required = {
             "last_price": "ALTER TABLE positions ADD COLUMN last_price REAL DEFAULT 0",
             "pnl_pct": "ALTER TABLE positions ADD COLUMN pnl_pct REAL DEFAULT 0",
@@ -83,68 +389,175 @@ class SQLiteStorage:
             "hard_stop": "ALTER TABLE positions ADD COLUMN hard_stop REAL DEFAULT 0",
             "take_profit_price": "ALTER TABLE positions ADD COLUMN take_profit_price REAL DEFAULT 0",
         }
-        with self.conn:
+        with self._transaction():
             for column, stmt in required.items():
                 if column not in columns:
                     try:
-                        self.conn.execute(stmt)
+                        self._conn.execute(stmt)
                     except sqlite3.DatabaseError as exc:
                         logger.warning("positions 테이블 마이그레이션 실패(%s): %s", column, exc)
 
-    def record_trade(self, trade_id: str, **fields) -> None:
-        try:
-            with self.conn:
-                self.conn.execute(
-                    """
-                    INSERT OR REPLACE INTO trades(id, symbol, side, qty, price, ts)
-                    VALUES(:id, :symbol, :side, :qty, :price, :ts)
-                    """,
-                    {"id": trade_id, **fields},
+    def record_trade(
+        self, trade_id: str, *, avg_cost: float | None = None, ledger: bool = True, **fields
+    ) -> None:
+        """Store a trade and apply it to the realized-PnL ledger in the same transaction.
+
+        The ledger takes the recorded price as the fill price. ``ledger=False``
+        stores the trade only, for orders whose execution is not confirmed
+        (e.g. KIS limit orders, which may never fill). ``avg_cost`` is the
+        broker's cost basis, used for the part of a sell the ledger has no lot
+        for (e.g. holdings bought at market, whose fill price is unknown).
+        Re-recording an existing ``trade_id`` only replaces the trade row; the
+        ledger counts each trade once.
+        """
+
+        params = {"id": trade_id, **fields}
+
+        def record(conn: sqlite3.Connection) -> None:
+            seen = conn.execute("SELECT 1 FROM trades WHERE id = ?", (trade_id,)).fetchone()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO trades(id, symbol, side, qty, price, ts)
+                VALUES(:id, :symbol, :side, :qty, :price, :ts)
+                """,
+                params,
+            )
+            if ledger and not seen:
+                self._apply_fill(
+                    conn,
+                    trade_id,
+                    params.get("symbol"),
+                    params.get("side"),
+                    params.get("qty"),
+                    params.get("price"),
+                    params.get("ts"),
+                    avg_cost,
                 )
+
+        try:
+            self._write(record)
         except sqlite3.DatabaseError as exc:
             logger.warning("트레이드 기록 실패: %s", exc)
 
+    def _apply_fill(
+        self,
+        conn: sqlite3.Connection,
+        trade_id: str,
+        symbol: str | None,
+        side: str | None,
+        qty,
+        price,
+        ts: str | None,
+        avg_cost: float | None = None,
+    ) -> None:
+        qty = int(qty or 0)
+        price = float(price or 0.0)
+        if not symbol or qty <= 0 or price <= 0:
+            return  # 체결가를 모르는 주문(시장가 0원 기록 등)은 원장에 반영하지 않는다.
+        side = (side or "").upper()
+        row = conn.execute("SELECT qty, avg_cost FROM ledger_lots WHERE symbol = ?", (symbol,)).fetchone()
+        held, cost = (int(row[0]), float(row[1])) if row else (0, 0.0)
+        if side == "BUY":
+            total = held + qty
+            conn.execute(
+                "INSERT OR REPLACE INTO ledger_lots(symbol, qty, avg_cost) VALUES(?, ?, ?)",
+                (symbol, total, (cost * held + price * qty) / total),
+            )
+            return
+        if side != "SELL":
+            return
+        from_lot = min(qty, held)
+        # 원장 lot보다 많이 판 수량(시장가 매수처럼 체결가 없이 들어온 보유분)은 브로커 평균 단가로 계산한다.
+        unmatched = qty - from_lot if avg_cost and avg_cost > 0 else 0
+        closed = from_lot + unmatched
+        if closed <= 0:
+            return
+        cost = (cost * from_lot + float(avg_cost or 0.0) * unmatched) / closed
+        if cost <= 0:
+            return
+        pnl = (price - cost) * closed
+        risk = cost * closed * self.risk_pct
+        r = pnl / risk if risk > 0 else 0.0
+        if held - from_lot > 0:
+            conn.execute("UPDATE ledger_lots SET qty = ? WHERE symbol = ?", (held - from_lot, symbol))
+        elif held:
+            conn.execute("DELETE FROM ledger_lots WHERE symbol = ?", (symbol,))
+        day = _trade_day(ts)
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO realized_pnl(trade_id, trade_date, symbol, qty, price, avg_cost, pnl, r)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (trade_id, day, symbol, closed, price, cost, pnl, r),
+        )
+        conn.execute(
+            """
+            INSERT INTO daily_pnl(trade_date, realized, r, trades, updated_at)
+            VALUES(?, ?, ?, 1, ?)
+            ON CONFLICT(trade_date) DO UPDATE SET
+                realized = realized + excluded.realized,
+                r = r + excluded.r,
+                trades = trades + 1,
+                updated_at = excluded.updated_at
+            """,
+            (day, pnl, r, ts),
+        )
+
     def upsert_position(self, position: Position, ts: str) -> None:
+        self.upsert_positions([position], ts)
+
+    def upsert_positions(self, positions: Iterable[Position], ts: str) -> int:
+        """Upsert many positions in one transaction; rows whose values are unchanged are
+        left untouched (``updated_at`` included). Returns how many rows were written."""
+
+        rows = [
+            (
+                position.symbol,
+                position.qty,
+                position.avg_price,
+                position.last_price,
+                position.pnl_pct,
+                position.trail_stop,
+                position.hard_stop,
+                position.take_profit_price,
+                ts,
+            )
+            for position in positions
+        ]
+        if not rows:
+            return 0
+
+        def upsert(conn: sqlite3.Connection) -> int:
+            before = conn.total_changes
+            conn.executemany(_UPSERT_POSITION, rows)
+            return conn.total_changes - before
+
         try:
-            with self.conn:
-                self.conn.execute(
-                    """
-                    INSERT INTO positions(
-                        symbol, qty, avg_price, last_price, pnl_pct,
-                        trail_stop, hard_stop, take_profit_price, updated_at
-                    )
-                    VALUES(
-                        :symbol, :qty, :avg_price, :last_price, :pnl_pct,
-                        :trail_stop, :hard_stop, :take_profit_price, :updated_at
-                    )
-                    ON CONFLICT(symbol) DO UPDATE SET
-                        qty=excluded.qty,
-                        avg_price=excluded.avg_price,
-                        last_price=excluded.last_price,
-                        pnl_pct=excluded.pnl_pct,
-                        trail_stop=excluded.trail_stop,
-                        hard_stop=excluded.hard_stop,
-                        take_profit_price=excluded.take_profit_price,
-                        updated_at=excluded.updated_at
-                    """,
-                    {
-                        "symbol": position.symbol,
-                        "qty": position.qty,
-                        "avg_price": position.avg_price,
-                        "last_price": position.last_price,
-                        "pnl_pct": position.pnl_pct,
-                        "trail_stop": position.trail_stop,
-                        "hard_stop": position.hard_stop,
-                        "take_profit_price": position.take_profit_price,
-                        "updated_at": ts,
-                    },
-                )
+            return self._write(upsert)
         except sqlite3.DatabaseError as exc:
             logger.warning("포지션 업데이트 실패: %s", exc)
+            return 0
+
+    def update_trail_stops(self, items: Iterable[tuple[str, float]], ts: str | None = None) -> None:
+        """Raise ``trail_stop`` for several symbols in one transaction (never lowers it)."""
+
+        timestamp = ts or datetime.now(timezone.utc).isoformat()
+        rows = [(float(trail), timestamp, symbol) for symbol, trail in items]
+        if not rows:
+            return
+        try:
+            self._write(
+                lambda conn: conn.executemany(
+                    "UPDATE positions SET trail_stop = MAX(trail_stop, ?), updated_at = ? WHERE symbol = ?",
+                    rows,
+                )
+            )
+        except sqlite3.DatabaseError as exc:
+            logger.warning("트레일링 스탑 업데이트 실패: %s", exc)
 
     def get_positions(self) -> List[Position]:
         try:
-            cur = self.conn.execute(
+            cur = self._reader().execute(
                 """
                 SELECT symbol, qty, avg_price, last_price, pnl_pct,
                        trail_stop, hard_stop, take_profit_price, updated_at
@@ -172,50 +585,146 @@ class SQLiteStorage:
 
     def log_event(self, level: str, msg: str) -> None:
         try:
-            with self.conn:
-                self.conn.execute(
+            self._write(
+                lambda conn: conn.execute(
                     "INSERT INTO logs(level, msg, ts) VALUES(?, ?, datetime('now'))",
                     (level, msg),
                 )
+            )
         except sqlite3.DatabaseError as exc:
             logger.warning("로그 기록 실패: %s", exc)
 
-    def is_daily_loss_limit_exceeded(self, limit_r: float) -> bool:
+    def log_level_counts(self) -> dict[str, int]:
         try:
-            cur = self.conn.execute(
-                "SELECT msg FROM logs WHERE level = ? AND ts >= date('now')",
-                ("risk",),
-            )
-            for row in cur:
-                msg = row["msg"] or ""
-                if "daily_loss" in msg:
-                    return True
+            rows = self._reader().execute("SELECT level, COUNT(*) FROM logs GROUP BY level").fetchall()
+        except sqlite3.DatabaseError as exc:
+            logger.warning("로그 집계 실패: %s", exc)
+            return {}
+        return {row[0]: int(row[1]) for row in rows}
+
+    def oldest_logs(self, level: str, limit: int, before: str | None = None) -> list[tuple]:
+        """Oldest ``(id, level, msg, ts)`` rows of ``level``, optionally only those with ``ts < before``."""
+
+        query = "SELECT id, level, msg, ts FROM logs WHERE level = ?"
+        params: list = [level]
+        if before is not None:
+            query += " AND ts < ?"
+            params.append(before)
+        query += " ORDER BY ts, id LIMIT ?"
+        params.append(int(limit))
+        try:
+            cursor = self._reader().execute(query, params)
+            cursor.row_factory = None
+            return cursor.fetchall()
+        except sqlite3.DatabaseError as exc:
+            logger.warning("로그 조회 실패(%s): %s", level, exc)
+            return []
+
+    def delete_logs(self, ids: Iterable[int]) -> int:
+        rows = [(int(log_id),) for log_id in ids]
+        if not rows:
+            return 0
+
+        def delete(conn: sqlite3.Connection) -> int:
+            before = conn.total_changes
+            conn.executemany("DELETE FROM logs WHERE id = ?", rows)
+            return conn.total_changes - before
+
+        try:
+            return self._write(delete)
+        except sqlite3.DatabaseError as exc:
+            logger.warning("로그 삭제 실패: %s", exc)
+            return 0
+
+    def convert_incremental_vacuum(self) -> bool:
+        """Switch a database created without ``auto_vacuum`` to incremental mode (one full VACUUM)."""
+
+        def convert(conn: sqlite3.Connection) -> bool:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return True
+
+        try:
+            return self._write(convert, transactional=False)
+        except sqlite3.DatabaseError as exc:
+            logger.warning("증분 VACUUM 전환 실패: %s", exc)
+            return False
+
+    def incremental_vacuum(self, pages: int = 0) -> int:
+        """Return up to ``pages`` free pages to the OS (all when 0) and checkpoint the WAL.
+
+        Returns the number of free pages left.
+        """
+
+        def vacuum(conn: sqlite3.Connection) -> int:
+            # execute()는 한 단계만 실행해 페이지 하나만 반환하므로 executescript로 끝까지 돌린다.
+            conn.executescript(f"PRAGMA incremental_vacuum({max(int(pages), 0)});")
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+            return int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+
+        try:
+            return self._write(vacuum, transactional=False)
+        except sqlite3.DatabaseError as exc:
+            logger.warning("증분 VACUUM 실패: %s", exc)
+            return -1
+
+    def daily_pnl(self, day: date | None = None) -> dict:
+        """Realized PnL totals of ``day`` (KST, default today) from the ledger."""
+
+        key = (day or datetime.now(KST).date()).isoformat()
+        row = self._reader().execute(
+            "SELECT realized, r, trades FROM daily_pnl WHERE trade_date = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return {"date": key, "realized": 0.0, "r": 0.0, "trades": 0}
+        return {"date": key, "realized": float(row["realized"]), "r": float(row["r"]), "trades": int(row["trades"])}
+
+    def is_daily_loss_limit_exceeded(self, limit_r: float, day: date | None = None) -> bool:
+        """``True`` when realized R of ``day`` is at or below ``-|limit_r|`` (``0`` disables)."""
+
+        if not limit_r:
+            return False
+        try:
+            return self.daily_pnl(day)["r"] <= -abs(float(limit_r))
         except sqlite3.DatabaseError as exc:  # pragma: no cover - defensive
             logger.debug("일중 손실 제한 확인 실패: %s", exc)
         return False
 
     def remember_alert(self, symbol: str, signal_type: str, event_date: date) -> bool:
-        key = f"{symbol}:{signal_type}:{event_date.isoformat()}"
+        """Record an alert key; ``False`` when it was already sent for that day.
+
+        Keys of the most recent day are also kept in memory, so repeated
+        checks during a session do not touch the database.
+        """
+
+        day = event_date.isoformat()
+        key = (symbol, signal_type, day)
+        with self._alerts_lock:
+            if day == self._alert_day and key in self._alerts_seen:
+                return False
         try:
-            cur = self.conn.execute(
-                "SELECT 1 FROM logs WHERE level = ? AND msg = ? LIMIT 1",
-                ("alert", key),
+            inserted = self._write(
+                lambda conn: conn.execute(
+                    "INSERT OR IGNORE INTO alerts(symbol, signal_type, event_date) VALUES(?, ?, ?)",
+                    key,
+                ).rowcount
             )
-            if cur.fetchone():
-                return False
-            with self.conn:
-                self.conn.execute(
-                    "INSERT INTO logs(level, msg, ts) VALUES(?, ?, datetime('now'))",
-                    ("alert", key),
-                )
-            return True
         except sqlite3.DatabaseError as exc:
             logger.warning("알림 기록 실패: %s", exc)
             return False
+        with self._alerts_lock:
+            if self._alert_day is None or day > self._alert_day:
+                self._alert_day = day
+                self._alerts_seen = set()
+            if day == self._alert_day:
+                self._alerts_seen.add(key)
+        return inserted == 1
 
     def get_symbol_name(self, code: str) -> str | None:
         try:
-            cur = self.conn.execute(
+            cur = self._reader().execute(
                 "SELECT name FROM symbols WHERE code = ? LIMIT 1",
                 (code,),
             )
@@ -228,8 +737,8 @@ class SQLiteStorage:
 
     def upsert_symbol(self, code: str, name: str) -> None:
         try:
-            with self.conn:
-                self.conn.execute(
+            self._write(
+                lambda conn: conn.execute(
                     """
                     INSERT INTO symbols(code, name, updated_at)
                     VALUES(?, ?, datetime('now'))
@@ -239,16 +748,177 @@ class SQLiteStorage:
                     """,
                     (code, name),
                 )
+            )
         except sqlite3.DatabaseError as exc:  # pragma: no cover - defensive
             logger.debug("심볼 이름 저장 실패(%s): %s", code, exc)
 
+    def upsert_candles(self, timeframe: str, candles: Iterable[Candle]) -> None:
+        rows = [
+            (
+                candle.symbol,
+                timeframe,
+                candle.timestamp.isoformat(),
+                candle.open,
+                candle.high,
+                candle.low,
+                candle.close,
+                candle.volume,
+            )
+            for candle in candles
+        ]
+        if not rows:
+            return
+        try:
+            self._write(
+                lambda conn: conn.executemany(
+                    """
+                    INSERT INTO candles(symbol, timeframe, ts, open, high, low, close, volume)
+                    VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(symbol, timeframe, ts) DO UPDATE SET
+                        open=excluded.open,
+                        high=excluded.high,
+                        low=excluded.low,
+                        close=excluded.close,
+                        volume=excluded.volume
+                    """,
+                    rows,
+                )
+            )
+        except sqlite3.DatabaseError as exc:
+            logger.warning("캔들 저장 실패: %s", exc)
+
+    def load_candles(self, symbol: str, timeframe: str, limit: int) -> List[Candle]:
+        """Return up to ``limit`` most recent stored candles in ascending order."""
+
+        try:
+            rows = self._reader().execute(
+                """
+                SELECT ts, open, high, low, close, volume FROM candles
+                WHERE symbol = ? AND timeframe = ?
+                ORDER BY ts DESC
+                LIMIT ?
+                """,
+                (symbol, timeframe, int(limit)),
+            ).fetchall()
+        except sqlite3.DatabaseError as exc:
+            logger.warning("캔들 조회 실패(%s): %s", symbol, exc)
+            return []
+        return [
+            Candle(
+                symbol=symbol,
+                timestamp=datetime.fromisoformat(row["ts"]),
+                open=row["open"],
+                high=row["high"],
+                low=row["low"],
+                close=row["close"],
+                volume=row["volume"],
+            )
+            for row in reversed(rows)
+        ]
+
+    def load_candle_rows(
+        self,
+        timeframe: str,
+        symbols: Iterable[str] | None = None,
+        start: date | None = None,
+        end: date | None = None,
+    ) -> List[tuple]:
+        """Return raw ``(symbol, ts, open, high, low, close, volume)`` rows ordered by ts.
+
+        Meant for bulk consumers (backtests) that build arrays directly and do
+        not need ``Candle`` objects.
+        """
+
+        clauses = ["timeframe = ?"]
+        params: list = [timeframe]
+        if symbols is not None:
+            wanted = list(dict.fromkeys(symbols))
+            if not wanted:
+                return []
+            clauses.append(f"symbol IN ({', '.join('?' * len(wanted))})")
+            params.extend(wanted)
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append((end + timedelta(days=1)).isoformat())
+        query = (
+            "SELECT symbol, ts, open, high, low, close, volume FROM candles "
+            f"WHERE {' AND '.join(clauses)} ORDER BY ts, symbol"
+        )
+        try:
+            cursor = self._reader().execute(query, params)
+            cursor.row_factory = None
+            return cursor.fetchall()
+        except sqlite3.DatabaseError as exc:
+            logger.warning("캔들 일괄 조회 실패(%s): %s", timeframe, exc)
+            return []
+
+    def get_candle_depth(self, symbol: str, timeframe: str) -> int:
+        """Return how many bars of history were requested the last time ``symbol`` was backfilled."""
+
+        try:
+            row = self._reader().execute(
+                "SELECT depth FROM candle_sync WHERE symbol = ? AND timeframe = ?",
+                (symbol, timeframe),
+            ).fetchone()
+        except sqlite3.DatabaseError as exc:  # pragma: no cover - defensive
+            logger.debug("캔들 동기화 정보 조회 실패(%s): %s", symbol, exc)
+            return 0
+        return int(row["depth"]) if row else 0
+
+    def set_candle_depth(self, symbol: str, timeframe: str, depth: int) -> None:
+        try:
+            self._write(
+                lambda conn: conn.execute(
+                    """
+                    INSERT INTO candle_sync(symbol, timeframe, depth, synced_at)
+                    VALUES(?, ?, ?, datetime('now'))
+                    ON CONFLICT(symbol, timeframe) DO UPDATE SET
+                        depth=excluded.depth,
+                        synced_at=excluded.synced_at
+                    """,
+                    (symbol, timeframe, int(depth)),
+                )
+            )
+        except sqlite3.DatabaseError as exc:  # pragma: no cover - defensive
+            logger.debug("캔들 동기화 정보 저장 실패(%s): %s", symbol, exc)
+
     def close(self) -> None:
-        self.conn.close()
+        """Commit queued writes, stop the writer thread and close every connection."""
+
         global _DEFAULT_STORAGE
+        if self.retention is not None:
+            self.retention.stop()
+        with self._enqueue_lock:
+            stopping = not self._closed
+            if stopping:
+                self._closed = True
+                self._queue.put(_STOP)
+        if stopping:
+            self._writer.join()
+            self._conn.close()
+            with self._readers_lock:
+                for conn in self._readers.values():
+                    conn.close()
+                self._readers.clear()
         if _DEFAULT_STORAGE is self:
             _DEFAULT_STORAGE = None
 
 
+def _trade_day(ts: str | None) -> str:
+    """KST trading day of a fill timestamp; naive timestamps are UTC."""
+
+    try:
+        moment = datetime.fromisoformat(str(ts).replace("Z", "+00:00"))
+    except ValueError:
+        return datetime.now(KST).date().isoformat()
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(KST).date().isoformat()
+
+
 def set_default_storage(storage: Optional[SQLiteStorage]) -> None:
     global _DEFAULT_STORAGE
     _DEFAULT_STORAGE = storage
@@ -0,0 +1,127 @@
+"""Replay recorded market events as an ``IMarketStream``.
+
+Recordings are JSON lines, one event per line::
+
+    {"type": "quote", "symbol": "005930.KS", "ts": "2024-05-02T09:00:01+09:00", "price": 71000, "volume": 10}
+    {"type": "bar", "symbol": "005930.KS", "timeframe": "1m", "ts": "...", "open": ..., "high": ..., "low": ..., "close": ..., "volume": ...}
+
+``ReplayMarketStream`` plays a file (or any iterable of events) in order.
+``speed=0`` replays as fast as the consumer takes events; ``speed=10`` keeps
+the recorded gaps between events but ten times faster. Stored candles can be
+turned into bar events with :func:`candle_events`.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Collection, Iterable, Iterator, Mapping
+
+from core.entities import BarEvent, Candle, MarketEvent, PriceTick
+from ports.market_stream import IMarketStream
+
+__all__ = ["ReplayMarketStream", "candle_events", "read_events", "write_events"]
+
+# 속도 제한 없이 재생할 때도 이 개수마다 이벤트 루프에 제어를 넘긴다.
+_YIELD_EVERY = 256
+
+
+def _encode(event: MarketEvent) -> dict:
+    if isinstance(event, BarEvent):
+        candle = event.candle
+        return {
+            "type": "bar",
+            "symbol": candle.symbol,
+            "timeframe": event.timeframe,
+            "ts": candle.timestamp.isoformat(),
+            "open": candle.open,
+            "high": candle.high,
+            "low": candle.low,
+            "close": candle.close,
+            "volume": candle.volume,
+        }
+    return {
+        "type": "quote",
+        "symbol": event.symbol,
+        "ts": event.timestamp.isoformat(),
+        "price": event.price,
+        "volume": event.volume,
+    }
+
+
+def _decode(item: Mapping) -> MarketEvent:
+    ts = datetime.fromisoformat(item["ts"])
+    if item.get("type") == "bar":
+        candle = Candle(
+            item["symbol"],
+            ts,
+            float(item["open"]),
+            float(item["high"]),
+            float(item["low"]),
+            float(item["close"]),
+            float(item.get("volume", 0.0)),
+        )
+        return BarEvent(item.get("timeframe", "D"), candle)
+    return PriceTick(item["symbol"], float(item["price"]), ts, float(item.get("volume", 0.0)))
+
+
+def write_events(events: Iterable[MarketEvent], path: Path) -> int:
+    """Record events as JSON lines; return how many were written."""
+
+    path = Path(path)
+    if path.parent and not path.parent.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with path.open("w", encoding="utf-8") as fh:
+        for event in events:
+            fh.write(json.dumps(_encode(event)))
+            fh.write("\n")
+            count += 1
+    return count
+
+
+def read_events(path: Path) -> Iterator[MarketEvent]:
+    with Path(path).open(encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield _decode(json.loads(line))
+
+
+def candle_events(candles: Iterable[Candle], timeframe: str = "D") -> list[BarEvent]:
+    """Bar events for stored candles, in time order (symbol order within a timestamp)."""
+
+    ordered = sorted(candles, key=lambda candle: (candle.timestamp, candle.symbol))
+    return [BarEvent(timeframe, candle) for candle in ordered]
+
+
+class ReplayMarketStream(IMarketStream):
+    """Play recorded quote/bar events at a configurable speed."""
+
+    def __init__(self, source: Path | str | Iterable[MarketEvent], speed: float = 0.0) -> None:
+        self.source = source
+        self.speed = max(float(speed), 0.0)
+
+    def _iter_source(self) -> Iterator[MarketEvent]:
+        if isinstance(self.source, (str, Path)):
+            return read_events(Path(self.source))
+        return iter(self.source)
+
+    async def events(self, symbols: Collection[str] | None = None) -> AsyncIterator[MarketEvent]:
+        wanted = set(symbols) if symbols is not None else None
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first: datetime | None = None
+        for count, event in enumerate(self._iter_source(), start=1):
+            if wanted is not None and event.symbol not in wanted:
+                continue
+            if self.speed > 0:
+                first = first or event.timestamp
+                due = started + (event.timestamp - first).total_seconds() / self.speed
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif count % _YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+            yield event
@@ -9,15 +9,23 @@ from typing import Dict, Iterable, Tuple
 
 from adapters.broker_kis import BrokerKIS
 from adapters.broker_mock import MockBroker
+from adapters.candle_fetcher import DEFAULT_MAX_WORKERS, fetch_candles
+from adapters.kis_rate_limit import rate_limiter_from_settings
+from adapters.log_retention import start_log_retention
+from adapters.market_bar_store import BarStoreMarket
+from adapters.market_cache import CachedMarket
+from adapters.market_candle_store import CandleStoreMarket
 from adapters.market_kis import MarketKIS
 from adapters.market_mock import MarketMock
 from adapters.notifier_windows import NotifierWindows
 from adapters.storage_sqlite import SQLiteStorage, set_default_storage
 from config.schema import AppSettings
-from core.entities import Candle, ExitSignal, Position, Signal
+from core.bars import BarStore
+from core.entities import Candle, CandleFrame, ExitSignal, Position, Signal
 from core.risk import RiskManager, format_exit_message
 from core.strategy_v5 import StrategyV5
 from core.symbols import get_name, iter_default_symbols
+from core.trailing import TrailingStopTracker
 
 DEFAULT_SYMBOLS: Tuple[str, ...] = tuple(iter_default_symbols())
 
@@ -39,9 +47,19 @@ def build_notifier(settings: AppSettings):
 
 
 def build_market(settings: AppSettings, storage: SQLiteStorage | None = None):
+    store = BarStore(settings.market.bar_capacity)
     if settings.market.provider == "kis":
-        return MarketKIS(settings, storage=storage)
-    return MarketMock(seed=42)
+        market = MarketKIS(settings, storage=storage, bar_store=store)
+        if settings.market.candle_store and storage is not None:
+            market = CandleStoreMarket(market, storage)
+    else:
+        market = MarketMock(seed=42)
+    cached = CachedMarket(
+        market,
+        max_entries=settings.market.cache_size,
+        ttl_by_timeframe=settings.market.cache_ttl,
+    )
+    return BarStoreMarket(cached, store)
 
 
 def build_broker(settings: AppSettings, storage: SQLiteStorage):
@@ -52,21 +70,46 @@ def build_broker(settings: AppSettings, storage: SQLiteStorage):
             paper=settings.kis.paper,
             risk_config=settings.risk,
             mode=settings.mode,
+            rate_limiter=rate_limiter_from_settings(settings.kis),
         )
     return MockBroker(storage=storage)
 
 
 def build_dependencies(settings: AppSettings):
-    storage = SQLiteStorage(Path(settings.db.path))
+    storage = SQLiteStorage(
+        Path(settings.db.path),
+        write_batch=settings.db.write_batch,
+        risk_pct=settings.risk.stop_loss_pct,
+    )
     set_default_storage(storage)
+    start_log_retention(storage, settings.retention)
     market = build_market(settings, storage)
     broker = build_broker(settings, storage)
     notifier = build_notifier(settings)
     strategy = StrategyV5(settings.strategy)
-    risk = RiskManager(settings.risk)
+    tracker = TrailingStopTracker(
+        storage,
+        flush_size=settings.risk.trail_flush_size,
+        flush_interval=settings.risk.trail_flush_sec,
+    )
+    risk = RiskManager(settings.risk, tracker=tracker)
     return storage, market, broker, notifier, strategy, risk
 
 
+def close_dependencies(storage: SQLiteStorage, market, broker, strategy=None, risk=None) -> None:
+    """Release pooled HTTP sessions and the screening process pool, flush pending
+    trailing-stop marks, then close the SQLite connection."""
+
+    for component in (market, broker, strategy, risk):
+        close = getattr(component, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as exc:  # pragma: no cover - defensive
+                logger.debug("리소스 정리 실패(%s): %s", type(component).__name__, exc)
+    storage.close()
+
+
 def resolve_symbol_name(symbol: str, market) -> str:
     try:
         if hasattr(market, "get_name"):
@@ -95,15 +138,21 @@ def resolve_universe(settings: AppSettings, market) -> list[str]:
     return symbols
 
 
-def collect_candles(market, symbols: Iterable[str], limit: int = 120) -> Dict[str, list[Candle]]:
-    candles: Dict[str, list[Candle]] = {}
-    for symbol in symbols:
-        try:
-            candles[symbol] = list(market.get_candles(symbol, timeframe="D", limit=limit))
-        except Exception as exc:  # pragma: no cover - defensive
-            logger.warning("캔들 조회 실패(%s): %s", symbol, exc)
-            candles[symbol] = []
-    return candles
+def collect_candles(
+    market,
+    symbols: Iterable[str],
+    limit: int = 120,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    as_frames: bool = False,
+) -> Dict[str, list[Candle]] | Dict[str, CandleFrame]:
+    return fetch_candles(
+        market,
+        symbols,
+        timeframe="D",
+        limit=limit,
+        max_workers=max_workers,
+        as_frames=as_frames,
+    )
 
 
 def scan_signals(
@@ -111,14 +160,26 @@ def scan_signals(
     market,
     symbols: Iterable[str],
     top_n: int,
-) -> Tuple[list[Signal], Dict[str, list[Candle]]]:
-    candles = collect_candles(market, symbols)
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    incremental: bool = False,
+) -> Tuple[list[Signal], Dict[str, list[Candle]] | Dict[str, CandleFrame]]:
+    # 반복 스캔은 종목별 롤링 상태를 갱신하므로 Candle 리스트가 그대로 쓰인다.
+    if incremental:
+        candles = collect_candles(market, symbols, max_workers=max_workers)
+        return strategy.rescreen(candles, top_n), candles
+    candles = collect_candles(market, symbols, max_workers=max_workers, as_frames=True)
     signals = strategy.screen_candidates(candles, top_n)
     return signals, candles
 
 
-def run_cli(strategy: StrategyV5, market, symbols: Iterable[str], top_n: int) -> list[Signal]:
-    signals, _ = scan_signals(strategy, market, symbols, top_n)
+def run_cli(
+    strategy: StrategyV5,
+    market,
+    symbols: Iterable[str],
+    top_n: int,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> list[Signal]:
+    signals, _ = scan_signals(strategy, market, symbols, top_n, max_workers=max_workers)
     for signal in signals:
         if not signal.name:
             signal.name = resolve_symbol_name(signal.symbol, market)
@@ -128,8 +189,9 @@ def run_cli(strategy: StrategyV5, market, symbols: Iterable[str], top_n: int) ->
 def enrich_positions(
     positions: Iterable[Position],
     market,
-    candles: Dict[str, list[Candle]],
+    candles: Dict[str, list[Candle] | CandleFrame],
     storage: SQLiteStorage,
+    tracker: TrailingStopTracker | None = None,
 ) -> list[Position]:
     enriched: list[Position] = []
     timestamp = datetime.now(timezone.utc).isoformat()
@@ -144,10 +206,14 @@ def enrich_positions(
             position.last_price = series[-1].close
         if position.avg_price:
             position.pnl_pct = (position.last_price - position.avg_price) / position.avg_price
+        enriched.append(position)
+    if tracker is not None:
+        # 보유 종목의 trail_stop을 추적 중인 고점까지 올리고, 청산된 종목은 추적에서 제외한다.
+        tracker.sync(enriched)
+    for position in enriched:
         if position.trail_stop == 0 and position.last_price:
             position.trail_stop = position.last_price
-        storage.upsert_position(position, timestamp)
-        enriched.append(position)
+    storage.upsert_positions(enriched, timestamp)
     return enriched
 
 
@@ -160,10 +226,7 @@ def handle_exit_signals(
     show_names: bool,
 ) -> list[Tuple[Position, ExitSignal]]:
     results: list[Tuple[Position, ExitSignal]] = []
-    for position in positions:
-        signal = risk.evaluate_exit(position)
-        if not signal:
-            continue
+    for position, signal in risk.evaluate_exits(list(positions)):
         already_sent = not storage.remember_alert(
             position.symbol,
             signal.signal_type,
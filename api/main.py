@@ -8,9 +8,13 @@ from typing import List
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 
+from adapters.kis_rate_limit import rate_limit_stats
+from adapters.market_bar_store import BarStoreMarket
+from adapters.market_cache import CachedMarket
 from api import schemas
 from api.deps import (
     build_dependencies,
+    close_dependencies,
     collect_candles,
     resolve_symbol_name,
     resolve_universe,
@@ -44,7 +48,7 @@ app.add_middleware(
 @app.on_event("shutdown")
 async def _shutdown() -> None:  # pragma: no cover - cleanup hook
     try:
-        storage.close()
+        close_dependencies(storage, market, broker, strategy, risk)
     except Exception:
         logger.debug("Storage already closed")
 
@@ -54,6 +58,14 @@ def health() -> dict:
     return {"ok": True}
 
 
+@app.get("/api/metrics", response_model=dict)
+def get_metrics() -> dict:
+    bar_stats = market.stats() if isinstance(market, BarStoreMarket) else None
+    cache = market.inner if isinstance(market, BarStoreMarket) else market
+    cache_stats = cache.stats() if isinstance(cache, CachedMarket) else None
+    return {"kis_rate_limit": rate_limit_stats(), "candle_cache": cache_stats, "bar_store": bar_stats}
+
+
 @app.get("/api/settings", response_model=dict)
 def get_settings() -> dict:
     return {
@@ -71,16 +83,19 @@ def get_holdings() -> schemas.HoldingsResponse:
         return schemas.HoldingsResponse(positions=[], cash=0.0)
 
     symbols = {pos.symbol for pos in positions}
-    candles = collect_candles(market, symbols, limit=2)
+    candles = collect_candles(market, symbols, limit=2, max_workers=settings.market.max_workers)
 
-    items: List[schemas.PositionOut] = []
     for pos in positions:
         last_candles = candles.get(pos.symbol) or []
         if last_candles:
             pos.last_price = last_candles[-1].close
             if pos.avg_price:
                 pos.pnl_pct = (pos.last_price - pos.avg_price) / pos.avg_price
-        exit_signal = risk.evaluate_exit(pos)
+    exit_signals = {id(pos): signal for pos, signal in risk.evaluate_exits(positions)}
+
+    items: List[schemas.PositionOut] = []
+    for pos in positions:
+        exit_signal = exit_signals.get(id(pos))
         items.append(
             schemas.PositionOut(
                 symbol=pos.symbol,
@@ -98,7 +113,7 @@ def get_holdings() -> schemas.HoldingsResponse:
 @app.get("/api/reco", response_model=schemas.RecommendationsResponse)
 def get_recommendations(top: int = Query(default=5, ge=1, le=20)) -> schemas.RecommendationsResponse:
     symbols = resolve_universe(settings, market)
-    signals = run_cli(strategy, market, symbols, top)
+    signals = run_cli(strategy, market, symbols, top, max_workers=settings.market.max_workers)
     cards = [
         schemas.RecommendationCard(
             symbol=signal.symbol,
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import multiprocessing
 import sys
 
 if __name__ == "__main__":
+    # PyInstaller 단일 실행 파일에서 spawn 프로세스 풀(스크리닝/스윕) 자식이 앱을 다시 실행하지 않도록 한다.
+    multiprocessing.freeze_support()
     if "--desktop" in sys.argv:
         from .desktop import main as desktop_main
 
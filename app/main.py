@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import logging
 import os
 import subprocess
@@ -12,15 +13,30 @@ from typing import Dict, Iterable, Sequence, Tuple
 
 from adapters.broker_kis import BrokerKIS
 from adapters.broker_mock import MockBroker
+from adapters.candle_fetcher import DEFAULT_MAX_WORKERS, fetch_candles
+from adapters.kis_rate_limit import rate_limiter_from_settings
+from adapters.log_retention import start_log_retention
+from adapters.market_bar_store import BarStoreMarket
+from adapters.market_cache import CachedMarket
+from adapters.market_candle_store import CandleStoreMarket
 from adapters.market_kis import MarketKIS
 from adapters.market_mock import MarketMock
 from adapters.notifier_windows import NotifierWindows
+from adapters.price_feed import PollingPriceFeed, StreamPriceFeed
 from adapters.storage_sqlite import SQLiteStorage, set_default_storage
+from adapters.stream_replay import ReplayMarketStream
 from config.schema import AppSettings, load_settings
-from core.entities import Candle, ExitSignal, Position, Signal
+from core.backtest import BacktestConfig, CandlePanel, load_panel, run_backtest
+from core.bars import BarStore
+from core.entities import Candle, CandleFrame, ExitSignal, Position, Signal
+from core.monitor import ExitMonitor
 from core.risk import RiskManager, format_exit_message
+from core.scoring import LOOKBACK
 from core.strategy_v5 import StrategyV5
+from core.sweep import run_sweep, sample_grid, write_results
 from core.symbols import get_name, iter_default_symbols
+from core.trailing import TrailingStopTracker
+from core.walkforward import walk_forward
 
 DEFAULT_SYMBOLS: Tuple[str, ...] = tuple(iter_default_symbols())
 
@@ -65,9 +81,19 @@ def build_notifier(settings: AppSettings):
 
 
 def build_market(settings: AppSettings, storage: SQLiteStorage | None = None):
+    store = BarStore(settings.market.bar_capacity)
     if settings.market.provider == "kis":
-        return MarketKIS(settings, storage=storage)
-    return MarketMock(seed=42)
+        market = MarketKIS(settings, storage=storage, bar_store=store)
+        if settings.market.candle_store and storage is not None:
+            market = CandleStoreMarket(market, storage)
+    else:
+        market = MarketMock(seed=42)
+    cached = CachedMarket(
+        market,
+        max_entries=settings.market.cache_size,
+        ttl_by_timeframe=settings.market.cache_ttl,
+    )
+    return BarStoreMarket(cached, store)
 
 
 def build_broker(settings: AppSettings, storage: SQLiteStorage):
@@ -78,21 +104,46 @@ def build_broker(settings: AppSettings, storage: SQLiteStorage):
             paper=settings.kis.paper,
             risk_config=settings.risk,
             mode=settings.mode,
+            rate_limiter=rate_limiter_from_settings(settings.kis),
         )
     return MockBroker(storage=storage)
 
 
 def build_dependencies(settings: AppSettings):
-    storage = SQLiteStorage(Path(settings.db.path))
+    storage = SQLiteStorage(
+        Path(settings.db.path),
+        write_batch=settings.db.write_batch,
+        risk_pct=settings.risk.stop_loss_pct,
+    )
     set_default_storage(storage)
+    start_log_retention(storage, settings.retention)
     market = build_market(settings, storage)
     broker = build_broker(settings, storage)
     notifier = build_notifier(settings)
     strategy = StrategyV5(settings.strategy)
-    risk = RiskManager(settings.risk)
+    tracker = TrailingStopTracker(
+        storage,
+        flush_size=settings.risk.trail_flush_size,
+        flush_interval=settings.risk.trail_flush_sec,
+    )
+    risk = RiskManager(settings.risk, tracker=tracker)
     return storage, market, broker, notifier, strategy, risk
 
 
+def close_dependencies(storage: SQLiteStorage, market, broker, strategy=None, risk=None) -> None:
+    """Release pooled HTTP sessions and the screening process pool, flush pending
+    trailing-stop marks, then close the SQLite connection."""
+
+    for component in (market, broker, strategy, risk):
+        close = getattr(component, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as exc:  # pragma: no cover - defensive
+                logging.debug("리소스 정리 실패(%s): %s", type(component).__name__, exc)
+    storage.close()
+
+
 def resolve_universe(settings: AppSettings, market) -> list[str]:
     universe = settings.watch.universe
     custom = settings.watch.symbols
@@ -109,22 +160,29 @@ def resolve_universe(settings: AppSettings, market) -> list[str]:
     return symbols
 
 
-def collect_candles(market, symbols: Iterable[str], limit: int = 120) -> Dict[str, list[Candle]]:
-    candles: Dict[str, list[Candle]] = {}
-    for symbol in symbols:
-        try:
-            candles[symbol] = list(market.get_candles(symbol, timeframe="D", limit=limit))
-        except Exception as exc:  # pragma: no cover - defensive guard
-            logging.warning("캔들 조회 실패(%s): %s", symbol, exc)
-            candles[symbol] = []
-    return candles
+def collect_candles(
+    market,
+    symbols: Iterable[str],
+    limit: int = 120,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    as_frames: bool = False,
+) -> Dict[str, list[Candle]] | Dict[str, CandleFrame]:
+    return fetch_candles(
+        market,
+        symbols,
+        timeframe="D",
+        limit=limit,
+        max_workers=max_workers,
+        as_frames=as_frames,
+    )
 
 
 def enrich_positions(
     positions: Iterable[Position],
     market,
-    candles: Dict[str, list[Candle]],
+    candles: Dict[str, list[Candle] | CandleFrame],
     storage: SQLiteStorage,
+    tracker: TrailingStopTracker | None = None,
 ) -> list[Position]:
     enriched: list[Position] = []
     timestamp = datetime.now(timezone.utc).isoformat()
@@ -139,10 +197,14 @@ def enrich_positions(
             position.last_price = series[-1].close
         if position.avg_price:
             position.pnl_pct = (position.last_price - position.avg_price) / position.avg_price
+        enriched.append(position)
+    if tracker is not None:
+        # 보유 종목의 trail_stop을 추적 중인 고점까지 올리고, 청산된 종목은 추적에서 제외한다.
+        tracker.sync(enriched)
+    for position in enriched:
         if position.trail_stop == 0 and position.last_price:
             position.trail_stop = position.last_price
-        storage.upsert_position(position, timestamp)
-        enriched.append(position)
+    storage.upsert_positions(enriched, timestamp)
     return enriched
 
 
@@ -155,10 +217,7 @@ def handle_exit_signals(
     show_names: bool,
 ) -> list[Tuple[Position, ExitSignal]]:
     results: list[Tuple[Position, ExitSignal]] = []
-    for position in positions:
-        signal = risk.evaluate_exit(position)
-        if not signal:
-            continue
+    for position, signal in risk.evaluate_exits(list(positions)):
         already_sent = not storage.remember_alert(position.symbol, signal.signal_type, signal.triggered_at.date())
         display_name = resolve_symbol_name(position.symbol, market) if show_names else None
         message = format_exit_message(signal, display_name)
@@ -176,14 +235,26 @@ def scan_signals(
     market,
     symbols: Iterable[str],
     top_n: int,
-) -> Tuple[list[Signal], Dict[str, list[Candle]]]:
-    candles = collect_candles(market, symbols)
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    incremental: bool = False,
+) -> Tuple[list[Signal], Dict[str, list[Candle]] | Dict[str, CandleFrame]]:
+    # 반복 스캔은 종목별 롤링 상태를 갱신하므로 Candle 리스트가 그대로 쓰인다.
+    if incremental:
+        candles = collect_candles(market, symbols, max_workers=max_workers)
+        return strategy.rescreen(candles, top_n), candles
+    candles = collect_candles(market, symbols, max_workers=max_workers, as_frames=True)
     signals = strategy.screen_candidates(candles, top_n)
     return signals, candles
 
 
-def run_cli(strategy: StrategyV5, market, symbols: Iterable[str], top_n: int) -> list[Signal]:
-    signals, _ = scan_signals(strategy, market, symbols, top_n)
+def run_cli(
+    strategy: StrategyV5,
+    market,
+    symbols: Iterable[str],
+    top_n: int,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> list[Signal]:
+    signals, _ = scan_signals(strategy, market, symbols, top_n, max_workers=max_workers)
     for signal in signals:
         if not signal.name:
             signal.name = resolve_symbol_name(signal.symbol, market)
@@ -198,10 +269,18 @@ def run_scan_once(
     notifier,
     strategy: StrategyV5,
     risk: RiskManager,
+    incremental: bool = False,
 ) -> int:
     symbols = resolve_universe(settings, market)
     top_n = settings.watch.top_n
-    signals, candles = scan_signals(strategy, market, symbols, top_n)
+    signals, candles = scan_signals(
+        strategy,
+        market,
+        symbols,
+        top_n,
+        max_workers=settings.market.max_workers,
+        incremental=incremental,
+    )
 
     print("=== v5 Trader 추천 종목 ===")
     if not signals:
@@ -227,7 +306,7 @@ def run_scan_once(
     except Exception as exc:  # pragma: no cover - defensive
         logging.warning("추천 토스트 전송 실패: %s", exc)
 
-    positions = enrich_positions(list(broker.get_positions()), market, candles, storage)
+    positions = enrich_positions(list(broker.get_positions()), market, candles, storage, risk.tracker)
     exit_signals = handle_exit_signals(positions, risk, storage, notifier, market, show_names)
 
     if positions:
@@ -256,6 +335,26 @@ def parse_args(argv: Sequence[str] | None) -> argparse.Namespace:
     parser.add_argument("--ui", action="store_true", help="Run Streamlit UI instead of CLI output")
     parser.add_argument("--scan", action="store_true", help="Run one-shot screening and exit alerts")
     parser.add_argument("--loop", action="store_true", help="Keep scanning on an interval (use with --scan)")
+    parser.add_argument(
+        "--monitor",
+        action="store_true",
+        help="Watch held positions on a live price feed and alert on exit signals",
+    )
+    parser.add_argument(
+        "--backtest",
+        action="store_true",
+        help="Replay stored daily candles through the strategy and exit rules",
+    )
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help="Backtest the [sweep] parameter grid and write a ranked results table",
+    )
+    parser.add_argument(
+        "--walk-forward",
+        action="store_true",
+        help="Re-optimise the [sweep] grid on rolling windows and report out-of-sample results",
+    )
     parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
     return parser.parse_args(argv)
 
@@ -265,19 +364,177 @@ def run_cli_mode(settings: AppSettings) -> int:
     try:
         return run_scan_once(settings, storage, market, broker, notifier, strategy, risk)
     finally:
-        storage.close()
+        close_dependencies(storage, market, broker, strategy, risk)
 
 
 def run_scan_mode(settings: AppSettings, loop: bool) -> int:
     storage, market, broker, notifier, strategy, risk = build_dependencies(settings)
     try:
         while True:
-            exit_code = run_scan_once(settings, storage, market, broker, notifier, strategy, risk)
+            exit_code = run_scan_once(
+                settings, storage, market, broker, notifier, strategy, risk, incremental=loop
+            )
             if not loop:
                 return exit_code
             time.sleep(settings.watch.refresh_sec)
+    finally:
+        close_dependencies(storage, market, broker, strategy, risk)
+
+
+def build_price_feed(settings: AppSettings, market):
+    monitor = settings.monitor
+    if monitor.feed == "replay":
+        return StreamPriceFeed(ReplayMarketStream(Path(monitor.replay_path), speed=monitor.replay_speed))
+    return PollingPriceFeed(market, interval=monitor.poll_sec, max_concurrency=monitor.max_concurrency)
+
+
+def run_monitor_mode(settings: AppSettings) -> int:
+    storage, market, broker, notifier, strategy, risk = build_dependencies(settings)
+    show_names = settings.display.show_names
+    feed = build_price_feed(settings, market)
+    monitor = ExitMonitor(
+        risk,
+        feed,
+        notifier,
+        storage=storage,
+        broker=broker,
+        resync_sec=settings.monitor.resync_sec,
+        name_resolver=(lambda symbol: resolve_symbol_name(symbol, market)) if show_names else None,
+    )
+    logging.info("실시간 청산 감시 시작 (피드: %s)", settings.monitor.feed)
+    try:
+        asyncio.run(monitor.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_dependencies(storage, market, broker, strategy, risk)
+    logging.info("실시간 청산 감시 종료: 틱 %d건, 알림 %d건", monitor.ticks, len(monitor.alerts))
+    return 0
+
+
+def load_backtest_panel(settings: AppSettings, storage: SQLiteStorage) -> CandlePanel | None:
+    # CUSTOM 유니버스가 아니면 저장소에 있는 모든 일봉 종목을 재생한다.
+    custom = settings.watch.universe == "CUSTOM" and settings.watch.symbols
+    panel = load_panel(storage, settings.watch.symbols if custom else None)
+    if len(panel.dates) <= LOOKBACK:
+        print("백테스트에 필요한 일봉 데이터가 부족합니다. 먼저 스캔으로 캔들을 수집하세요.")
+        return None
+    return panel
+
+
+def run_backtest_mode(settings: AppSettings) -> int:
+    storage = SQLiteStorage(Path(settings.db.path), write_batch=settings.db.write_batch)
+    strategy = StrategyV5(settings.strategy)
+    try:
+        panel = load_backtest_panel(settings, storage)
+        if panel is None:
+            return 1
+        result = run_backtest(
+            strategy,
+            panel,
+            settings.risk,
+            BacktestConfig(top_n=settings.watch.top_n),
+        )
+    finally:
+        strategy.close()
+        storage.close()
+
+    summary = result.summary()
+    print("=== v5 Trader 백테스트 ===")
+    print(f"기간: {summary['start']} ~ {summary['end']} ({len(panel.symbols)}종목)")
+    print(f"최종 평가금액: {summary['final_equity']:,.0f} (손익 {summary['pnl']:,.0f})")
+    print(f"수익률: {summary['total_return_pct']:.2f}% | 최대 낙폭: {summary['max_drawdown_pct']:.2f}%")
+    print(
+        f"거래 {summary['trades']}건 | 적중률 {summary['hit_rate_pct']:.2f}% "
+        f"| 미청산 {summary['open_positions']}종목"
+    )
+    return 0
+
+
+def run_sweep_mode(settings: AppSettings) -> int:
+    storage = SQLiteStorage(Path(settings.db.path), write_batch=settings.db.write_batch)
+    try:
+        panel = load_backtest_panel(settings, storage)
     finally:
         storage.close()
+    if panel is None:
+        return 1
+
+    sweep = settings.sweep
+    try:
+        combos = sample_grid(sweep.grid, sweep.samples, sweep.seed)
+    except ValueError as exc:
+        print(f"스윕 설정 오류: {exc}", file=sys.stderr)
+        return 1
+    logging.info("파라미터 스윕 시작: %d개 조합, %d종목 × %d일", len(combos), len(panel.symbols), len(panel.dates))
+    results = run_sweep(
+        panel,
+        settings.strategy,
+        settings.risk,
+        combos,
+        config=BacktestConfig(top_n=settings.watch.top_n),
+        workers=sweep.workers,
+        sort_by=sweep.sort_by,
+    )
+    output = write_results(results, Path(sweep.output))
+
+    print(f"=== v5 Trader 파라미터 스윕 ({len(results)}개 조합) ===")
+    for rank, result in enumerate(results[:5], start=1):
+        params = ", ".join(f"{key}={value}" for key, value in result.params.items())
+        summary = result.summary
+        print(
+            f"{rank}. {params} | 수익률 {summary['total_return_pct']:.2f}% "
+            f"| 최대 낙폭 {summary['max_drawdown_pct']:.2f}% | 적중률 {summary['hit_rate_pct']:.2f}%"
+        )
+    print(f"전체 결과: {output}")
+    return 0
+
+
+def run_walk_forward_mode(settings: AppSettings) -> int:
+    storage = SQLiteStorage(Path(settings.db.path), write_batch=settings.db.write_batch)
+    try:
+        panel = load_backtest_panel(settings, storage)
+    finally:
+        storage.close()
+    if panel is None:
+        return 1
+
+    sweep = settings.sweep
+    try:
+        combos = sample_grid(sweep.grid, sweep.samples, sweep.seed)
+        result = walk_forward(
+            panel,
+            settings.strategy,
+            settings.risk,
+            combos,
+            train_days=sweep.train_days,
+            test_days=sweep.test_days,
+            step_days=sweep.step_days,
+            config=BacktestConfig(top_n=settings.watch.top_n),
+            sort_by=sweep.sort_by,
+            workers=sweep.workers,
+            cache_dir=Path(sweep.feature_cache) if sweep.feature_cache else None,
+        )
+    except ValueError as exc:
+        print(f"스윕 설정 오류: {exc}", file=sys.stderr)
+        return 1
+    if not result.windows:
+        print("워크포워드 구간을 만들 수 없습니다. train_days/test_days 또는 일봉 기간을 확인하세요.")
+        return 1
+
+    print(f"=== v5 Trader 워크포워드 ({len(result.windows)}개 구간, {len(combos)}개 조합) ===")
+    for window in result.windows:
+        params = ", ".join(f"{key}={value}" for key, value in window.params.items())
+        print(
+            f"{window.test_start.date()} ~ {window.test_end.date()} | {params} "
+            f"| 표본 내 {window.train['total_return_pct']:.2f}% → 표본 외 {window.test['total_return_pct']:.2f}%"
+        )
+    summary = result.summary()
+    print(
+        f"표본 외 누적 수익률: {summary['total_return_pct']:.2f}% | 최대 낙폭: {summary['max_drawdown_pct']:.2f}% "
+        f"| 거래 {summary['trades']}건 | 적중률 {summary['hit_rate_pct']:.2f}%"
+    )
+    return 0
 
 
 def run_ui_mode() -> int:
@@ -319,6 +576,18 @@ def main(argv: Sequence[str] | None = None) -> int:
     if args.ui:
         return run_ui_mode()
 
+    if args.monitor:
+        return run_monitor_mode(settings)
+
+    if args.backtest:
+        return run_backtest_mode(settings)
+
+    if args.sweep:
+        return run_sweep_mode(settings)
+
+    if args.walk_forward:
+        return run_walk_forward_mode(settings)
+
     if args.scan:
         return run_scan_mode(settings, loop=args.loop)
 
@@ -19,7 +19,7 @@ from app.main import (
     resolve_universe,
 )
 from config.schema import AppSettings, load_settings
-from core.entities import Candle, Position
+from core.entities import Candle, CandleFrame, Position
 
 logger = logging.getLogger(__name__)
 
@@ -29,22 +29,11 @@ TAB_RECO = "추천"
 TAB_HOLD = "보유/알림"
 
 
-def _candles_to_df(candles: Iterable[Candle]) -> pd.DataFrame:
-    rows = [
-        {
-            "timestamp": candle.timestamp,
-            "open": candle.open,
-            "high": candle.high,
-            "low": candle.low,
-            "close": candle.close,
-            "volume": candle.volume,
-        }
-        for candle in candles
-    ]
-    df = pd.DataFrame(rows)
-    if not df.empty:
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-    return df
+def _candles_to_df(candles: Iterable[Candle] | CandleFrame) -> pd.DataFrame:
+    frame = candles if isinstance(candles, CandleFrame) else CandleFrame.from_candles(candles)
+    if not len(frame):
+        return pd.DataFrame()
+    return frame.to_pandas()
 
 
 def _resolve_name(symbol: str, market) -> str:
@@ -135,10 +124,14 @@ def _prepare_positions(
                 position.pnl_pct = (position.last_price - position.avg_price) / position.avg_price
             except ZeroDivisionError:  # pragma: no cover - defensive
                 position.pnl_pct = 0.0
+        enriched.append(position)
+    tracker = getattr(risk, "tracker", None)
+    if tracker is not None:
+        tracker.sync(enriched)
+    for position in enriched:
         if position.trail_stop == 0 and position.last_price:
             position.trail_stop = position.last_price
-        storage.upsert_position(position, timestamp)
-        enriched.append(position)
+    storage.upsert_positions(enriched, timestamp)
 
     exit_signals = handle_exit_signals(
         enriched,
@@ -1022,9 +1015,20 @@ def _render_tabs(
         )
 
 
+@st.cache_resource(show_spinner=False)
+def _dependencies(settings_json: str):
+    """Build the app dependencies once per process (per settings) instead of on every rerun.
+
+    The storage owns a writer thread and the broker/market hold HTTP sessions,
+    so rebuilding them on each rerun would leak threads and connections.
+    """
+
+    return build_dependencies(AppSettings.model_validate_json(settings_json))
+
+
 def render() -> None:
     settings = load_settings()
-    storage, market, broker, notifier, strategy, risk = build_dependencies(settings)
+    storage, market, broker, notifier, strategy, risk = _dependencies(settings.model_dump_json())
 
     st.set_page_config(page_title="v5 Trader", layout="wide", initial_sidebar_state="collapsed")
     _render_environment(settings, market, broker)
@@ -1037,7 +1041,12 @@ def render() -> None:
     position_symbols = {pos.symbol for pos in raw_positions if pos.qty > 0}
     symbols_for_candles = sorted(set(universe_symbols) | position_symbols)
     max_period = max([120, *settings.chart.periods]) if settings.chart.periods else 120
-    candles_by_symbol = collect_candles(market, symbols_for_candles, limit=max_period)
+    candles_by_symbol = collect_candles(
+        market,
+        symbols_for_candles,
+        limit=max_period,
+        max_workers=settings.market.max_workers,
+    )
 
     strategy_signals = strategy.screen_candidates(candles_by_symbol, settings.watch.top_n)
     if show_names:
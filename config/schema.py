@@ -24,6 +24,19 @@ class DatabaseSettings(BaseModel):
     model_config = ConfigDict(extra="ignore")
 
     path: str = Field(default="v5_rewrite.db")
+    write_batch: int = Field(default=256, ge=1)
+
+
+class RetentionSettings(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    enabled: bool = Field(default=True)
+    interval_sec: float = Field(default=3600.0, gt=0)
+    batch_size: int = Field(default=1000, ge=1)
+    max_age_days: dict[str, float] = Field(default_factory=lambda: {"INFO": 7.0, "*": 90.0})
+    max_rows: dict[str, int] = Field(default_factory=lambda: {"INFO": 20000, "*": 100000})
+    vacuum_pages: int = Field(default=0, ge=0)
+    archive_dir: str = Field(default="")
 
 
 class StrategySettings(BaseModel):
@@ -32,6 +45,8 @@ class StrategySettings(BaseModel):
     return_threshold: float = Field(default=1.0, ge=0)
     intensity: float = Field(default=1.0, ge=0)
     volume_rank: float = Field(default=0.5, ge=0)
+    workers: int = Field(default=1, ge=1, le=64)
+    parallel_min_symbols: int = Field(default=2000, ge=0)
 
 
 class UISettings(BaseModel):
@@ -77,12 +92,57 @@ class RiskSettings(BaseModel):
     trailing_pct: float = Field(default=0.03, ge=0)
     daily_loss_limit_r: float = Field(default=-3.0)
     max_positions: int = Field(default=3, ge=1)
+    trail_flush_size: int = Field(default=64, ge=1)
+    trail_flush_sec: float = Field(default=5.0, ge=0)
+
+
+class MonitorSettings(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    feed: str = Field(default="poll", pattern="^(poll|replay)$")
+    poll_sec: float = Field(default=1.0, gt=0)
+    resync_sec: float = Field(default=30.0, ge=1)
+    max_concurrency: int = Field(default=4, ge=1, le=32)
+    replay_path: str = Field(default="")
+    replay_speed: float = Field(default=1.0, ge=0)
+
+
+class SweepSettings(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    grid: dict[str, list[float]] = Field(
+        default_factory=lambda: {
+            "return_threshold": [0.8, 1.0, 1.2],
+            "intensity": [0.6, 0.8, 1.0],
+            "stop_loss_pct": [0.05, 0.07],
+            "take_profit_pct": [0.12, 0.18],
+        }
+    )
+    samples: int = Field(default=0, ge=0)
+    seed: int = Field(default=42)
+    workers: int = Field(default=1, ge=0, le=64)
+    output: str = Field(default="sweep_results.csv")
+    sort_by: str = Field(
+        default="total_return_pct",
+        pattern=r"^(total_return_pct|pnl|final_equity|max_drawdown_pct|hit_rate_pct|trades)$",
+    )
+    train_days: int = Field(default=250, ge=1)
+    test_days: int = Field(default=60, ge=1)
+    step_days: int = Field(default=0, ge=0)
+    feature_cache: str = Field(default="feature_cache")
 
 
 class MarketSettings(BaseModel):
     model_config = ConfigDict(extra="ignore")
 
     provider: str = Field(default="mock", pattern="^(mock|kis)$")
+    max_workers: int = Field(default=8, ge=1, le=64)
+    candle_store: bool = Field(default=True)
+    cache_size: int = Field(default=512, ge=0)
+    cache_ttl: dict[str, float] = Field(default_factory=dict)
+    bar_capacity: int = Field(default=512, ge=2)
+    intraday_timeframes: list[str] = Field(default_factory=lambda: ["1m", "5m", "15m"])
+    intraday_refresh_sec: float = Field(default=5.0, ge=0.0)
 
 
 class BrokerSettings(BaseModel):
@@ -96,6 +156,11 @@ class KISSettings(BaseModel):
 
     keys_path: str = Field(default="config/kis.keys.toml")
     paper: bool = Field(default=True)
+    rate_per_sec: float | None = Field(default=None, gt=0)
+    tr_rate_limits: dict[str, float] = Field(default_factory=dict)
+    pool_size: int = Field(default=16, ge=1)
+    max_retries: int = Field(default=3, ge=0)
+    backoff_factor: float = Field(default=0.3, ge=0)
 
 
 class DisplaySettings(BaseModel):
@@ -110,6 +175,7 @@ class AppSettings(BaseModel):
     mode: str = Field(default="mock", pattern="^(mock|paper|live)$")
     notifier: NotifierSettings = Field(default_factory=NotifierSettings)
     db: DatabaseSettings = Field(default_factory=DatabaseSettings)
+    retention: RetentionSettings = Field(default_factory=RetentionSettings)
     strategy: StrategySettings = Field(default_factory=StrategySettings)
     ui: UISettings = Field(default_factory=UISettings)
     trade: TradeSettings = Field(default_factory=TradeSettings)
@@ -120,6 +186,8 @@ class AppSettings(BaseModel):
     broker: BrokerSettings = Field(default_factory=BrokerSettings)
     kis: KISSettings = Field(default_factory=KISSettings)
     display: DisplaySettings = Field(default_factory=DisplaySettings)
+    sweep: SweepSettings = Field(default_factory=SweepSettings)
+    monitor: MonitorSettings = Field(default_factory=MonitorSettings)
 
 
 def load_settings(path: Path | None = None) -> AppSettings:
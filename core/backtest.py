@@ -0,0 +1,372 @@
+"""Vectorised daily backtest for StrategyV5 picks and the RiskManager exit rules.
+
+Candles are held as a dense ``(5, symbols, days)`` panel with NaN for missing
+bars. Features for every (symbol, day) window are computed up front in chunks
+with the ``core.scoring`` batch path; the day loop then only touches a handful of
+per-symbol arrays (quantity, entry price, high-water mark), so years of
+history over thousands of symbols replay in seconds.
+
+Replay rules, per trading day ``t``:
+
+1. Orders decided on day ``t - 1`` fill at the open of ``t`` (sells first),
+   with slippage and fees applied. Entries size to ``equity / max_positions``.
+2. Open positions are marked at the close of ``t``.
+3. Exit rules run on the close through ``core.risk.evaluate_exits``
+   (stop_loss, trailing, take_profit; no hard stop); the trailing reference is
+   the highest close since entry. Triggered positions are sold on the next open.
+4. The day's ``top_n`` screen picks that are not held are bought on the next
+   open while ``max_positions`` allows.
+
+A symbol is eligible on day ``t`` only when it has ``LOOKBACK + 1``
+consecutive bars ending at ``t``.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Iterable, Mapping, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from core.entities import OHLCV_FIELDS, Candle
+from core.risk import EXIT_TYPES, RiskConfigProtocol, evaluate_exits
+from core.rolling import RollingScoreState
+from core.scoring import LOOKBACK, FeatureBatch, batch_supported, compute_features
+
+
+@dataclass(slots=True)
+class CandlePanel:
+    """Dense OHLCV history: ``values[field, symbol, day]``, NaN where a bar is missing."""
+
+    symbols: list[str]
+    dates: list[datetime]
+    values: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]) -> "CandlePanel":
+        """Build a panel from ``(symbol, ts, open, high, low, close, volume)`` rows."""
+
+        if not rows:
+            return cls([], [], np.empty((len(OHLCV_FIELDS), 0, 0)))
+        columns = list(zip(*rows))
+        symbols, sym_idx = np.unique(np.asarray(columns[0], dtype=object).astype(str), return_inverse=True)
+        stamps, day_idx = np.unique(np.asarray(columns[1], dtype=object).astype(str), return_inverse=True)
+        values = np.full((len(OHLCV_FIELDS), len(symbols), len(stamps)), np.nan)
+        for row, column in enumerate(columns[2:]):
+            values[row, sym_idx, day_idx] = np.asarray(column, dtype=np.float64)
+        dates = [datetime.fromisoformat(ts) for ts in stamps.tolist()]
+        return cls(symbols.tolist(), dates, values)
+
+    @classmethod
+    def from_candles(cls, candles_by_symbol: Mapping[str, Iterable[Candle]]) -> "CandlePanel":
+        rows = [
+            (symbol, candle.timestamp.isoformat(), *(getattr(candle, name) for name in OHLCV_FIELDS))
+            for symbol, candles in candles_by_symbol.items()
+            for candle in candles
+        ]
+        return cls.from_rows(rows)
+
+    def slice(self, start: int, stop: int) -> "CandlePanel":
+        """Days ``start:stop`` as a view (no copy of the values)."""
+
+        return CandlePanel(self.symbols, self.dates[start:stop], self.values[:, :, start:stop])
+
+    @property
+    def open(self) -> np.ndarray:
+        return self.values[0]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.values[3]
+
+
+@dataclass(slots=True)
+class BacktestConfig:
+    initial_cash: float = 10_000_000.0
+    top_n: int = 5
+    fee_rate: float = 0.00015  # 매수/매도 각각 체결 금액 대비
+    slippage: float = 0.0005  # 시가 대비 불리한 방향으로 적용
+    chunk_days: int = 16
+
+
+@dataclass(slots=True)
+class BacktestTrade:
+    symbol: str
+    entry_date: datetime
+    exit_date: datetime
+    qty: int
+    entry_price: float
+    exit_price: float
+    reason: str
+    fees: float = 0.0
+
+    @property
+    def pnl(self) -> float:
+        return (self.exit_price - self.entry_price) * self.qty - self.fees
+
+    @property
+    def return_pct(self) -> float:
+        return self.exit_price / self.entry_price - 1
+
+
+@dataclass(slots=True)
+class BacktestResult:
+    dates: list[datetime]
+    equity: np.ndarray
+    trades: list[BacktestTrade] = field(default_factory=list)
+    open_positions: int = 0
+
+    @property
+    def pnl(self) -> float:
+        return float(self.equity[-1] - self.equity[0]) if len(self.equity) else 0.0
+
+    @property
+    def total_return(self) -> float:
+        return float(self.equity[-1] / self.equity[0] - 1) if len(self.equity) else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        if not self.trades:
+            return 0.0
+        return sum(trade.pnl > 0 for trade in self.trades) / len(self.trades)
+
+    @property
+    def max_drawdown(self) -> float:
+        if not len(self.equity):
+            return 0.0
+        peaks = np.maximum.accumulate(self.equity)
+        return float(np.max((peaks - self.equity) / peaks))
+
+    def summary(self) -> dict[str, float | int | str]:
+        return {
+            "start": self.dates[0].date().isoformat() if self.dates else "",
+            "end": self.dates[-1].date().isoformat() if self.dates else "",
+            "final_equity": round(float(self.equity[-1]), 2) if len(self.equity) else 0.0,
+            "pnl": round(self.pnl, 2),
+            "total_return_pct": round(self.total_return * 100, 2),
+            "max_drawdown_pct": round(self.max_drawdown * 100, 2),
+            "trades": len(self.trades),
+            "hit_rate_pct": round(self.hit_rate * 100, 2),
+            "open_positions": self.open_positions,
+        }
+
+
+def panel_features(panel: CandlePanel, chunk_days: int = 16) -> FeatureBatch:
+    """Return StrategyV5 features as ``(symbols, days)`` arrays, NaN where a symbol is not eligible.
+
+    Features do not depend on the strategy weights, so a parameter sweep
+    computes them once and only re-runs ``FeatureBatch.score``.
+    """
+
+    values = panel.values
+    _, count, days = values.shape
+    window = LOOKBACK + 1
+    columns = [np.full((count, days), np.nan) for _ in range(5)]
+    features = FeatureBatch(*columns, lookback=LOOKBACK)
+    if count == 0 or days < window:
+        return features
+
+    views = sliding_window_view(values, window, axis=2)  # (5, symbols, days - window + 1, window)
+    positions = days - window + 1
+    step = max(int(chunk_days), 1)
+    for start in range(0, positions, step):
+        stop = min(start + step, positions)
+        block = views[:, :, start:stop].reshape(len(OHLCV_FIELDS), -1, window)
+        chunk = [np.full(block.shape[1], np.nan) for _ in range(5)]
+        finite = np.isfinite(block).all(axis=(0, 2))
+        supported = finite & batch_supported(*block)
+        rows = np.flatnonzero(supported)
+        if rows.size:
+            batch = compute_features(*block[:, rows])
+            for target, source in zip(chunk, _feature_arrays(batch)):
+                target[rows] = source
+        # Zero closes inside the window: exact scalar features, as score_symbol would see them.
+        for row in np.flatnonzero(finite & ~supported).tolist():
+            state = RollingScoreState()
+            state.reset(Candle("", datetime.min, *block[:, row, col].tolist()) for col in range(window))
+            scalar = state.features()
+            for target, value in zip(chunk, _feature_arrays(scalar)):
+                target[row] = value
+        for target, source in zip(columns, chunk):
+            target[:, start + window - 1 : stop + window - 1] = source.reshape(count, stop - start)
+    return features
+
+
+def _feature_arrays(features) -> tuple:
+    return (
+        features.change_pct,
+        features.momentum_pct,
+        features.volatility,
+        features.volume_rank,
+        features.range_ratio,
+    )
+
+
+def score_panel(strategy, panel: CandlePanel, chunk_days: int = 16) -> np.ndarray:
+    """Return ``(symbols, days)`` StrategyV5 scores, NaN where a symbol is not eligible.
+
+    Each score equals ``StrategyV5.score_symbol`` on the same 21-bar window.
+    """
+
+    return panel_features(panel, chunk_days).score(strategy.settings)
+
+
+def daily_picks(scores: np.ndarray, top_n: int) -> np.ndarray:
+    """Return ``(days, top_n)`` symbol indices per day in screen order, -1 where empty.
+
+    Ties keep symbol order, like ``StrategyV5.screen_candidates``. Only the
+    entries at or above each day's ``top_n``-th score are sorted.
+    """
+
+    count, days = scores.shape
+    picks = np.full((days, max(top_n, 0)), -1, dtype=np.intp)
+    if top_n <= 0 or scores.size == 0:
+        return picks
+    keyed = np.where(np.isfinite(scores), -scores, np.inf).T
+    if top_n < count:
+        cutoff = np.partition(keyed, top_n - 1, axis=1)[:, top_n - 1]
+        candidates = (keyed <= cutoff[:, None]) & np.isfinite(keyed)
+    else:
+        candidates = np.isfinite(keyed)
+    day_idx, sym_idx = np.nonzero(candidates)
+    order = np.lexsort((sym_idx, keyed[day_idx, sym_idx], day_idx))
+    day_idx, sym_idx = day_idx[order], sym_idx[order]
+    rank = np.arange(len(day_idx)) - np.searchsorted(day_idx, day_idx)
+    keep = rank < top_n
+    picks[day_idx[keep], rank[keep]] = sym_idx[keep]
+    return picks
+
+
+def run_backtest(
+    strategy,
+    panel: CandlePanel,
+    risk: RiskConfigProtocol,
+    config: BacktestConfig | None = None,
+    *,
+    features: FeatureBatch | None = None,
+) -> BacktestResult:
+    """Replay ``panel``; pass precomputed ``panel_features`` to skip feature extraction."""
+
+    config = config or BacktestConfig()
+    if features is None:
+        features = panel_features(panel, config.chunk_days)
+    opens, closes = panel.open, panel.close
+    count, days = closes.shape
+    picks = daily_picks(features.score(strategy.settings), config.top_n)
+
+    qty = np.zeros(count, dtype=np.int64)
+    entry = np.zeros(count)
+    entry_day = np.zeros(count, dtype=np.intp)
+    high_water = np.zeros(count)
+    mark = np.zeros(count)  # last known close, for symbols without a bar today
+    pending_exit = np.zeros(count, dtype=np.int8)
+    no_hard_stop = np.zeros(count)
+    pending_entry: list[int] = []
+    cash = float(config.initial_cash)
+    equity = np.empty(days)
+    trades: list[BacktestTrade] = []
+    max_positions = max(int(risk.max_positions), 1)
+
+    for day in range(days):
+        day_open = opens[:, day]
+
+        # 1) 전일 결정된 주문을 당일 시가에 체결 (매도 먼저)
+        sells = np.flatnonzero((pending_exit > 0) & (qty > 0) & np.isfinite(day_open))
+        if sells.size:
+            prices = day_open[sells] * (1 - config.slippage)
+            proceeds = prices * qty[sells]
+            cash += float(np.sum(proceeds * (1 - config.fee_rate)))
+            for idx, price in zip(sells.tolist(), prices.tolist()):
+                trades.append(
+                    BacktestTrade(
+                        symbol=panel.symbols[idx],
+                        entry_date=panel.dates[entry_day[idx]],
+                        exit_date=panel.dates[day],
+                        qty=int(qty[idx]),
+                        entry_price=float(entry[idx]),
+                        exit_price=price,
+                        reason=EXIT_TYPES[pending_exit[idx]],
+                        fees=(float(entry[idx]) + price) * int(qty[idx]) * config.fee_rate,
+                    )
+                )
+            qty[sells] = 0
+            pending_exit[sells] = 0
+
+        if pending_entry:
+            held = int(np.count_nonzero(qty))
+            equity_now = cash + float(np.sum(qty * mark))
+            budget = equity_now / max_positions
+            for idx in pending_entry:
+                price = day_open[idx]
+                if held >= max_positions or not math.isfinite(price) or qty[idx]:
+                    continue
+                price *= 1 + config.slippage
+                shares = int(min(budget, cash) // (price * (1 + config.fee_rate)))
+                if shares <= 0:
+                    continue
+                cash -= shares * price * (1 + config.fee_rate)
+                qty[idx] = shares
+                entry[idx] = price
+                entry_day[idx] = day
+                high_water[idx] = price
+                mark[idx] = price
+                held += 1
+            pending_entry = []
+
+        # 2) 종가 평가
+        day_close = closes[:, day]
+        traded = np.isfinite(day_close)
+        mark[traded] = day_close[traded]
+        held_idx = np.flatnonzero(qty)
+        equity[day] = cash + float(np.sum(qty[held_idx] * mark[held_idx]))
+
+        # 3) 청산 규칙 (당일 봉이 있는 보유 종목만)
+        live = held_idx[traded[held_idx]]
+        if live.size:
+            _, codes = evaluate_exits(mark[live], entry[live], high_water[live], no_hard_stop[: live.size], risk)
+            pending_exit[live] = codes
+            high_water[live] = np.maximum(high_water[live], mark[live])
+
+        # 4) 스크리닝 상위 종목 신규 진입 예약
+        free = max_positions - (held_idx.size - int(np.count_nonzero(pending_exit[held_idx])))
+        if free > 0:
+            for idx in picks[day].tolist():
+                if idx < 0 or len(pending_entry) >= free:
+                    break
+                if not qty[idx]:
+                    pending_entry.append(idx)
+
+    return BacktestResult(
+        dates=list(panel.dates),
+        equity=equity,
+        trades=trades,
+        open_positions=int(np.count_nonzero(qty)),
+    )
+
+
+def load_panel(
+    storage,
+    symbols: Iterable[str] | None = None,
+    *,
+    timeframe: str = "D",
+    start: date | None = None,
+    end: date | None = None,
+) -> CandlePanel:
+    """Build a panel from the SQLite ``candles`` table."""
+
+    return CandlePanel.from_rows(storage.load_candle_rows(timeframe, symbols, start, end))
+
+
+__all__ = [
+    "BacktestConfig",
+    "BacktestResult",
+    "BacktestTrade",
+    "CandlePanel",
+    "daily_picks",
+    "load_panel",
+    "panel_features",
+    "run_backtest",
+    "score_panel",
+]
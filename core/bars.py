@@ -0,0 +1,430 @@
+"""Fixed-memory bar storage and intraday bar aggregation.
+
+``BarRing`` keeps the most recent ``capacity`` OHLCV bars of one
+(symbol, timeframe) in preallocated NumPy arrays. Every bar is written twice,
+at ``slot`` and ``slot + capacity``, so the last N bars are always one
+contiguous slice and :meth:`BarRing.window` returns a ``CandleFrame`` view
+without copying. A window of N bars stays valid for the next
+``capacity - N`` appends; updates of the last bar show through it.
+``BarStore`` holds one ring per (symbol, timeframe). Fetched series are merged
+by bar period (trading date for daily bars, bucket start for ``"Nm"``), so a
+provider that stamps bars with the fetch time does not add duplicates, and the
+fetched bars replace the held bars of the period they cover.
+
+``BarAggregator`` builds 1-minute bars from ticks (``add_tick``) or minute
+snapshots such as the KIS intraday chart (``add_bar``) and rolls them
+incrementally into the configured higher timeframes (5m, 15m, ...) inside a
+``BarStore``. The in-progress bar of every timeframe is the last bar of its
+ring and is updated in place, so any configured timeframe is served from the
+same store and higher timeframes never need the minute data fetched again.
+
+Intraday bars are stamped with their bucket start (minute-of-day floor of
+the source timestamp, naive KST). A bar is completed when data for a later
+bucket arrives or when :meth:`BarAggregator.close_due` is called with the
+current time.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from core.entities import OHLCV_FIELDS, BarEvent, Candle, CandleFrame, PriceTick, _to_epoch_ns
+
+BASE_MINUTES = 1
+KST = timezone(timedelta(hours=9))
+DEFAULT_CAPACITY = 512
+
+
+class BarRing:
+    """Preallocated OHLCV ring buffer for one (symbol, timeframe)."""
+
+    __slots__ = ("symbol", "capacity", "tz", "_ts", "_values", "_count")
+
+    def __init__(self, symbol: str, capacity: int = DEFAULT_CAPACITY, tz: tzinfo | None = None) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.symbol = symbol
+        self.capacity = int(capacity)
+        self.tz = tz
+        self._ts = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._values = np.zeros((len(OHLCV_FIELDS), 2 * self.capacity), dtype=np.float64)
+        self._count = 0  # 누적 append 횟수
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    @property
+    def nbytes(self) -> int:
+        return self._ts.nbytes + self._values.nbytes
+
+    def _write(self, slot: int, candle: Candle) -> None:
+        stamp = _to_epoch_ns(candle.timestamp)
+        row = (candle.open, candle.high, candle.low, candle.close, candle.volume)
+        for index in (slot, slot + self.capacity):
+            self._ts[index] = stamp
+            self._values[:, index] = row
+
+    def append(self, candle: Candle) -> None:
+        if self._count == 0:
+            self.tz = candle.timestamp.tzinfo
+        self._write(self._count % self.capacity, candle)
+        self._count += 1
+
+    def update_last(self, candle: Candle) -> None:
+        """Overwrite the newest bar (e.g. today's or the in-progress bar)."""
+
+        if self._count == 0:
+            self.append(candle)
+        else:
+            self._write((self._count - 1) % self.capacity, candle)
+
+    def upsert(self, candle: Candle) -> bool:
+        """Append a newer bar or replace the newest one; older bars are ignored."""
+
+        last = self.last_ns
+        stamp = _to_epoch_ns(candle.timestamp)
+        if last is None or stamp > last:
+            self.append(candle)
+        elif stamp == last:
+            self.update_last(candle)
+        else:
+            return False
+        return True
+
+    def clear(self) -> None:
+        self._count = 0
+
+    def load(self, timestamp: np.ndarray, values: np.ndarray, tz: tzinfo | None = None) -> None:
+        """Replace the contents with the last ``capacity`` bars of the given arrays."""
+
+        size = min(len(timestamp), self.capacity)
+        stamps = np.array(timestamp[len(timestamp) - size :], dtype=np.int64)
+        block = np.array(values[:, values.shape[1] - size :], dtype=np.float64)
+        for start in (0, self.capacity):
+            self._ts[start : start + size] = stamps
+            self._values[:, start : start + size] = block
+        self._count = size
+        self.tz = tz
+
+    def _end(self) -> int:
+        return (self._count - 1) % self.capacity + self.capacity + 1
+
+    @property
+    def last_ns(self) -> int | None:
+        return int(self._ts[self._end() - 1]) if self._count else None
+
+    @property
+    def first_ns(self) -> int | None:
+        return int(self._ts[self._end() - len(self)]) if self._count else None
+
+    def last(self) -> Candle | None:
+        return self.window(1)[0] if self._count else None
+
+    def window(self, count: int | None = None) -> CandleFrame:
+        """The last ``count`` bars (all held bars by default) as a zero-copy ``CandleFrame``."""
+
+        size = len(self) if count is None else min(max(int(count), 0), len(self))
+        if size == 0:
+            return CandleFrame(self.symbol, self._ts[:0], self._values[:, :0], self.tz)
+        end = self._end()
+        return CandleFrame(self.symbol, self._ts[end - size : end], self._values[:, end - size : end], self.tz)
+
+
+class BarStore:
+    """One ``BarRing`` per (symbol, timeframe); memory is bounded by ``capacity`` bars per key."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        self.capacity = max(int(capacity), 1)
+        self._rings: dict[tuple[str, str], BarRing] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._rings
+
+    @property
+    def nbytes(self) -> int:
+        return sum(ring.nbytes for ring in list(self._rings.values()))
+
+    def ring(self, symbol: str, timeframe: str) -> BarRing:
+        ring = self._rings.get((symbol, timeframe))
+        if ring is None:
+            with self._lock:
+                ring = self._rings.setdefault((symbol, timeframe), BarRing(symbol, self.capacity))
+        return ring
+
+    def get(self, symbol: str, timeframe: str) -> BarRing | None:
+        return self._rings.get((symbol, timeframe))
+
+    def upsert(self, timeframe: str, candle: Candle) -> bool:
+        with self._lock:
+            return self.ring(candle.symbol, timeframe).upsert(candle)
+
+    def merge(self, symbol: str, timeframe: str, candles: Sequence[Candle] | CandleFrame) -> BarRing:
+        """Bring the ring up to date with a fetched series (oldest first).
+
+        Bars are matched by period (see :func:`bar_keys`). When the held bars
+        of the fetched range equal the fetch, only the newest bar is updated
+        and later bars are appended; otherwise (revised history, a deeper or
+        older fetch) the ring is rebuilt as held-before + fetched + held-after.
+        """
+
+        with self._lock:
+            ring = self.ring(symbol, timeframe)
+            if not len(candles):
+                return ring
+            fetched = candles if isinstance(candles, CandleFrame) else CandleFrame.from_candles(candles, symbol)
+            if np.shares_memory(fetched.timestamp, ring._ts):
+                return ring  # 링 자신의 뷰(집계기가 채운 분봉)
+            held = ring.window()
+            if not len(held):
+                ring.load(fetched.timestamp, fetched.values, fetched.tz)
+                return ring
+            new_keys = bar_keys(timeframe, fetched.timestamp, fetched.tz)
+            held_keys = bar_keys(timeframe, held.timestamp, held.tz)
+            lo = int(np.searchsorted(held_keys, new_keys[0], side="left"))
+            hi = int(np.searchsorted(held_keys, new_keys[-1], side="right"))
+            overlap = hi - lo
+            if (
+                hi == len(held)
+                and overlap <= len(fetched)
+                and np.array_equal(held_keys[lo:], new_keys[:overlap])
+                and np.array_equal(held.values[:, lo : hi - 1], fetched.values[:, : max(overlap - 1, 0)])
+            ):
+                if overlap:
+                    ring.update_last(fetched[overlap - 1])
+                for index in range(overlap, len(fetched)):
+                    ring.append(fetched[index])
+                return ring
+            timestamp = np.concatenate([held.timestamp[:lo], fetched.timestamp, held.timestamp[hi:]])
+            values = np.concatenate([held.values[:, :lo], fetched.values, held.values[:, hi:]], axis=1)
+            ring.load(timestamp, values, held.tz if held.tz is not None else fetched.tz)
+            return ring
+
+    def window(self, symbol: str, timeframe: str, count: int | None = None) -> CandleFrame:
+        ring = self._rings.get((symbol, timeframe))
+        if ring is None:
+            return CandleFrame(symbol, np.empty(0, dtype=np.int64), np.empty((len(OHLCV_FIELDS), 0)))
+        return ring.window(count)
+
+    def drop(self, symbol: str | None = None, timeframe: str | None = None) -> None:
+        with self._lock:
+            for key in [k for k in self._rings if symbol in (None, k[0]) and timeframe in (None, k[1])]:
+                del self._rings[key]
+
+
+def bar_keys(timeframe: str, timestamp: np.ndarray, tz: tzinfo | None = None) -> np.ndarray:
+    """Period index of each epoch-ns stamp: the ``"Nm"`` bucket, or the calendar date otherwise.
+
+    Periods are taken on the bar's own wall clock (``tz`` for aware stamps).
+    """
+
+    stamps = np.asarray(timestamp, dtype=np.int64)
+    if tz is not None:
+        offset = tz.utcoffset(datetime.now(tz)) or timedelta(0)
+        stamps = stamps + int(offset.total_seconds()) * 1_000_000_000
+    minutes = timeframe_minutes(timeframe)
+    period = (minutes or 24 * 60) * 60 * 1_000_000_000
+    return stamps // period
+
+
+def timeframe_minutes(timeframe: str) -> int | None:
+    """Minutes for ``"Nm"`` timeframes (``"5m"`` -> 5); ``None`` for anything else."""
+
+    if not timeframe.endswith("m"):
+        return None
+    try:
+        minutes = int(timeframe[:-1])
+    except ValueError:
+        return None
+    return minutes if minutes > 0 else None
+
+
+def bucket_start(ts: datetime, minutes: int) -> datetime:
+    """Start of the ``minutes``-wide bucket containing ``ts`` (aligned to midnight).
+
+    Aware timestamps are converted to naive KST, the convention of the KIS
+    candles, so ticks and fetched bars land in the same buckets.
+    """
+
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(KST).replace(tzinfo=None)
+    of_day = ts.hour * 60 + ts.minute
+    floored = of_day - of_day % minutes
+    return ts.replace(hour=floored // 60, minute=floored % 60, second=0, microsecond=0)
+
+
+def _merge(bar: Candle | None, part: Candle, timestamp: datetime) -> Candle:
+    if bar is None:
+        return Candle(part.symbol, timestamp, part.open, part.high, part.low, part.close, part.volume)
+    return Candle(
+        bar.symbol,
+        timestamp,
+        bar.open,
+        max(bar.high, part.high),
+        min(bar.low, part.low),
+        part.close,
+        bar.volume + part.volume,
+    )
+
+
+@dataclass(slots=True)
+class _Series:
+    timeframe: str
+    minutes: int
+    ring: BarRing
+    live: bool = False  # 링의 마지막 봉이 진행 중인지
+    done: Candle | None = None  # 진행 중인 구간에서 이미 완성된 1분봉들의 합
+
+
+class BarAggregator:
+    """Minute bars from ticks/snapshots, rolled up incrementally into higher timeframes."""
+
+    def __init__(
+        self,
+        timeframes: Iterable[str] = ("1m", "5m", "15m"),
+        maxlen: int = 1024,
+        store: BarStore | None = None,
+    ) -> None:
+        minutes = {BASE_MINUTES}
+        for timeframe in timeframes:
+            value = timeframe_minutes(timeframe)
+            if value is None:
+                raise ValueError(f"unsupported intraday timeframe: {timeframe}")
+            minutes.add(value)
+        self.minutes = sorted(minutes)
+        self.store = store if store is not None else BarStore(maxlen)
+        self._series: dict[str, list[_Series]] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def timeframes(self) -> list[str]:
+        return [f"{minutes}m" for minutes in self.minutes]
+
+    def supports(self, timeframe: str) -> bool:
+        return timeframe_minutes(timeframe) in self.minutes
+
+    def _state(self, symbol: str) -> list[_Series]:
+        state = self._series.get(symbol)
+        if state is None:
+            state = []
+            for minutes in self.minutes:
+                ring = self.store.ring(symbol, f"{minutes}m")
+                ring.clear()
+                state.append(_Series(f"{minutes}m", minutes, ring))
+            self._series[symbol] = state
+        return state
+
+    def reset(self, symbol: str | None = None) -> None:
+        with self._lock:
+            for name in list(self._series) if symbol is None else [symbol]:
+                for series in self._series.pop(name, []):
+                    series.ring.clear()
+
+    # -- ingestion -----------------------------------------------------------------
+
+    def add_tick(self, tick: PriceTick) -> list[BarEvent]:
+        """Apply a trade; return the bars it completed (oldest first)."""
+
+        bucket = bucket_start(tick.timestamp, BASE_MINUTES)
+        price = tick.price
+        trade = Candle(tick.symbol, bucket, price, price, price, price, tick.volume)
+        with self._lock:
+            base = self._state(tick.symbol)[0]
+            current = base.ring.last() if base.live else None
+            if current is not None and current.timestamp == bucket:
+                trade = _merge(current, trade, bucket)
+            return self._set_minute(tick.symbol, trade)
+
+    def add_bar(self, candle: Candle) -> list[BarEvent]:
+        """Apply a 1-minute bar snapshot (the in-progress minute may be sent repeatedly)."""
+
+        bucket = bucket_start(candle.timestamp, BASE_MINUTES)
+        with self._lock:
+            return self._set_minute(candle.symbol, _merge(None, candle, bucket))
+
+    def close_due(self, now: datetime) -> list[BarEvent]:
+        """Complete in-progress bars whose bucket ended before ``now`` for every symbol."""
+
+        events: list[BarEvent] = []
+        with self._lock:
+            for state in self._series.values():
+                base = state[0]
+                if base.live and base.ring.last().timestamp < bucket_start(now, BASE_MINUTES):
+                    events.append(self._close_minute(state))
+                for series in state[1:]:
+                    if series.live and series.ring.last().timestamp < bucket_start(now, series.minutes):
+                        events.append(self._complete(series))
+        return events
+
+    def _complete(self, series: _Series) -> BarEvent:
+        series.live = False
+        series.done = None
+        return BarEvent(series.timeframe, series.ring.last())
+
+    def _close_minute(self, state: list[_Series]) -> BarEvent:
+        # 완성된 1분봉은 상위 구간의 누적분이 된다(링의 마지막 봉에는 이미 반영돼 있다).
+        for series in state[1:]:
+            if series.live:
+                series.done = series.ring.last()
+        return self._complete(state[0])
+
+    def _set_minute(self, symbol: str, minute: Candle) -> list[BarEvent]:
+        """Make ``minute`` the in-progress 1m bar and propagate it to every timeframe."""
+
+        state = self._state(symbol)
+        base = state[0]
+        last = base.ring.last()
+        if last is not None and (minute.timestamp < last.timestamp or (minute.timestamp == last.timestamp and not base.live)):
+            return []  # 이미 완성된 분의 늦은 데이터는 무시
+        events: list[BarEvent] = []
+        if base.live and minute.timestamp > last.timestamp:
+            events.append(self._close_minute(state))
+        base.ring.upsert(minute)
+        base.live = True
+        for series in state[1:]:
+            bucket = bucket_start(minute.timestamp, series.minutes)
+            if series.live and series.ring.last().timestamp < bucket:
+                events.append(self._complete(series))
+            series.ring.upsert(_merge(series.done, minute, bucket))
+            series.live = True
+        return events
+
+    # -- queries -------------------------------------------------------------------
+
+    def last_minute(self, symbol: str) -> datetime | None:
+        """Timestamp of the newest 1-minute bar held for ``symbol``."""
+
+        with self._lock:
+            state = self._series.get(symbol)
+            last = state[0].ring.last() if state else None
+            return last.timestamp if last is not None else None
+
+    def depth(self, symbol: str, timeframe: str = "1m") -> int:
+        ring = self.store.get(symbol, timeframe)
+        return len(ring) if ring is not None and symbol in self._series else 0
+
+    def bars(self, symbol: str, timeframe: str, limit: int = 120, include_partial: bool = True) -> CandleFrame:
+        """Up to ``limit`` most recent bars in ascending order, the in-progress bar last."""
+
+        minutes = timeframe_minutes(timeframe)
+        if minutes not in self.minutes:
+            raise ValueError(f"timeframe {timeframe} is not aggregated (have {', '.join(self.timeframes)})")
+        with self._lock:
+            state = self._series.get(symbol)
+            if state is None:
+                return self.store.window(symbol, timeframe, 0)
+            series = state[self.minutes.index(minutes)]
+            if include_partial or not series.live:
+                return series.ring.window(limit)
+            frame = series.ring.window(limit + 1)
+            return frame[: len(frame) - 1]
+
+
+__all__ = ["BarAggregator", "BarRing", "BarStore", "bar_keys", "bucket_start", "timeframe_minutes"]
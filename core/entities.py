@@ -1,8 +1,17 @@
 from __future__ import annotations
 
+import heapq
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Iterable, Sequence
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import pandas as pd
+
+_EPOCH = datetime(1970, 1, 1)
+OHLCV_FIELDS: tuple[str, ...] = ("open", "high", "low", "close", "volume")
 
 
 @dataclass(slots=True)
@@ -27,6 +36,125 @@ class Candle:
         return self.high - self.low
 
 
+def _to_epoch_ns(ts: datetime) -> int:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = ts - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1_000
+
+
+def is_quote_bar(candles: Sequence[Candle]) -> bool:
+    """``True`` for a single O=H=L=C bar, the current-price fallback of ``MarketKIS.get_candles``.
+
+    It stands in for a missing daily series and must not be stored as a daily bar.
+    """
+
+    if len(candles) != 1:
+        return False
+    bar = candles[0]
+    return bar.open == bar.high == bar.low == bar.close
+
+
+class CandleFrame:
+    """Columnar candle series for one symbol.
+
+    OHLCV live in a single ``(5, n)`` float64 block (one contiguous row per
+    field) and timestamps in an int64 array of epoch nanoseconds (UTC for
+    tz-aware input, wall clock for naive input). Slicing returns views, and
+    integer indexing / iteration yield ``Candle`` objects so code written
+    against ``list[Candle]`` keeps working.
+    """
+
+    __slots__ = ("symbol", "timestamp", "values", "tz")
+
+    def __init__(
+        self,
+        symbol: str,
+        timestamp: np.ndarray,
+        values: np.ndarray,
+        tz: tzinfo | None = None,
+    ) -> None:
+        self.symbol = symbol
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.tz = tz
+        if self.values.shape != (len(OHLCV_FIELDS), len(self.timestamp)):
+            raise ValueError(f"values must have shape (5, {len(self.timestamp)}), got {self.values.shape}")
+
+    @classmethod
+    def from_candles(cls, candles: Iterable[Candle], symbol: str | None = None) -> "CandleFrame":
+        items = candles if isinstance(candles, Sequence) else list(candles)
+        count = len(items)
+        values = np.empty((len(OHLCV_FIELDS), count), dtype=np.float64)
+        for row, name in enumerate(OHLCV_FIELDS):
+            values[row] = np.fromiter((getattr(c, name) for c in items), dtype=np.float64, count=count)
+        timestamp = np.fromiter((_to_epoch_ns(c.timestamp) for c in items), dtype=np.int64, count=count)
+        tz = items[0].timestamp.tzinfo if count else None
+        return cls(symbol if symbol is not None else (items[0].symbol if count else ""), timestamp, values, tz)
+
+    @property
+    def open(self) -> np.ndarray:
+        return self.values[0]
+
+    @property
+    def high(self) -> np.ndarray:
+        return self.values[1]
+
+    @property
+    def low(self) -> np.ndarray:
+        return self.values[2]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.values[3]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.values[4]
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getitem__(self, key: int | slice) -> "Candle | CandleFrame":
+        if isinstance(key, slice):
+            return CandleFrame(self.symbol, self.timestamp[key], self.values[:, key], self.tz)
+        return self._candle_at(key)
+
+    def __iter__(self) -> Iterator[Candle]:
+        return (self._candle_at(idx) for idx in range(len(self)))
+
+    def _datetime_at(self, idx: int) -> datetime:
+        ts = _EPOCH + timedelta(microseconds=int(self.timestamp[idx]) // 1_000)
+        if self.tz is not None:
+            return ts.replace(tzinfo=timezone.utc).astimezone(self.tz)
+        return ts
+
+    def _candle_at(self, idx: int) -> Candle:
+        open_, high, low, close, volume = self.values[:, idx].tolist()
+        return Candle(self.symbol, self._datetime_at(idx), open_, high, low, close, volume)
+
+    def tail(self, count: int) -> "CandleFrame":
+        return self[-count:] if 0 < count < len(self) else (self if count > 0 else self[:0])
+
+    def to_candles(self) -> list[Candle]:
+        return list(self)
+
+    def to_numpy(self) -> np.ndarray:
+        """Return the ``(5, n)`` OHLCV block itself (no copy)."""
+
+        return self.values
+
+    def to_pandas(self) -> "pd.DataFrame":
+        import pandas as pd
+
+        stamps = self.timestamp.view("M8[ns]")
+        if self.tz is not None:
+            stamps = pd.DatetimeIndex(stamps).tz_localize(timezone.utc).tz_convert(self.tz)
+        columns = {"timestamp": stamps}
+        columns.update(zip(OHLCV_FIELDS, self.values))
+        return pd.DataFrame(columns, copy=False)
+
+
 @dataclass(slots=True)
 class Signal:
     symbol: str
@@ -67,6 +195,42 @@ class ExitSignal:
     triggered_at: datetime
 
 
+@dataclass(slots=True, frozen=True)
+class PriceTick:
+    """A quote/trade event: last price and, when known, the traded volume."""
+
+    symbol: str
+    price: float
+    timestamp: datetime
+    volume: float = 0.0
+
+
+@dataclass(slots=True, frozen=True)
+class BarEvent:
+    """A completed (or updated) bar for ``timeframe``."""
+
+    timeframe: str
+    candle: Candle
+
+    @property
+    def symbol(self) -> str:
+        return self.candle.symbol
+
+    @property
+    def timestamp(self) -> datetime:
+        return self.candle.timestamp
+
+
+MarketEvent = PriceTick | BarEvent
+
+
 def top_n_signals(signals: Iterable[Signal], n: int) -> list[Signal]:
-    ordered = sorted(signals, key=lambda s: s.score, reverse=True)
-    return ordered[:n]
+    """Return the ``n`` best signals, highest score first.
+
+    Uses a bounded heap, so memory stays proportional to ``n``; ties keep their
+    input order exactly like a stable descending sort.
+    """
+
+    if n <= 0:
+        return []
+    return heapq.nlargest(n, signals, key=lambda s: s.score)
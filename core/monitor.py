@@ -0,0 +1,136 @@
+"""Real-time exit monitoring.
+
+``ExitMonitor`` consumes a price feed (``ports.price_feed.IPriceFeed``) for the
+held symbols only and runs the ``core.risk`` rules on every tick through
+``RiskManager.on_price``, so a stop is detected as soon as the feed delivers
+the price instead of on the next scan. Alerts are de-duplicated per
+(symbol, signal type, day), like ``handle_exit_signals``, and sent through
+the notifier from a worker thread. Held positions are re-read from the
+broker every ``resync_sec`` seconds.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable
+
+from core.entities import ExitSignal, PriceTick
+from core.risk import RiskManager, format_exit_message
+from core.trailing import TrailingStopTracker
+
+logger = logging.getLogger(__name__)
+
+KST = timezone(timedelta(hours=9))
+
+
+class ExitMonitor:
+    """Evaluate exit rules on every price tick and push alerts through the notifier."""
+
+    def __init__(
+        self,
+        risk: RiskManager,
+        feed,
+        notifier,
+        *,
+        storage=None,
+        broker=None,
+        resync_sec: float = 30.0,
+        name_resolver: Callable[[str], str | None] | None = None,
+    ) -> None:
+        if risk.tracker is None:
+            risk.tracker = TrailingStopTracker(storage)
+        self.risk = risk
+        self.tracker: TrailingStopTracker = risk.tracker
+        self.feed = feed
+        self.notifier = notifier
+        self.storage = storage
+        self.broker = broker
+        self.resync_sec = resync_sec
+        self.name_resolver = name_resolver
+        self._sent: set[tuple[str, str, date]] = set()
+        self.ticks = 0
+        self.alerts: list[ExitSignal] = []
+        self.max_latency = 0.0
+
+    def held_symbols(self) -> set[str]:
+        return {position.symbol for position in self.tracker.positions()}
+
+    async def resync(self) -> None:
+        """Re-read held positions from the broker."""
+
+        if self.broker is None:
+            return
+        try:
+            positions = await asyncio.to_thread(self.broker.get_positions)
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.warning("보유 종목 동기화 실패: %s", exc)
+            return
+        self.tracker.sync(list(positions))
+        logger.debug("감시 종목: %s", ", ".join(sorted(self.held_symbols())) or "-")
+
+    async def _resync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.resync_sec)
+            await self.resync()
+
+    async def handle(self, tick: PriceTick) -> ExitSignal | None:
+        """Apply one tick; return the exit signal when a new alert was sent."""
+
+        self.ticks += 1
+        signal = self.risk.on_price(tick.symbol, tick.price)
+        if signal is None:
+            return None
+        key = (signal.symbol, signal.signal_type, signal.triggered_at.date())
+        if key in self._sent:
+            return None
+        self._sent.add(key)
+        if self.storage is not None and not self.storage.remember_alert(*key):
+            return None  # 스캔 루프에서 이미 알린 신호
+
+        name = self.name_resolver(signal.symbol) if self.name_resolver else None
+        message = format_exit_message(signal, name)
+        try:
+            await asyncio.to_thread(self.notifier.send, message)
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.warning("토스트 전송 실패(%s): %s", signal.symbol, exc)
+        latency = _latency(tick.timestamp)
+        self.max_latency = max(self.max_latency, latency)
+        self.alerts.append(signal)
+        logger.info("실시간 청산 신호: %s (지연 %.3fs)", message, latency)
+        return signal
+
+    async def _consume(self) -> None:
+        async for tick in self.feed.stream(self.held_symbols):
+            await self.handle(tick)
+
+    async def run(self, stop: asyncio.Event | None = None) -> None:
+        """Monitor until the feed ends or ``stop`` is set."""
+
+        await self.resync()
+        tasks = [asyncio.create_task(self._consume())]
+        if self.broker is not None and self.resync_sec > 0:
+            tasks.append(asyncio.create_task(self._resync_loop()))
+        if stop is not None:
+            tasks.append(asyncio.create_task(stop.wait()))
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.tracker.flush()
+
+
+def _latency(ts: datetime) -> float:
+    """Seconds since ``ts``; naive timestamps (KIS candles, replay files) are KST like ``core.bars``."""
+
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=KST)
+    return (datetime.now(timezone.utc) - ts).total_seconds()
+
+
+__all__ = ["ExitMonitor"]
@@ -0,0 +1,119 @@
+"""Process-pool screening for very large universes.
+
+Score windows are copied once into a shared-memory block per scan; worker
+processes attach to it, score a contiguous shard of rows with
+``StrategyV5._score_arrays`` and send back only their local top-K (index,
+score, reasons). The parent merges the shard winners with the same tie order
+as the single-process path.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Sequence
+
+import numpy as np
+
+from core.entities import OHLCV_FIELDS, CandleFrame
+
+Ranked = tuple[int, float, list[str]]
+
+
+@dataclass(slots=True, frozen=True)
+class _ShardTask:
+    shm_name: str
+    offset: int
+    shape: tuple[int, int, int]
+    start: int
+    stop: int
+    settings: object
+    top_k: int
+
+
+def _score_shard(task: _ShardTask) -> list[Ranked]:
+    """Worker entry point: score rows ``start:stop`` of one group and keep the local top-K."""
+
+    from core.strategy_v5 import StrategyV5
+
+    shm = shared_memory.SharedMemory(name=task.shm_name)
+    try:
+        block = np.ndarray(task.shape, dtype=np.float64, buffer=shm.buf, offset=task.offset)
+        block = block[:, task.start : task.stop]
+        scores, explain = StrategyV5(task.settings)._score_arrays(*block)
+        candidates = np.flatnonzero(np.isfinite(scores)).tolist()
+        top = heapq.nlargest(task.top_k, candidates, key=scores.__getitem__)
+        result = [(task.start + row, float(scores[row]), explain(row)) for row in top]
+        del block, scores, explain  # release the buffer views before closing the segment
+        return result
+    finally:
+        shm.close()
+
+
+def _shards(rows: int, parts: int) -> list[tuple[int, int]]:
+    step = math.ceil(rows / max(parts, 1))
+    return [(start, min(start + step, rows)) for start in range(0, rows, step)]
+
+
+class ProcessScreener:
+    """Score grouped score windows on a pool of worker processes."""
+
+    def __init__(self, settings, workers: int) -> None:
+        self.settings = settings
+        self.workers = max(int(workers), 1)
+        self._pool: ProcessPoolExecutor | None = None
+        # 풀 생성/사용과 close()를 직렬화한다: 동시 rank()가 풀을 둘 만들거나 닫힌 풀에 map하지 않게.
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        """The worker pool, created on first use; call with ``_lock`` held."""
+
+        if self._pool is None:
+            # spawn: the API/CLI processes run thread pools, which fork does not mix with.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def rank(self, groups: Sequence[list[tuple[int, CandleFrame]]], top_n: int) -> list[Ranked]:
+        """Return up to ``top_n`` ``(symbol index, score, reasons)`` per shard, for all groups."""
+
+        if top_n <= 0 or not groups:
+            return []
+        shapes = [(len(OHLCV_FIELDS), len(members), len(members[0][1])) for members in groups]
+        nbytes = sum(int(np.prod(shape)) * 8 for shape in shapes)
+        shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        try:
+            tasks: list[tuple[list[tuple[int, CandleFrame]], _ShardTask]] = []
+            offset = 0
+            for members, shape in zip(groups, shapes):
+                block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, offset=offset)
+                np.stack([window.values for _, window in members], axis=1, out=block)
+                del block
+                for start, stop in _shards(shape[1], self.workers):
+                    task = _ShardTask(shm.name, offset, shape, start, stop, self.settings, top_n)
+                    tasks.append((members, task))
+                offset += int(np.prod(shape)) * 8
+
+            with self._lock:
+                results = list(self._executor().map(_score_shard, [task for _, task in tasks]))
+            ranked: list[Ranked] = []
+            for (members, _), shard in zip(tasks, results):
+                ranked.extend((members[row][0], score, reasons) for row, score, reasons in shard)
+            return ranked
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+__all__ = ["ProcessScreener"]
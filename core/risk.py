@@ -2,9 +2,12 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Protocol
+from typing import Protocol, Sequence
+
+import numpy as np
 
 from core.entities import ExitSignal, Position
+from core.trailing import TrailingStopTracker
 
 
 class RiskConfigProtocol(Protocol):
@@ -27,65 +30,134 @@ class RiskConfig:
 class RiskManager:
     """Evaluate exit signals and track high-level limits."""
 
-    def __init__(self, config: RiskConfigProtocol | None = None) -> None:
+    def __init__(
+        self,
+        config: RiskConfigProtocol | None = None,
+        tracker: TrailingStopTracker | None = None,
+    ) -> None:
         self.config: RiskConfigProtocol = config or RiskConfig()
+        self.tracker = tracker
 
     def evaluate_exit(self, position: Position) -> ExitSignal | None:
         return evaluate_exit(position, self.config)
 
-    def can_open_position(self, current_positions: int) -> bool:
-        return current_positions < self.config.max_positions
-
+    def evaluate_exits(self, positions: Sequence[Position]) -> list[tuple[Position, ExitSignal]]:
+        return exit_signals(positions, self.config)
 
-def _resolve_pct(position: Position) -> float:
-    if position.pnl_pct:
-        return position.pnl_pct
-    if position.avg_price:
-        return (position.last_price - position.avg_price) / position.avg_price
-    return 0.0
+    def on_price(self, symbol: str, price: float) -> ExitSignal | None:
+        """Feed a live price to the trailing-stop tracker and evaluate the held position."""
 
+        if self.tracker is None or self.tracker.update(symbol, price) is None:
+            return None
+        position = self.tracker.get(symbol)
+        return evaluate_exit(position, self.config) if position else None
 
-def evaluate_exit(position: Position, config: RiskConfigProtocol) -> ExitSignal | None:
-    """Return the highest-priority exit signal for the position."""
-
-    pnl_pct = _resolve_pct(position)
-    now = datetime.now(timezone.utc)
+    def can_open_position(self, current_positions: int) -> bool:
+        return current_positions < self.config.max_positions
 
-    if pnl_pct <= -abs(config.stop_loss_pct):
-        return ExitSignal(
-            symbol=position.symbol,
-            signal_type="stop_loss",
-            message=f"손절 트리거: {pnl_pct * 100:.2f}%",
+    def close(self) -> None:
+        if self.tracker is not None:
+            self.tracker.close()
+
+
+EXIT_TYPES: tuple[str, ...] = ("", "stop_loss", "trailing", "take_profit", "hard_stop")
+"""Signal types by code, as returned by :func:`evaluate_exits` (0 = no exit)."""
+
+
+def evaluate_exits(
+    last_price,
+    avg_price,
+    trail_stop,
+    hard_stop,
+    config: RiskConfigProtocol,
+    pnl_pct=None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorised :func:`evaluate_exit` over per-position arrays.
+
+    Returns ``(mask, codes)``: ``codes`` index :data:`EXIT_TYPES` and follow the
+    same priority (stop_loss, trailing, take_profit, hard_stop). A non-zero
+    ``pnl_pct`` entry takes precedence over the one derived from the prices.
+    """
+
+    last = np.asarray(last_price, dtype=np.float64)
+    avg = np.asarray(avg_price, dtype=np.float64)
+    trail = np.asarray(trail_stop, dtype=np.float64)
+    hard = np.asarray(hard_stop, dtype=np.float64)
+    pnl = _resolve_pcts(last, avg, pnl_pct)
+
+    codes = np.zeros(last.shape, dtype=np.int8)
+    # 우선순위가 낮은 규칙부터 기록해 높은 규칙이 덮어쓰게 한다.
+    codes[(hard != 0) & (last <= hard)] = 4
+    codes[pnl >= abs(config.take_profit_pct)] = 3
+    if config.trailing_pct > 0:
+        codes[(trail != 0) & (last <= trail * (1 - config.trailing_pct))] = 2
+    codes[pnl <= -abs(config.stop_loss_pct)] = 1
+    return codes != 0, codes
+
+
+def _resolve_pcts(last: np.ndarray, avg: np.ndarray, pnl_pct) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        derived = np.where(avg != 0, (last - avg) / avg, 0.0)
+    if pnl_pct is None:
+        return derived
+    given = np.asarray(pnl_pct, dtype=np.float64)
+    return np.where(given != 0, given, derived)
+
+
+def _exit_message(code: int, pnl_pct: float, last: float, trail: float, hard: float, config) -> str:
+    if code == 1:
+        return f"손절 트리거: {pnl_pct * 100:.2f}%"
+    if code == 2:
+        threshold = trail * (1 - config.trailing_pct)
+        return f"트레일링 스탑: 현재 {last:,.2f} ≤ 임계 {threshold:,.2f}"
+    if code == 3:
+        return f"익절 트리거: {pnl_pct * 100:.2f}%"
+    return f"하드 스탑: 현재 {last:,.2f} ≤ {hard:,.2f}"
+
+
+def exit_signals(
+    positions: Sequence[Position],
+    config: RiskConfigProtocol,
+    now: datetime | None = None,
+) -> list[tuple[Position, ExitSignal]]:
+    """Evaluate every position in one pass; signals and messages are built only for those that fire."""
+
+    positions = list(positions)
+    if not positions:
+        return []
+    columns = np.array(
+        [
+            (pos.last_price, pos.avg_price, pos.trail_stop, pos.hard_stop, pos.pnl_pct)
+            for pos in positions
+        ],
+        dtype=np.float64,
+    ).T
+    last, avg, trail, hard, given = columns
+    mask, codes = evaluate_exits(last, avg, trail, hard, config, pnl_pct=given)
+    fired = np.flatnonzero(mask)
+    if not fired.size:
+        return []
+    pnl = _resolve_pcts(last, avg, given)
+    now = now or datetime.now(timezone.utc)
+    results: list[tuple[Position, ExitSignal]] = []
+    for idx in fired.tolist():
+        code = int(codes[idx])
+        message = _exit_message(code, float(pnl[idx]), float(last[idx]), float(trail[idx]), float(hard[idx]), config)
+        signal = ExitSignal(
+            symbol=positions[idx].symbol,
+            signal_type=EXIT_TYPES[code],
+            message=message,
             triggered_at=now,
         )
+        results.append((positions[idx], signal))
+    return results
 
-    if position.trail_stop and config.trailing_pct > 0:
-        threshold = position.trail_stop * (1 - config.trailing_pct)
-        if position.last_price <= threshold:
-            return ExitSignal(
-                symbol=position.symbol,
-                signal_type="trailing",
-                message=f"트레일링 스탑: 현재 {position.last_price:,.2f} ≤ 임계 {threshold:,.2f}",
-                triggered_at=now,
-            )
-
-    if pnl_pct >= abs(config.take_profit_pct):
-        return ExitSignal(
-            symbol=position.symbol,
-            signal_type="take_profit",
-            message=f"익절 트리거: {pnl_pct * 100:.2f}%",
-            triggered_at=now,
-        )
 
-    if position.hard_stop and position.last_price <= position.hard_stop:
-        return ExitSignal(
-            symbol=position.symbol,
-            signal_type="hard_stop",
-            message=f"하드 스탑: 현재 {position.last_price:,.2f} ≤ {position.hard_stop:,.2f}",
-            triggered_at=now,
-        )
+def evaluate_exit(position: Position, config: RiskConfigProtocol) -> ExitSignal | None:
+    """Return the highest-priority exit signal for the position."""
 
-    return None
+    fired = exit_signals([position], config)
+    return fired[0][1] if fired else None
 
 
 def format_exit_message(signal: ExitSignal, name: str | None = None) -> str:
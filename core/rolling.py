@@ -0,0 +1,231 @@
+"""Incremental StrategyV5 features for repeated scans.
+
+A ``RollingScoreState`` holds the trailing ``LOOKBACK + 1`` bars of one symbol
+and updates change, momentum, volatility, volume rank and range ratio when a
+bar is appended or the last (still forming) bar is replaced. Volatility is
+kept as exact sums of the returns (integers scaled by 2**1074, the smallest
+float step), so the correctly rounded square root gives the same float as
+``statistics.pstdev`` and scores match a full ``StrategyV5.score_symbol``
+recompute bit for bit.
+"""
+from __future__ import annotations
+
+import math
+from bisect import bisect_left, insort
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable
+
+from core.entities import Candle, CandleFrame
+from core.scoring import LOOKBACK, MIN_BARS, VOLUME_WINDOW
+
+_SQRT_BIT_WIDTH = 2 * 53 + 3
+_SCALE_BITS = 1074  # every finite float is an integer multiple of 2**-1074
+
+
+def _scaled(value: float) -> int:
+    num, den = value.as_integer_ratio()
+    return num << (_SCALE_BITS + 1 - den.bit_length())
+
+
+def _isqrt_frac_rto(n: int, m: int) -> int:
+    """Square root of n/m rounded to an integer with round-to-odd."""
+
+    a = math.isqrt(n // m)
+    return a | (a * a * m != n)
+
+
+def float_sqrt_of_frac(n: int, m: int) -> float:
+    """Correctly rounded ``sqrt(n / m)`` for non-negative integers ``n`` and ``m > 0``."""
+
+    q = (n.bit_length() - m.bit_length() - _SQRT_BIT_WIDTH) // 2
+    if q >= 0:
+        return float(_isqrt_frac_rto(n, m << 2 * q) << q)
+    return _isqrt_frac_rto(n << -2 * q, m) / (1 << -q)
+
+
+@dataclass(slots=True)
+class Features:
+    change_pct: float
+    momentum_pct: float
+    volatility: float
+    volume_rank: float
+    range_ratio: float
+    lookback: int
+
+
+def _finite(candle: Candle) -> bool:
+    # An overflowing sum only routes the window through the exact fallback.
+    return math.isfinite(candle.open + candle.high + candle.low + candle.close + candle.volume)
+
+
+class RollingScoreState:
+    """Trailing-window StrategyV5 features for one symbol, updated bar by bar."""
+
+    __slots__ = ("bars", "_returns", "_sum", "_sum_sq", "_count", "_volumes", "_bad", "_features")
+
+    def __init__(self) -> None:
+        self.bars: deque[Candle] = deque()
+        # One slot per consecutive bar pair in ``bars``; None when the older close is 0.
+        self._returns: deque[float | None] = deque()
+        self._sum = 0
+        self._sum_sq = 0
+        self._count = 0
+        self._volumes: list[float] = []
+        self._bad = 0
+        self._features: Features | None = None
+
+    def __len__(self) -> int:
+        return len(self.bars)
+
+    @property
+    def exact(self) -> bool:
+        """False when the window holds non-finite data and features must be recomputed."""
+
+        return not self._bad
+
+    @property
+    def last(self) -> Candle | None:
+        return self.bars[-1] if self.bars else None
+
+    def _add_return(self, older: Candle, newer: Candle) -> None:
+        value = (newer.close - older.close) / older.close if older.close else None
+        if value is not None:
+            if math.isfinite(value):
+                exact = _scaled(value)
+                self._sum += exact
+                self._sum_sq += exact * exact
+                self._count += 1
+            else:
+                self._bad += 1
+        self._returns.append(value)
+
+    def _drop_return(self, value: float | None) -> None:
+        if value is None:
+            return
+        if math.isfinite(value):
+            exact = _scaled(value)
+            self._sum -= exact
+            self._sum_sq -= exact * exact
+            self._count -= 1
+        else:
+            self._bad -= 1
+
+    def _add_volume(self, candle: Candle) -> None:
+        insort(self._volumes, candle.volume)
+
+    def _drop_volume(self, candle: Candle) -> None:
+        volumes = self._volumes
+        idx = bisect_left(volumes, candle.volume)
+        if idx < len(volumes) and volumes[idx] == candle.volume:
+            del volumes[idx]
+        else:  # NaN volumes break the ordering; fall back to a linear (identity) search
+            volumes.remove(candle.volume)
+
+    def push(self, candle: Candle) -> None:
+        """Append a new bar, dropping the oldest one once the window is full."""
+
+        bars = self.bars
+        self._features = None
+        if len(bars) >= VOLUME_WINDOW:
+            self._drop_volume(bars[-VOLUME_WINDOW])
+        if len(bars) == LOOKBACK + 1:
+            oldest = bars.popleft()
+            self._drop_return(self._returns.popleft())
+            self._bad -= not _finite(oldest)
+        if bars:
+            self._add_return(bars[-1], candle)
+        bars.append(candle)
+        self._add_volume(candle)
+        self._bad += not _finite(candle)
+
+    def replace_last(self, candle: Candle) -> None:
+        """Replace the last bar (an intraday update of today's candle)."""
+
+        bars = self.bars
+        if not bars:
+            self.push(candle)
+            return
+        self._features = None
+        old = bars.pop()
+        self._drop_volume(old)
+        self._bad -= not _finite(old)
+        if bars:
+            self._drop_return(self._returns.pop())
+            self._add_return(bars[-1], candle)
+        bars.append(candle)
+        self._add_volume(candle)
+        self._bad += not _finite(candle)
+
+    def reset(self, candles: Iterable[Candle]) -> None:
+        self.__init__()
+        for candle in candles:
+            self.push(candle)
+
+    def sync(self, series: Iterable[Candle] | CandleFrame) -> None:
+        """Bring the state in line with the latest fetched series for the symbol.
+
+        Only the last one or two bars are compared: a new trailing bar is
+        appended, a changed last bar replaces the current one, and anything else
+        (gaps, history rewrites) rebuilds the window from the series tail.
+        """
+
+        if isinstance(series, CandleFrame):
+            window = series.tail(LOOKBACK + 1)
+            if not len(window):
+                self.reset(())
+                return
+            latest = window[-1]
+            prev_ts = window[-2].timestamp if len(window) > 1 else None
+            tail_candles = window
+        else:
+            candles = series if isinstance(series, list) else list(series)
+            if not candles:
+                self.reset(())
+                return
+            latest = candles[-1]
+            prev_ts = candles[-2].timestamp if len(candles) > 1 else None
+            tail_candles = candles[-(LOOKBACK + 1) :]
+
+        current = self.last
+        if current is not None and current.timestamp == latest.timestamp:
+            if current != latest:
+                self.replace_last(latest)
+        elif current is not None and prev_ts == current.timestamp:
+            self.push(latest)
+        else:
+            self.reset(tail_candles)
+
+    def features(self) -> Features | None:
+        """Return the current features, or None when there are fewer than ``MIN_BARS`` bars."""
+
+        bars = self.bars
+        if len(bars) < MIN_BARS:
+            return None
+        if self._features is not None:
+            return self._features
+        latest = bars[-1]
+        prev = bars[-2]
+        change_pct = ((latest.close - prev.close) / prev.close) * 100 if prev.close else 0.0
+
+        lookback = len(bars) - 1
+        basis = bars[0]
+        momentum_pct = ((latest.close - basis.close) / basis.close) * 100 if basis.close else 0.0
+
+        volatility = 0.0
+        if self._count > 1:
+            n = self._count
+            numerator = n * self._sum_sq - self._sum * self._sum
+            volatility = float_sqrt_of_frac(numerator, (n * n) << (2 * _SCALE_BITS)) * 100
+
+        volume_rank = (bisect_left(self._volumes, latest.volume) + 1) / len(self._volumes)
+
+        range_ratio = 0.0
+        if latest.range_size():
+            range_ratio = latest.body_size() / latest.range_size()
+
+        self._features = Features(change_pct, momentum_pct, volatility, volume_rank, range_ratio, lookback)
+        return self._features
+
+
+__all__ = ["Features", "RollingScoreState", "float_sqrt_of_frac"]
@@ -0,0 +1,211 @@
+"""Vectorised feature extraction and scoring for StrategyV5.
+
+Every array operation here mirrors the scalar arithmetic in
+``StrategyV5.score_symbol`` step by step, so a batch score is bit-for-bit
+identical to the per-symbol one. The only non-trivial piece is volatility:
+``statistics.pstdev`` returns the correctly rounded square root of the *exact*
+population variance, which is reproduced with double-double arithmetic and a
+rounding-boundary check; the rare rows that cannot be decided that way are
+recomputed with ``statistics.pstdev`` itself.
+"""
+from __future__ import annotations
+
+import statistics
+from dataclasses import dataclass
+
+import numpy as np
+
+LOOKBACK = 20
+MIN_BARS = 10
+VOLUME_WINDOW = 20
+
+_SPLITTER = 134217729.0  # 2**27 + 1
+_EPS_DD = 2.0**-100
+# Below this variance the product error terms of _two_prod turn subnormal and lose bits.
+_TINY_DD = 2.0**-900
+
+
+def _two_sum(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    s = a + b
+    bb = s - a
+    return s, (a - (s - bb)) + (b - bb)
+
+
+def _quick_two_sum(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    s = a + b
+    return s, b - (s - a)
+
+
+def _split(a: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    c = _SPLITTER * a
+    hi = c - (c - a)
+    return hi, a - hi
+
+
+def _two_prod(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    p = a * b
+    ah, al = _split(a)
+    bh, bl = _split(b)
+    return p, ((ah * bh - p) + ah * bl + al * bh) + al * bl
+
+
+def _dd_add(ah, al, bh, bl) -> tuple[np.ndarray, np.ndarray]:
+    s, e = _two_sum(ah, bh)
+    return _quick_two_sum(s, e + (al + bl))
+
+
+def _dd_mul(ah, al, bh, bl) -> tuple[np.ndarray, np.ndarray]:
+    p, e = _two_prod(ah, bh)
+    return _quick_two_sum(p, e + (ah * bl + al * bh))
+
+
+def exact_pstdev(values: np.ndarray) -> np.ndarray:
+    """Row-wise ``statistics.pstdev`` for a 2-D float64 array, bit-for-bit."""
+
+    values = np.asarray(values, dtype=np.float64)
+    rows, k = values.shape
+    if k < 1:
+        raise statistics.StatisticsError("pstdev requires at least one data point")
+    zeros = np.zeros(rows)
+    columns = np.ascontiguousarray(values.T)  # one contiguous row per column for the sweep
+
+    sum_hi, sum_lo = zeros, zeros
+    sq_hi, sq_lo = zeros, zeros
+    # Extreme inputs overflow in the sweep too; those rows fall back to statistics.pstdev below.
+    with np.errstate(all="ignore"):
+        for x in columns:
+            sum_hi, sum_lo = _dd_add(sum_hi, sum_lo, x, zeros)
+            p, pe = _two_prod(x, x)
+            sq_hi, sq_lo = _dd_add(sq_hi, sq_lo, p, pe)
+
+        # D = k * sum(x^2) - sum(x)^2 is exact in rationals; carry it in double-double.
+        kq_hi, kq_lo = _two_prod(sq_hi, np.full(rows, float(k)))
+        kq_hi, kq_lo = _quick_two_sum(kq_hi, kq_lo + sq_lo * k)
+        s2_hi, s2_lo = _dd_mul(sum_hi, sum_lo, sum_hi, sum_lo)
+        d_hi, d_lo = _dd_add(kq_hi, kq_lo, -s2_hi, -s2_lo)
+        d_err = (k * k) * 2.0**-96 * sq_hi
+
+        # V = D / k^2
+        m = float(k * k)
+        v_hi = d_hi / m
+        p, pe = _two_prod(v_hi, np.full(rows, m))
+        v_lo = ((d_hi - p) - pe + d_lo) / m
+        v_hi, v_lo = _quick_two_sum(v_hi, v_lo)
+        v_err = d_err / m + np.abs(v_hi) * _EPS_DD
+
+        # sqrt(V) in double-double
+        s_hi = np.sqrt(v_hi)
+        p, pe = _two_prod(s_hi, s_hi)
+        s_lo = ((v_hi - p) - pe + v_lo) / (2.0 * s_hi)
+        s_hi, s_lo = _quick_two_sum(s_hi, s_lo)
+        s_err = s_hi * (v_err / (2.0 * v_hi) + _EPS_DD)
+
+        result = s_hi + s_lo
+        # Distance from the double-double value to the rounding boundaries around ``result``.
+        offset = (s_hi - result) + s_lo
+        half_up = (np.nextafter(result, np.inf) - result) / 2.0
+        half_down = (result - np.nextafter(result, 0.0)) / 2.0
+        margin = np.minimum(np.abs(half_up - offset), np.abs(offset + half_down))
+        constant = values.max(axis=1) == values.min(axis=1)
+        result = np.where(constant, 0.0, result)
+        undecided = ~constant & ~(
+            np.isfinite(result)
+            & (v_hi > _TINY_DD)
+            & (d_err < np.abs(d_hi) * 2.0**-40)
+            & (margin > 2.0 * s_err)
+        )
+
+    for row in np.flatnonzero(undecided):
+        result[row] = statistics.pstdev(values[row].tolist())
+    return result
+
+
+@dataclass(slots=True)
+class FeatureBatch:
+    """Per-symbol StrategyV5 features for a batch of equal-length windows."""
+
+    change_pct: np.ndarray
+    momentum_pct: np.ndarray
+    volatility: np.ndarray
+    volume_rank: np.ndarray
+    range_ratio: np.ndarray
+    lookback: int
+
+    def __len__(self) -> int:
+        return len(self.change_pct)
+
+    def score(self, settings) -> np.ndarray:
+        return (
+            self.change_pct * settings.return_threshold
+            + self.momentum_pct * settings.intensity
+            + (1 - np.minimum(self.volatility, 10) / 10) * 20
+            + self.volume_rank * settings.volume_rank * 100
+            + self.range_ratio * 15
+        )
+
+
+def batch_supported(open_, high, low, close, volume) -> np.ndarray:
+    """Rows the vectorised path handles exactly (finite data, no zero closes in the window)."""
+
+    window = min(close.shape[1], LOOKBACK + 1)
+    finite = np.ones(close.shape[0], dtype=bool)
+    for arr in (open_, high, low, close, volume):
+        finite &= np.isfinite(arr[:, -window:]).all(axis=1)
+    return finite & (close[:, -window:-1] != 0).all(axis=1)
+
+
+def compute_features(open_, high, low, close, volume) -> FeatureBatch:
+    """Compute features from ``(symbols, bars)`` arrays sharing one bar count.
+
+    Rows must satisfy :func:`batch_supported`; callers route the others
+    through ``StrategyV5.score_symbol``.
+    """
+
+    open_, high, low, close, volume = (
+        np.asarray(arr, dtype=np.float64) for arr in (open_, high, low, close, volume)
+    )
+    bars = close.shape[1]
+    if bars < MIN_BARS:
+        raise ValueError(f"at least {MIN_BARS} bars are required, got {bars}")
+    lookback = min(LOOKBACK, bars - 1)
+
+    latest = close[:, -1]
+    prev = close[:, -2]
+    basis = close[:, -(lookback + 1)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = np.where(prev != 0, ((latest - prev) / prev) * 100, 0.0)
+        momentum_pct = np.where(basis != 0, ((latest - basis) / basis) * 100, 0.0)
+
+    older = close[:, -(lookback + 1) : -1]
+    newer = close[:, -lookback:]
+    returns = (newer - older) / older
+    volatility = exact_pstdev(returns) * 100 if lookback > 1 else np.zeros(len(close))
+
+    volumes = volume[:, -VOLUME_WINDOW:]
+    below = (volumes < volumes[:, -1:]).sum(axis=1)
+    volume_rank = (below + 1) / volumes.shape[1]
+
+    body = np.abs(close[:, -1] - open_[:, -1])
+    span = high[:, -1] - low[:, -1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        range_ratio = np.where(span != 0, body / span, 0.0)
+
+    return FeatureBatch(
+        change_pct=change_pct,
+        momentum_pct=momentum_pct,
+        volatility=volatility,
+        volume_rank=volume_rank,
+        range_ratio=range_ratio,
+        lookback=lookback,
+    )
+
+
+__all__ = [
+    "FeatureBatch",
+    "LOOKBACK",
+    "MIN_BARS",
+    "VOLUME_WINDOW",
+    "batch_supported",
+    "compute_features",
+    "exact_pstdev",
+]
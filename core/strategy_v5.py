@@ -1,22 +1,77 @@
 from __future__ import annotations
 
+import heapq
 import math
 import statistics
-from typing import Iterable
+import threading
+from datetime import datetime
+from typing import Callable, Iterable, Mapping
 
-from core.entities import Candle, Signal, top_n_signals
+import numpy as np
+
+from core.entities import Candle, CandleFrame, Signal
+from core.parallel import ProcessScreener
+from core.rolling import RollingScoreState
+from core.scoring import LOOKBACK, MIN_BARS, batch_supported, compute_features
 from core.symbols import get_name
 
 
+def _score_window(symbol: str, series: Iterable[Candle] | CandleFrame) -> CandleFrame | None:
+    """Return the trailing bars that determine the score, or None when history is too short."""
+
+    if isinstance(series, CandleFrame):
+        return series.tail(LOOKBACK + 1) if len(series) >= MIN_BARS else None
+    candles = series if isinstance(series, list) else list(series)
+    if len(candles) < MIN_BARS:
+        return None
+    return CandleFrame.from_candles(candles[-(LOOKBACK + 1) :], symbol)
+
+
+def _format_reasons(
+    change_pct: float,
+    lookback: int,
+    momentum_pct: float,
+    volatility: float,
+    volume_rank: float,
+    range_ratio: float,
+) -> list[str]:
+    return [
+        f"일간 변동 {change_pct:.2f}%",
+        f"{lookback}일 모멘텀 {momentum_pct:.2f}%",
+        f"변동성 {volatility:.2f}%",
+        f"거래량 랭크 {volume_rank:.2f}",
+        f"바디/레인지 {range_ratio:.2f}",
+    ]
+
+
 class StrategyV5:
     """Rule-based scoring strategy for the v5 Trader rewrite."""
 
     def __init__(self, settings) -> None:
         self.settings = settings
+        self._rolling: dict[str, RollingScoreState] = {}
+        self._process_screener: ProcessScreener | None = None
+        self._screener_lock = threading.Lock()
+
+    def _combine(
+        self,
+        change_pct: float,
+        momentum_pct: float,
+        volatility: float,
+        volume_rank: float,
+        range_ratio: float,
+    ) -> float:
+        return (
+            change_pct * self.settings.return_threshold
+            + momentum_pct * self.settings.intensity
+            + (1 - min(volatility, 10) / 10) * 20
+            + volume_rank * self.settings.volume_rank * 100
+            + range_ratio * 15
+        )
 
     def score_symbol(self, candles: Iterable[Candle]) -> tuple[float, list[str]]:
         candles_list = list(candles)
-        if len(candles_list) < 10:
+        if len(candles_list) < MIN_BARS:
             return 0.0, ["데이터 부족"]
 
         latest = candles_list[-1]
@@ -51,37 +106,200 @@ class StrategyV5:
         if latest.range_size():
             range_ratio = latest.body_size() / latest.range_size()
 
-        score = (
-            change_pct * self.settings.return_threshold
-            + momentum_pct * self.settings.intensity
-            + (1 - min(volatility, 10) / 10) * 20
-            + volume_rank * self.settings.volume_rank * 100
-            + range_ratio * 15
-        )
-
-        reasons = [
-            f"일간 변동 {change_pct:.2f}%",
-            f"{lookback}일 모멘텀 {momentum_pct:.2f}%",
-            f"변동성 {volatility:.2f}%",
-            f"거래량 랭크 {volume_rank:.2f}",
-            f"바디/레인지 {range_ratio:.2f}",
-        ]
+        score = self._combine(change_pct, momentum_pct, volatility, volume_rank, range_ratio)
+        reasons = _format_reasons(change_pct, lookback, momentum_pct, volatility, volume_rank, range_ratio)
         return score, reasons
 
+    def score_batch(
+        self,
+        open_: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+    ) -> np.ndarray:
+        """Score ``(symbols, bars)`` arrays in one pass.
+
+        Row ``i`` equals ``score_symbol`` on the same bars bit for bit; rows the
+        vectorised path cannot reproduce exactly (non-finite values, zero closes)
+        are scored with ``score_symbol`` itself.
+        """
+
+        arrays = (np.asarray(arr, dtype=np.float64) for arr in (open_, high, low, close, volume))
+        scores, _ = self._score_arrays(*arrays)
+        return scores
+
+    def _score_arrays(
+        self, open_, high, low, close, volume
+    ) -> tuple[np.ndarray, Callable[[int], list[str]]]:
+        """Return the row scores and a callable that formats the reasons of one row on demand."""
+
+        bars = (open_, high, low, close, volume)
+        supported = batch_supported(*bars)
+        scores = np.zeros(close.shape[0])
+        fallback: dict[int, list[str]] = {}
+
+        rows = np.flatnonzero(supported)
+        features = None
+        if rows.size:
+            # Skip the gather copy in the common case where every row is supported.
+            subset = bars if rows.size == close.shape[0] else tuple(arr[rows] for arr in bars)
+            features = compute_features(*subset)
+            scores[rows] = features.score(self.settings)
+        for row in np.flatnonzero(~supported).tolist():
+            candles = [
+                Candle("", datetime.min, *(float(arr[row, col]) for arr in bars))
+                for col in range(close.shape[1])
+            ]
+            scores[row], fallback[row] = self.score_symbol(candles)
+
+        def explain(row: int) -> list[str]:
+            if row in fallback:
+                return fallback[row]
+            pos = int(np.searchsorted(rows, row))
+            return _format_reasons(
+                float(features.change_pct[pos]),
+                features.lookback,
+                float(features.momentum_pct[pos]),
+                float(features.volatility[pos]),
+                float(features.volume_rank[pos]),
+                float(features.range_ratio[pos]),
+            )
+
+        return scores, explain
+
     def screen_candidates(
-        self, candles_by_symbol: dict[str, Iterable[Candle]], top_n: int
+        self, candles_by_symbol: Mapping[str, Iterable[Candle] | CandleFrame], top_n: int
     ) -> list[Signal]:
-        signals: list[Signal] = []
-        for symbol, candles in candles_by_symbol.items():
-            score, reasons = self.score_symbol(candles)
-            if not math.isfinite(score):
-                continue
-            signals.append(
-                Signal(symbol=symbol, score=score, reasons=reasons, name=get_name(symbol))
-            )
-        return top_n_signals(signals, top_n)
+        symbols = list(candles_by_symbol)
+
+        # Only the trailing LOOKBACK + 1 bars affect the score, so symbols are
+        # grouped by that window length and each group is scored as one matrix.
+        groups: dict[int, list[tuple[int, CandleFrame]]] = {}
+        for idx, symbol in enumerate(symbols):
+            window = _score_window(symbol, candles_by_symbol[symbol])
+            if window is not None:
+                groups.setdefault(len(window), []).append((idx, window))
+
+        if self._parallel(len(symbols)):
+            ranked = self._screener().rank(list(groups.values()), top_n)
+        else:
+            ranked = self._rank_groups(groups.values(), len(symbols), top_n)
+        # Symbols without enough history score 0; only the first top_n of them can place.
+        scored = {idx for members in groups.values() for idx, _ in members}
+        short = [idx for idx in range(len(symbols)) if idx not in scored][: max(top_n, 0)]
+        ranked.extend((idx, 0.0, ["데이터 부족"]) for idx in short)
+        ranked.sort(key=lambda item: item[0])
+
+        # Signals and names are only built for the winners.
+        top = heapq.nlargest(top_n, ranked, key=lambda item: item[1]) if top_n > 0 else []
+        return [
+            Signal(symbol=symbols[idx], score=score, reasons=reasons, name=get_name(symbols[idx]))
+            for idx, score, reasons in top
+        ]
+
+    def _rank_groups(
+        self, groups: Iterable[list[tuple[int, CandleFrame]]], size: int, top_n: int
+    ) -> list[tuple[int, float, list[str]]]:
+        scores = np.full(size, np.nan)
+        # Per symbol: which group scored it and its row there.
+        owner = np.zeros(size, dtype=np.intp)
+        row_of = np.zeros(size, dtype=np.intp)
+        explainers: list[Callable[[int], list[str]]] = []
+        for members in groups:
+            block = np.stack([window.values for _, window in members], axis=1)
+            group_scores, explain = self._score_arrays(*block)
+            idxs = np.fromiter((idx for idx, _ in members), dtype=np.intp, count=len(members))
+            scores[idxs] = group_scores
+            owner[idxs] = len(explainers)
+            row_of[idxs] = np.arange(len(members))
+            explainers.append(explain)
+
+        # Reason strings are only formatted for the winners.
+        candidates = np.flatnonzero(np.isfinite(scores)).tolist()
+        top = heapq.nlargest(top_n, candidates, key=scores.__getitem__) if top_n > 0 else []
+        return [
+            (idx, float(scores[idx]), explainers[int(owner[idx])](int(row_of[idx])))
+            for idx in top
+        ]
+
+    def _parallel(self, size: int) -> bool:
+        workers = getattr(self.settings, "workers", 1)
+        return workers > 1 and size >= getattr(self.settings, "parallel_min_symbols", 0)
+
+    def _screener(self) -> ProcessScreener:
+        # FastAPI 스레드들이 동시에 스캔해도 프로세스 풀은 하나만 만든다.
+        with self._screener_lock:
+            if self._process_screener is None:
+                self._process_screener = ProcessScreener(self.settings, self.settings.workers)
+            return self._process_screener
+
+    def close(self) -> None:
+        """Shut down the screening process pool, if one was started."""
+
+        with self._screener_lock:
+            screener, self._process_screener = self._process_screener, None
+        if screener is not None:
+            screener.close()
+
+    def rescreen(
+        self, candles_by_symbol: Mapping[str, Iterable[Candle] | CandleFrame], top_n: int
+    ) -> list[Signal]:
+        """``screen_candidates`` for repeated scans of the same universe.
+
+        A ``RollingScoreState`` is kept per symbol between calls, so a scan
+        where only today's bar moved (or one new bar arrived) costs O(1) per
+        symbol instead of a full window recompute. Scores and reasons are the
+        same as ``screen_candidates``.
+        """
+
+        states = self._rolling
+        for symbol in [symbol for symbol in states if symbol not in candles_by_symbol]:
+            del states[symbol]
+
+        symbols = list(candles_by_symbol)
+        scores = [0.0] * len(symbols)
+        for idx, symbol in enumerate(symbols):
+            state = states.get(symbol)
+            if state is None:
+                state = states[symbol] = RollingScoreState()
+            state.sync(candles_by_symbol[symbol])
+            scores[idx] = self._score_state(state)[0]
+
+        candidates = [idx for idx, score in enumerate(scores) if math.isfinite(score)]
+        top = heapq.nlargest(top_n, candidates, key=scores.__getitem__) if top_n > 0 else []
+        signals = []
+        for idx in top:
+            symbol = symbols[idx]
+            _, reasons = self._score_state(states[symbol], with_reasons=True)
+            signals.append(Signal(symbol=symbol, score=scores[idx], reasons=reasons, name=get_name(symbol)))
+        return signals
+
+    def _score_state(self, state: RollingScoreState, with_reasons: bool = False) -> tuple[float, list[str]]:
+        if not state.exact:
+            return self.score_symbol(state.bars)
+        features = state.features()
+        if features is None:
+            return 0.0, ["데이터 부족"]
+        score = self._combine(
+            features.change_pct,
+            features.momentum_pct,
+            features.volatility,
+            features.volume_rank,
+            features.range_ratio,
+        )
+        if not with_reasons:
+            return score, []
+        return score, _format_reasons(
+            features.change_pct,
+            features.lookback,
+            features.momentum_pct,
+            features.volatility,
+            features.volume_rank,
+            features.range_ratio,
+        )
 
     def pick_top_signals(
-        self, candles_by_symbol: dict[str, Iterable[Candle]], top_n: int = 3
+        self, candles_by_symbol: Mapping[str, Iterable[Candle] | CandleFrame], top_n: int = 3
     ) -> list[Signal]:
         return self.screen_candidates(candles_by_symbol, top_n)
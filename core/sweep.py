@@ -0,0 +1,351 @@
+"""Parameter sweep over StrategySettings / RiskSettings on top of the backtester.
+
+Features depend only on the candles, so they are extracted once
+(``panel_features``) and every combination just re-weights them and replays
+the day loop. With ``workers > 1`` the panel and the feature arrays are placed
+in one shared-memory block that each worker process maps at start-up;
+combinations are then sent as small dicts.
+"""
+from __future__ import annotations
+
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Iterable, Mapping, Sequence
+
+import numpy as np
+
+from core.backtest import BacktestConfig, CandlePanel, panel_features, run_backtest
+from core.scoring import LOOKBACK, FeatureBatch
+
+STRATEGY_PARAMS: tuple[str, ...] = ("return_threshold", "intensity", "volume_rank")
+RISK_PARAMS: tuple[str, ...] = ("stop_loss_pct", "take_profit_pct", "trailing_pct", "max_positions")
+FEATURE_FIELDS: tuple[str, ...] = ("change_pct", "momentum_pct", "volatility", "volume_rank", "range_ratio")
+# 순위 기준으로 쓸 수 있는 BacktestResult.summary() 지표와 정렬 방향(True면 클수록 좋음)
+SORT_KEYS: dict[str, bool] = {
+    "total_return_pct": True,
+    "pnl": True,
+    "final_equity": True,
+    "max_drawdown_pct": False,  # 양수 비율: 낙폭이 작을수록 좋다
+    "hit_rate_pct": True,
+    "trades": True,
+}
+
+
+@dataclass(slots=True)
+class SweepResult:
+    params: dict[str, float]
+    summary: dict[str, float | int | str]
+
+
+def expand_grid(grid: Mapping[str, Sequence[float]]) -> list[dict[str, float]]:
+    """Every combination of the grid values, in key order."""
+
+    unknown = set(grid) - set(STRATEGY_PARAMS) - set(RISK_PARAMS)
+    if unknown:
+        raise ValueError(f"unknown sweep parameters: {', '.join(sorted(unknown))}")
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def sample_grid(grid: Mapping[str, Sequence[float]], samples: int, seed: int = 42) -> list[dict[str, float]]:
+    """A random subset of ``expand_grid(grid)`` (the whole grid when it is smaller)."""
+
+    combos = expand_grid(grid)
+    if samples <= 0 or samples >= len(combos):
+        return combos
+    return random.Random(seed).sample(combos, samples)
+
+
+def apply_params(strategy_settings, risk_settings, params: Mapping[str, float]):
+    """Copies of the settings with the sweep parameters applied."""
+
+    strategy_update = {key: value for key, value in params.items() if key in STRATEGY_PARAMS}
+    risk_update = {key: value for key, value in params.items() if key in RISK_PARAMS}
+    if "max_positions" in risk_update:
+        risk_update["max_positions"] = int(risk_update["max_positions"])
+    # model_copy(update=...)는 검증을 건너뛰므로 범위를 벗어난 값이 백테스트까지 가지 않게 다시 검증한다.
+    return (
+        type(strategy_settings).model_validate({**strategy_settings.model_dump(), **strategy_update}),
+        type(risk_settings).model_validate({**risk_settings.model_dump(), **risk_update}),
+    )
+
+
+def validate_sweep(strategy_settings, risk_settings, combos: Sequence[Mapping[str, float]], sort_by: str) -> None:
+    """Reject an unknown ``sort_by`` or out-of-range parameters before any backtest runs."""
+
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"unknown sort_by: {sort_by} (one of {', '.join(SORT_KEYS)})")
+    for params in combos:
+        apply_params(strategy_settings, risk_settings, params)
+
+
+def _window(context: dict, window: tuple[int, int] | None) -> tuple[CandlePanel, FeatureBatch]:
+    panel, features = context["panel"], context["features"]
+    if window is None:
+        return panel, features
+    start, stop = window
+    return panel.slice(start, stop), slice_features(features, start, stop)
+
+
+def _evaluate(context: dict, params: Mapping[str, float], window: tuple[int, int] | None = None) -> SweepResult:
+    from core.strategy_v5 import StrategyV5
+
+    strategy_settings, risk_settings = apply_params(context["strategy"], context["risk"], params)
+    panel, features = _window(context, window)
+    result = run_backtest(
+        StrategyV5(strategy_settings),
+        panel,
+        risk_settings,
+        context["config"],
+        features=features,
+    )
+    return SweepResult(dict(params), result.summary())
+
+
+def slice_features(features: FeatureBatch, start: int, stop: int) -> FeatureBatch:
+    """Day range ``start:stop`` of ``(symbols, days)`` panel features, as views."""
+
+    return FeatureBatch(
+        *(getattr(features, name)[:, start:stop] for name in FEATURE_FIELDS),
+        lookback=features.lookback,
+    )
+
+
+# Per-process state for pool workers, filled in by ``_init_worker``.
+_WORKER: dict = {}
+
+
+def _init_worker(
+    shm_name: str,
+    shape: tuple[int, int, int],
+    features_path: str | None,
+    symbols,
+    dates,
+    strategy,
+    risk,
+    config,
+) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    planes = 1 if features_path else 2
+    block = np.ndarray((planes, *shape), dtype=np.float64, buffer=shm.buf)
+    # A cached feature file is mapped directly: every worker shares the page cache.
+    matrix = np.load(features_path, mmap_mode="r") if features_path else block[1]
+    _WORKER.update(
+        shm=shm,
+        panel=CandlePanel(list(symbols), list(dates), block[0]),
+        features=FeatureBatch(*matrix, lookback=LOOKBACK),
+        strategy=strategy,
+        risk=risk,
+        config=config,
+    )
+
+
+def _evaluate_in_worker(task: tuple[dict[str, float], tuple[int, int] | None]) -> SweepResult:
+    params, window = task
+    return _evaluate(_WORKER, params, window)
+
+
+class SweepRunner:
+    """Evaluate parameter combinations against one panel, in-process or on a worker pool.
+
+    The pool and its shared-memory block are created on the first pooled
+    call and reused until ``close()``, so walk-forward windows do not pay the
+    start-up cost again.
+    """
+
+    def __init__(
+        self,
+        panel: CandlePanel,
+        features: FeatureBatch,
+        strategy_settings,
+        risk_settings,
+        config: BacktestConfig,
+        *,
+        workers: int = 1,
+        features_path: Path | None = None,
+    ) -> None:
+        self.context = {
+            "panel": panel,
+            "features": features,
+            "strategy": strategy_settings,
+            "risk": risk_settings,
+            "config": config,
+        }
+        self.workers = max(int(workers or os.cpu_count() or 1), 1)
+        self.features_path = features_path
+        self._shm: shared_memory.SharedMemory | None = None
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            panel, features = self.context["panel"], self.context["features"]
+            shape = panel.values.shape
+            planes = 1 if self.features_path else 2
+            self._shm = shared_memory.SharedMemory(create=True, size=max(planes * int(np.prod(shape)) * 8, 1))
+            block = np.ndarray((planes, *shape), dtype=np.float64, buffer=self._shm.buf)
+            block[0] = panel.values
+            if not self.features_path:
+                for row, name in enumerate(FEATURE_FIELDS):
+                    block[1, row] = getattr(features, name)
+            del block
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(
+                    self._shm.name,
+                    shape,
+                    str(self.features_path) if self.features_path else None,
+                    panel.symbols,
+                    panel.dates,
+                    self.context["strategy"],
+                    self.context["risk"],
+                    self.context["config"],
+                ),
+            )
+        return self._pool
+
+    def evaluate(
+        self, combos: Sequence[Mapping[str, float]], window: tuple[int, int] | None = None
+    ) -> list[SweepResult]:
+        """Backtest every combination over the day range ``window`` (default: all days), in input order."""
+
+        combos = [dict(params) for params in combos]
+        workers = min(self.workers, len(combos))
+        if workers <= 1:
+            return [_evaluate(self.context, params, window) for params in combos]
+        chunksize = max(len(combos) // (workers * 4), 1)
+        tasks = [(params, window) for params in combos]
+        return list(self._executor().map(_evaluate_in_worker, tasks, chunksize=chunksize))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self) -> "SweepRunner":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def rank_results(results: list[SweepResult], sort_by: str = "total_return_pct") -> list[SweepResult]:
+    """Best first by ``sort_by`` (descending, ascending for drawdown); ties keep the combination order."""
+
+    return sorted(results, key=lambda result: result.summary[sort_by], reverse=SORT_KEYS.get(sort_by, True))
+
+
+def run_sweep(
+    panel: CandlePanel,
+    strategy_settings,
+    risk_settings,
+    combos: Iterable[Mapping[str, float]],
+    *,
+    config: BacktestConfig | None = None,
+    workers: int = 1,
+    sort_by: str = "total_return_pct",
+) -> list[SweepResult]:
+    """Backtest every parameter combination and return results ranked by ``sort_by`` (descending).
+
+    ``workers=0`` uses every core.
+    """
+
+    config = config or BacktestConfig()
+    combos = [dict(params) for params in combos]
+    validate_sweep(strategy_settings, risk_settings, combos, sort_by)
+    features = panel_features(panel, config.chunk_days)
+    with SweepRunner(panel, features, strategy_settings, risk_settings, config, workers=workers) as runner:
+        results = runner.evaluate(combos)
+    return rank_results(results, sort_by)
+
+
+def _rows(results: Sequence[SweepResult]) -> tuple[list[str], list[list]]:
+    param_keys = list(dict.fromkeys(key for result in results for key in result.params))
+    summary_keys = list(dict.fromkeys(key for result in results for key in result.summary))
+    header = ["rank", *param_keys, *summary_keys]
+    rows = [
+        [
+            rank,
+            *(result.params.get(key) for key in param_keys),
+            *(result.summary.get(key) for key in summary_keys),
+        ]
+        for rank, result in enumerate(results, start=1)
+    ]
+    return header, rows
+
+
+def write_results(results: Sequence[SweepResult], path: Path) -> Path:
+    """Write the ranked table to CSV, or to a ``sweep_results`` table for .db/.sqlite paths."""
+
+    path = Path(path)
+    if path.parent and not path.parent.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() in {".db", ".sqlite", ".sqlite3"}:
+        run_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        conn = sqlite3.connect(path)
+        try:
+            with conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS sweep_results (
+                        run_at TEXT,
+                        rank INTEGER,
+                        params TEXT,
+                        summary TEXT
+                    )
+                    """
+                )
+                conn.executemany(
+                    "INSERT INTO sweep_results(run_at, rank, params, summary) VALUES(?, ?, ?, ?)",
+                    [
+                        (
+                            run_at,
+                            rank,
+                            json.dumps(result.params),
+                            json.dumps(result.summary, ensure_ascii=False),
+                        )
+                        for rank, result in enumerate(results, start=1)
+                    ],
+                )
+        finally:
+            conn.close()
+        return path
+    header, rows = _rows(results)
+    with path.open("w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return path
+
+
+__all__ = [
+    "FEATURE_FIELDS",
+    "RISK_PARAMS",
+    "SORT_KEYS",
+    "STRATEGY_PARAMS",
+    "SweepResult",
+    "SweepRunner",
+    "apply_params",
+    "expand_grid",
+    "rank_results",
+    "run_sweep",
+    "sample_grid",
+    "slice_features",
+    "validate_sweep",
+    "write_results",
+]
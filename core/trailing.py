@@ -0,0 +1,150 @@
+"""High-water-mark tracking for trailing stops.
+
+``TrailingStopTracker`` keeps the highest price seen since entry for every
+held symbol together with the live ``Position`` object. Each new price is an
+O(1) dict update that raises ``position.trail_stop`` (and refreshes
+``last_price``/``pnl_pct``) in place, so exit evaluation sees intraday peaks
+without re-reading positions. Raised marks are written to the sink
+(``SQLiteStorage.update_trail_stops``) in batches, once ``flush_size`` symbols
+are dirty or ``flush_interval`` seconds have passed.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from typing import Callable, Iterable, Protocol
+
+from core.entities import Position
+
+logger = logging.getLogger(__name__)
+
+
+class TrailStopSink(Protocol):
+    def update_trail_stops(self, items: Iterable[tuple[str, float]]) -> None: ...
+
+
+class TrailingStopTracker:
+    """Per-symbol high-water marks with batched persistence."""
+
+    def __init__(
+        self,
+        sink: TrailStopSink | None = None,
+        flush_size: int = 64,
+        flush_interval: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.sink = sink
+        self.flush_size = max(int(flush_size), 1)
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._marks: dict[str, float] = {}
+        self._positions: dict[str, Position] = {}
+        self._dirty: set[str] = set()
+        self._last_flush = clock()
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._positions
+
+    def mark(self, symbol: str) -> float | None:
+        return self._marks.get(symbol)
+
+    def get(self, symbol: str) -> Position | None:
+        return self._positions.get(symbol)
+
+    def positions(self) -> list[Position]:
+        """The tracked (held) positions, updated in place by :meth:`update`."""
+
+        with self._lock:
+            return list(self._positions.values())
+
+    def sync(self, positions: Iterable[Position]) -> None:
+        """Adopt the broker's current positions.
+
+        Held positions get ``trail_stop`` raised to the known high-water mark
+        (at least ``last_price``). Symbols that are flat or no longer listed
+        are dropped, so a later re-entry starts a fresh mark.
+        """
+
+        held: dict[str, Position] = {}
+        with self._lock:
+            for position in positions:
+                if position.qty <= 0:
+                    continue
+                symbol = position.symbol
+                known = self._marks.get(symbol, 0.0)
+                mark = max(known, _price(position.trail_stop), _price(position.last_price))
+                if mark > known and known:
+                    self._dirty.add(symbol)
+                self._marks[symbol] = mark
+                if mark:
+                    position.trail_stop = mark
+                held[symbol] = position
+            for symbol in set(self._marks) - set(held):
+                self._marks.pop(symbol, None)
+                self._dirty.discard(symbol)
+            self._positions = held
+        self._maybe_flush()
+
+    def update(self, symbol: str, price: float) -> float | None:
+        """Feed one trade/quote price; return the symbol's mark (``None`` if not held)."""
+
+        with self._lock:
+            position = self._positions.get(symbol)
+            if position is None or not _price(price):
+                return self._marks.get(symbol)
+            position.last_price = price
+            if position.avg_price:
+                position.pnl_pct = (price - position.avg_price) / position.avg_price
+            mark = self._marks[symbol]
+            if price > mark:
+                mark = self._marks[symbol] = price
+                position.trail_stop = price
+                self._dirty.add(symbol)
+        self._maybe_flush()
+        return mark
+
+    def forget(self, symbol: str) -> None:
+        with self._lock:
+            self._marks.pop(symbol, None)
+            self._positions.pop(symbol, None)
+            self._dirty.discard(symbol)
+
+    def _maybe_flush(self) -> None:
+        if not self._dirty:
+            return
+        if len(self._dirty) >= self.flush_size or self._clock() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write raised marks to the sink; return how many symbols were written."""
+
+        with self._lock:
+            items = [(symbol, self._marks[symbol]) for symbol in sorted(self._dirty)]
+            self._dirty.clear()
+            self._last_flush = self._clock()
+        if items and self.sink is not None:
+            try:
+                self.sink.update_trail_stops(items)
+            except Exception as exc:  # pragma: no cover - defensive
+                logger.warning("트레일링 스탑 저장 실패: %s", exc)
+        return len(items)
+
+    def close(self) -> None:
+        self.flush()
+
+
+def _price(value) -> float:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return value if math.isfinite(value) and value > 0 else 0.0
+
+
+__all__ = ["TrailingStopTracker"]
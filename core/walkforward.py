@@ -0,0 +1,242 @@
+"""Walk-forward optimisation on top of the parameter sweep.
+
+The day axis is cut into rolling windows: every combination is backtested on
+an in-sample (train) range, the best one by ``sort_by`` is replayed on the
+following out-of-sample (test) range, and the window advances by
+``step_days``. Out-of-sample ranges are chained: each starts flat with the
+previous range's closing equity (open positions are marked at the last close),
+so the stitched curve is what re-optimising on that schedule would have
+earned.
+
+Features depend only on the candles, so they are extracted once per panel
+and kept in a ``.npy`` cache keyed by the panel contents. The file is opened
+with ``mmap_mode="r"``: every window and every pool worker reads the same
+pages and only re-weights them (``FeatureBatch.score``).
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Mapping
+
+import numpy as np
+
+from core.backtest import BacktestConfig, BacktestResult, BacktestTrade, CandlePanel, panel_features, run_backtest
+from core.scoring import LOOKBACK, FeatureBatch
+from core.sweep import (
+    FEATURE_FIELDS,
+    SweepResult,
+    SweepRunner,
+    apply_params,
+    rank_results,
+    slice_features,
+    validate_sweep,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "features-"
+
+
+def panel_key(panel: CandlePanel) -> str:
+    """Content hash of a panel (symbols, dates, OHLCV values) for the feature cache."""
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"lookback={LOOKBACK}".encode())
+    digest.update("\0".join(panel.symbols).encode())
+    digest.update("\0".join(ts.isoformat() for ts in panel.dates).encode())
+    digest.update(np.ascontiguousarray(panel.values, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def cached_features(
+    panel: CandlePanel, cache_dir: Path, chunk_days: int = 16, keep: int = 4
+) -> tuple[FeatureBatch, Path]:
+    """Return memory-mapped ``panel_features`` for ``panel`` and the backing ``.npy`` path.
+
+    The matrix is computed on a cache miss and written atomically; only the
+    ``keep`` most recently used cache files are retained.
+    """
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f"{CACHE_PREFIX}{panel_key(panel)}.npy"
+    if path.exists():
+        logger.debug("특징 행렬 캐시 적중: %s", path)
+        os.utime(path)
+    else:
+        features = panel_features(panel, chunk_days)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+        matrix = np.lib.format.open_memmap(
+            tmp, mode="w+", dtype=np.float64, shape=(len(FEATURE_FIELDS), *features.change_pct.shape)
+        )
+        for row, name in enumerate(FEATURE_FIELDS):
+            matrix[row] = getattr(features, name)
+        matrix.flush()
+        del matrix
+        os.replace(tmp, path)
+        logger.info("특징 행렬 캐시 생성: %s", path)
+        _prune(cache_dir, keep)
+    matrix = np.load(path, mmap_mode="r")
+    return FeatureBatch(*matrix, lookback=LOOKBACK), path
+
+
+def _prune(cache_dir: Path, keep: int) -> None:
+    files = sorted(cache_dir.glob(f"{CACHE_PREFIX}*.npy"), key=lambda item: item.stat().st_mtime, reverse=True)
+    for stale in files[max(keep, 1) :]:
+        try:
+            stale.unlink()
+        except OSError:  # pragma: no cover - 다른 프로세스가 사용 중
+            logger.debug("오래된 특징 캐시 삭제 실패: %s", stale)
+
+
+def walk_forward_windows(
+    days: int, train_days: int, test_days: int, step_days: int = 0
+) -> list[tuple[tuple[int, int], tuple[int, int]]]:
+    """``((train_start, train_stop), (test_start, test_stop))`` day ranges.
+
+    Windows start at the first day with a full score window (``LOOKBACK``);
+    the last test range is cut at ``days``. ``step_days=0`` steps by
+    ``test_days``; a smaller step shortens the test ranges so they never overlap.
+    """
+
+    if train_days <= 0 or test_days <= 0:
+        raise ValueError("train_days and test_days must be positive")
+    step = step_days if step_days > 0 else test_days
+    windows = []
+    start = LOOKBACK
+    while start + train_days < days:
+        train = (start, start + train_days)
+        test = (train[1], min(train[1] + min(test_days, step), days))
+        windows.append((train, test))
+        start += step
+    return windows
+
+
+@dataclass(slots=True)
+class WalkForwardWindow:
+    train_start: datetime
+    train_end: datetime
+    test_start: datetime
+    test_end: datetime
+    params: dict[str, float]
+    train: dict[str, float | int | str]
+    test: dict[str, float | int | str]
+
+
+@dataclass(slots=True)
+class WalkForwardResult:
+    windows: list[WalkForwardWindow] = field(default_factory=list)
+    out_of_sample: BacktestResult | None = None
+
+    def summary(self) -> dict[str, float | int | str]:
+        summary = self.out_of_sample.summary() if self.out_of_sample else {}
+        return {**summary, "windows": len(self.windows)}
+
+
+def walk_forward(
+    panel: CandlePanel,
+    strategy_settings,
+    risk_settings,
+    combos: Iterable[Mapping[str, float]],
+    *,
+    train_days: int,
+    test_days: int,
+    step_days: int = 0,
+    config: BacktestConfig | None = None,
+    sort_by: str = "total_return_pct",
+    workers: int = 1,
+    cache_dir: Path | None = None,
+) -> WalkForwardResult:
+    """Optimise on each train range, replay the winner on the next test range and chain the results.
+
+    With ``cache_dir`` the feature matrix is loaded from (or saved to) a
+    memory-mapped cache; otherwise it is computed in memory.
+    """
+
+    config = config or BacktestConfig()
+    combos = [dict(params) for params in combos]
+    validate_sweep(strategy_settings, risk_settings, combos, sort_by)
+    windows = walk_forward_windows(len(panel.dates), train_days, test_days, step_days)
+    result = WalkForwardResult()
+    if not combos or not windows:
+        return result
+
+    if cache_dir is not None:
+        features, features_path = cached_features(panel, cache_dir, config.chunk_days)
+    else:
+        features, features_path = panel_features(panel, config.chunk_days), None
+
+    from core.strategy_v5 import StrategyV5
+
+    equity_parts: list[np.ndarray] = []
+    dates: list[datetime] = []
+    trades: list[BacktestTrade] = []
+    open_positions = 0
+    cash = float(config.initial_cash)
+    with SweepRunner(
+        panel,
+        features,
+        strategy_settings,
+        risk_settings,
+        config,
+        workers=workers,
+        features_path=features_path,
+    ) as runner:
+        for train, test in windows:
+            ranked: list[SweepResult] = rank_results(runner.evaluate(combos, train), sort_by)
+            best = ranked[0]
+            strategy, risk = apply_params(strategy_settings, risk_settings, best.params)
+            replay = run_backtest(
+                StrategyV5(strategy),
+                panel.slice(*test),
+                risk,
+                replace(config, initial_cash=cash),
+                features=slice_features(features, *test),
+            )
+            cash = float(replay.equity[-1])
+            equity_parts.append(replay.equity)
+            dates.extend(replay.dates)
+            trades.extend(replay.trades)
+            open_positions = replay.open_positions
+            result.windows.append(
+                WalkForwardWindow(
+                    train_start=panel.dates[train[0]],
+                    train_end=panel.dates[train[1] - 1],
+                    test_start=panel.dates[test[0]],
+                    test_end=panel.dates[test[1] - 1],
+                    params=best.params,
+                    train=best.summary,
+                    test=replay.summary(),
+                )
+            )
+            logger.debug(
+                "워크포워드 구간 %s~%s: %s -> 표본 외 수익률 %.2f%%",
+                replay.dates[0].date(),
+                replay.dates[-1].date(),
+                best.params,
+                result.windows[-1].test["total_return_pct"],
+            )
+
+    equity = np.concatenate([[float(config.initial_cash)], *equity_parts])
+    result.out_of_sample = BacktestResult(
+        dates=[panel.dates[windows[0][1][0] - 1], *dates],
+        equity=equity,
+        trades=trades,
+        open_positions=open_positions,
+    )
+    return result
+
+
+__all__ = [
+    "WalkForwardResult",
+    "WalkForwardWindow",
+    "cached_features",
+    "panel_key",
+    "walk_forward",
+    "walk_forward_windows",
+]
@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from typing import AsyncIterator, Collection, Protocol
+
+from core.entities import MarketEvent
+
+
+class IMarketStream(Protocol):
+    def events(self, symbols: Collection[str] | None = None) -> AsyncIterator[MarketEvent]:
+        """Yield quote (``PriceTick``) and bar (``BarEvent``) events, optionally for ``symbols`` only."""
+        ...
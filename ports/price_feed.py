@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from typing import AsyncIterator, Callable, Collection, Protocol
+
+from core.entities import PriceTick
+
+
+class IPriceFeed(Protocol):
+    def stream(self, symbols: Callable[[], Collection[str]]) -> AsyncIterator[PriceTick]:
+        """Yield price ticks for the symbols currently returned by ``symbols()``."""
+        ...
@@ -1,19 +1,37 @@
 from __future__ import annotations
 
+import asyncio
+import gzip
+import json
+import sqlite3
 import sys
+import threading
+import time
 import types
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
 
+import numpy as np
 import pytest
 import requests
 
 from adapters.broker_kis import BrokerKIS
 from adapters.broker_mock import MockBroker
+from adapters.candle_fetcher import fetch_candles
+from adapters.kis_rate_limit import KISRateLimiter, get_rate_limiter
+from adapters.kis_realtime import FakeKISRealtimeServer, KISRealtimeStream, format_kis_frame, parse_kis_frame
+from adapters.log_retention import LogRetention
+from adapters.market_bar_store import BarStoreMarket
+from adapters.market_cache import CachedMarket
+from adapters.market_candle_store import CandleStoreMarket
 from adapters.market_kis import MarketKIS
 from adapters.market_mock import MarketMock
 from adapters.notifier_windows import NotifierWindows
+from adapters.price_feed import PollingPriceFeed, StreamPriceFeed
+from adapters.singleflight import CandleSingleFlight
 from adapters.storage_sqlite import SQLiteStorage
-from core.entities import Position
+from adapters.stream_replay import ReplayMarketStream, candle_events, read_events, write_events
+from core.bars import BarAggregator, BarRing, BarStore
+from core.entities import Candle, CandleFrame, Position, PriceTick
 from core.symbols import get_name, load_krx_cache
 
 
@@ -214,7 +232,7 @@ accno = "12345678-01"
             self.calls += 1
             if self.calls == 1:
                 return DummyResponse(401, {})
-            return DummyResponse(200, {"rt_cd": "0", "output": {"ODNO": "A1"}})
+            return DummyResponse(200, {"rt_cd": "0", "output": {"ODNO": f"A{self.calls}"}})
 
         def get(self, url, headers=None, params=None, timeout=None):
             return DummyResponse(200, {"output1": []})
@@ -237,7 +255,19 @@ accno = "12345678-01"
     assert result["ok"] is True
     assert broker._session.calls == 2  # type: ignore[attr-defined]
 
+    # 로그 문구가 아니라 실제 실현 손실(R)로 판단한다.
     storage.log_event("risk", "daily_loss_exceeded")
+    assert not storage.is_daily_loss_limit_exceeded(-3.0)
+    broker.get_positions = lambda: [
+        Position(symbol="005930.KS", qty=7, avg_price=70000, last_price=50000)
+    ]
+    # 체결 여부를 모르는 지정가 주문은 일중 손익에 넣지 않는다.
+    pending = broker.place_order("005930.KS", "SELL", 3, price_type="limit", limit_price=40000)
+    assert pending["ok"] is True and storage.daily_pnl()["trades"] == 1
+    loss = broker.place_order("005930.KS", "SELL", 3, price_type="market")
+    assert loss["ok"] is True
+    assert storage.daily_pnl()["r"] < -3.0
+
     blocked = broker.place_order("005930.KS", "SELL", 1, price_type="market")
     assert blocked["ok"] is False
 
@@ -257,3 +287,679 @@ def test_symbol_name_resolver(tmp_path):
     load_krx_cache(csv_path)
     assert get_name("123456.KS") == "테스트기업"
     load_krx_cache(tmp_path / "missing.csv")
+
+
+def test_fetch_candles_concurrent_keeps_order_and_isolates_failures():
+    class SlowMarket(MarketMock):
+        def __init__(self) -> None:
+            super().__init__(seed=7)
+            self.active = 0
+            self.peak = 0
+            self._lock = threading.Lock()
+
+        def get_candles(self, symbol, timeframe="D", limit=120):
+            with self._lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            try:
+                time.sleep(0.02)
+                if symbol == "BAD":
+                    raise RuntimeError("boom")
+                return super().get_candles(symbol, timeframe, limit)
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+    market = SlowMarket()
+    symbols = ["AAA", "BAD", "BBB", "CCC", "DDD"]
+    result = fetch_candles(market, symbols, limit=5, max_workers=4)
+
+    assert list(result) == symbols
+    assert result["BAD"] == []
+    assert all(len(result[sym]) == 5 for sym in symbols if sym != "BAD")
+    assert 1 < market.peak <= 4
+
+
+def test_kis_rate_limiter_paces_calls_per_tr():
+    clock = {"now": 0.0}
+    sleeps: list[float] = []
+
+    def fake_sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+
+    limiter = KISRateLimiter(
+        10.0,
+        {"FHKST01010400": 2.0},
+        clock=lambda: clock["now"],
+        sleep=fake_sleep,
+    )
+
+    waits = [limiter.acquire("FHKST01010400") for _ in range(4)]
+    assert waits[0] == 0.0
+    assert waits[1] == 0.0
+    assert waits[2] == pytest.approx(0.5)
+    assert waits[3] == pytest.approx(1.0)
+    assert limiter.acquire("FHKST01010100") == 0.0
+
+    stats = limiter.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] == 1
+    assert stats["by_tr"]["FHKST01010400"]["waited"] == 2
+    assert stats["by_tr"]["FHKST01010400"]["max_wait_sec"] == pytest.approx(1.0)
+    assert sleeps == pytest.approx([0.5, 1.0])
+
+    # 재설정에서 빠진 TR의 개별 한도는 사라진다.
+    limiter.configure(10.0, {"TTTC8434R": 1.0})
+    assert limiter.stats()["tr_limits"] == {"TTTC8434R": 1.0}
+
+
+
+def test_shared_rate_limiter_keeps_config_without_settings(monkeypatch):
+    monkeypatch.setattr("adapters.kis_rate_limit._SHARED", {})
+    shared = get_rate_limiter(True, rate_per_sec=3.0, tr_limits={"FHKST01010400": 1.0})
+    # 설정 없이 가져오면(BrokerKIS 기본값) 기존 속도/TR별 한도를 건드리지 않는다.
+    assert get_rate_limiter(True) is shared
+    assert shared.stats()["rate_per_sec"] == 3.0 and shared.stats()["tr_limits"] == {"FHKST01010400": 1.0}
+
+
+def test_market_kis_reuses_pooled_session(monkeypatch, tmp_path):
+    keys_path = tmp_path / "kis.keys.toml"
+    keys_path.write_text('[auth]\nappkey = "a"\nappsecret = "b"\n', encoding="utf-8")
+    settings = types.SimpleNamespace(
+        kis=types.SimpleNamespace(keys_path=str(keys_path), paper=True, pool_size=4),
+        watch=types.SimpleNamespace(symbols=[], universe="KOSPI_TOP200"),
+    )
+    monkeypatch.setattr("adapters.market_kis.ensure_token", lambda path, is_vts: "Bearer TEST")
+
+    market = MarketKIS(settings, rate_limiter=KISRateLimiter(1000.0))
+    adapter = market._session.get_adapter("https://openapivts.koreainvestment.com:29443")
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 3
+
+    class DummyResponse:
+        status_code = 200
+
+        def json(self):
+            return {"output": [{"stck_bsop_date": "20240102", "stck_oprc": "100", "stck_clpr": "101"}]}
+
+        def raise_for_status(self):
+            return None
+
+    sessions: list[object] = []
+    monkeypatch.setattr(
+        market._session,
+        "get",
+        lambda url, **kwargs: sessions.append(market._session) or DummyResponse(),
+    )
+
+    assert len(list(market.get_candles("005930.KS", limit=5))) == 1
+    assert len(list(market.get_candles("000660.KS", limit=5))) == 1
+    assert len(sessions) == 2
+    assert sessions[0] is sessions[1]
+    market.close()
+
+
+def test_candle_store_market_fetches_only_new_bars(tmp_path):
+    history_start = datetime(2024, 3, 1)
+
+    class CountingMarket(MarketMock):
+        def __init__(self) -> None:
+            super().__init__(seed=1)
+            self.days = 30
+            self.requests: list[int] = []
+
+        def get_candles(self, symbol, timeframe="D", limit=120):
+            self.requests.append(limit)
+            if symbol == "QUOTE":  # 일봉 실패 시 MarketKIS의 현재가 폴백 한 봉
+                return [Candle(symbol, datetime(2024, 3, 30, 10, 15), 500, 500, 500, 500, 10)]
+            bars = [
+                Candle(symbol, history_start + timedelta(days=i), 100 + i, 101 + i, 99 + i, 100.5 + i, 1000 + i)
+                for i in range(self.days)
+            ]
+            return bars[-limit:]
+
+    today = {"value": (history_start + timedelta(days=29)).date()}
+    storage = SQLiteStorage(tmp_path / "candles.db")
+    inner = CountingMarket()
+    market = CandleStoreMarket(inner, storage, today=lambda: today["value"])
+
+    first = market.get_candles("AAA", limit=20)
+    assert len(first) == 20
+    assert inner.requests == [20]
+
+    second = market.get_candles("AAA", limit=20)
+    assert [c.close for c in second] == [c.close for c in first]
+    assert inner.requests == [20, 1]
+
+    inner.days = 32
+    today["value"] = (history_start + timedelta(days=31)).date()
+    third = market.get_candles("AAA", limit=20)
+    assert inner.requests == [20, 1, 3]
+    assert third[-1].timestamp == history_start + timedelta(days=31)
+    assert len(third) == 20
+
+    market.get_candles("AAA", limit=25)
+    assert inner.requests[-1] == 25
+
+    # 요청보다 짧은 응답은 이력이 끝난 것으로 보고, 다음부터는 빈 구간만 조회한다.
+    assert len(market.get_candles("AAA", limit=40)) == 32
+    assert storage.get_candle_depth("AAA", "D") == 40
+    assert len(market.get_candles("AAA", limit=40)) == 32
+    assert inner.requests[-2:] == [40, 1]
+
+    assert len(market.get_candles("QUOTE", limit=20)) == 1
+    assert storage.load_candles("QUOTE", "D", 20) == [] and storage.get_candle_depth("QUOTE", "D") == 0
+    market.get_candles("QUOTE", limit=20)
+    assert inner.requests[-1] == 20
+    assert market.provider == "mock"
+    storage.close()
+
+
+def test_cached_market_ttl_lru_and_inflight_dedup():
+    calls: list[tuple[str, int]] = []
+    gate = threading.Event()
+
+    class GatedMarket(MarketMock):
+        def get_candles(self, symbol, timeframe="D", limit=120):
+            calls.append((symbol, limit))
+            gate.wait(timeout=2)
+            return super().get_candles(symbol, timeframe, limit)
+
+    clock = {"now": 0.0}
+    market = CachedMarket(
+        GatedMarket(seed=3),
+        max_entries=2,
+        ttl_by_timeframe={"D": 10.0},
+        clock=lambda: clock["now"],
+    )
+
+    results: list[list[Candle]] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(list(market.get_candles("AAA", limit=5))))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [("AAA", 5)]
+    assert all([c.close for c in r] == [c.close for c in results[0]] for r in results)
+
+    market.get_candles("AAA", limit=5)
+    assert market.stats()["hits"] == 1
+    assert market.stats()["coalesced"] == 3
+
+    clock["now"] = 11.0
+    market.get_candles("AAA", limit=5)
+    assert len(calls) == 2
+
+    market.get_candles("BBB", limit=5)
+    market.get_candles("CCC", limit=5)
+    stats = market.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert market.provider == "mock"
+
+
+def test_single_flight_serves_smaller_limit_from_larger_request():
+    started = threading.Event()
+    release = threading.Event()
+    upstream: list[int] = []
+    market = MarketMock(seed=5)
+
+    def slow_fetch(limit: int):
+        upstream.append(limit)
+        started.set()
+        release.wait(timeout=2)
+        return market.get_candles("AAA", "D", limit)
+
+    flights = CandleSingleFlight()
+    results: dict[str, tuple] = {}
+
+    leader = threading.Thread(
+        target=lambda: results.__setitem__("big", flights.run("AAA", "D", 120, lambda: slow_fetch(120)))
+    )
+    leader.start()
+    assert started.wait(timeout=2)
+    follower = threading.Thread(
+        target=lambda: results.__setitem__("small", flights.run("AAA", "D", 2, lambda: slow_fetch(2)))
+    )
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    follower.join()
+
+    big, big_leader = results["big"]
+    small, small_leader = results["small"]
+    assert upstream == [120]
+    assert big_leader is True and small_leader is False
+    assert len(big) == 120
+    assert small == big[-2:]
+    assert flights.shared == 1
+
+
+def test_cached_market_without_cache_still_coalesces():
+    market = CachedMarket(MarketMock(seed=9), max_entries=0)
+    market.get_candles("AAA", limit=10)
+    market.get_candles("AAA", limit=10)
+    stats = market.stats()
+    assert stats["size"] == 0
+    assert stats["misses"] == 2
+
+
+def test_polling_price_feed_polls_only_requested_symbols():
+    class QuoteMarket:
+        def __init__(self) -> None:
+            self.calls: list[str] = []
+
+        def get_price(self, symbol: str) -> float | None:
+            self.calls.append(symbol)
+            return None if symbol == "BAD" else 100.0 + len(self.calls)
+
+    market = QuoteMarket()
+    feed = PollingPriceFeed(market, interval=0.0)
+    wanted = {"AAA", "BAD"}
+
+    async def take(count: int):
+        ticks = []
+        async for tick in feed.stream(lambda: wanted):
+            ticks.append(tick)
+            if len(ticks) == count:
+                return ticks
+
+    ticks = asyncio.run(take(2))
+    assert [tick.symbol for tick in ticks] == ["AAA", "AAA"]
+    assert sorted(set(market.calls)) == ["AAA", "BAD"]
+
+    mock_feed = PollingPriceFeed(MarketMock(seed=1), interval=0.0)
+
+    async def first():
+        async for tick in mock_feed.stream(lambda: ["005930.KS"]):
+            return tick
+
+    tick = asyncio.run(first())
+    assert tick.symbol == "005930.KS"
+    assert tick.price == list(MarketMock(seed=1).get_candles("005930.KS", limit=1))[-1].close
+
+
+def test_replay_stream_round_trips_and_paces_events(tmp_path):
+    base = datetime(2024, 5, 2, 9, 0)
+    candles = [
+        Candle(symbol, base + timedelta(minutes=minute), 100.0, 101.0, 99.0, 100.5 + minute, 10.0)
+        for minute in range(3)
+        for symbol in ("BBB", "AAA")
+    ]
+    events = [*candle_events(candles, "1m"), PriceTick("AAA", 103.0, base + timedelta(minutes=3), 5.0)]
+    path = tmp_path / "replay.jsonl"
+    assert write_events(events, path) == 7
+    assert list(read_events(path)) == events
+    assert [event.symbol for event in events[:2]] == ["AAA", "BBB"]
+
+    async def collect(stream, symbols=None):
+        return [event async for event in stream.events(symbols)]
+
+    assert asyncio.run(collect(ReplayMarketStream(path), ["AAA"])) == [e for e in events if e.symbol == "AAA"]
+
+    # 3분 간격을 1800배속으로 재생하면 약 0.1초
+    started = time.perf_counter()
+    replayed = asyncio.run(collect(ReplayMarketStream(path, speed=1800)))
+    assert replayed == events
+    assert 0.08 <= time.perf_counter() - started < 1.0
+
+    async def held_ticks():
+        feed = StreamPriceFeed(ReplayMarketStream(events))
+        return [tick async for tick in feed.stream(lambda: {"BBB"})]
+
+    assert [tick.price for tick in asyncio.run(held_ticks())] == [100.5, 101.5, 102.5]
+
+
+def test_fake_kis_realtime_server_streams_parsable_frames():
+    frame = format_kis_frame(
+        [
+            PriceTick("005930.KS", 71000.0, datetime(2024, 5, 2, 0, 30, 1, tzinfo=timezone.utc), 12.0),
+            PriceTick("000660.KS", 180500.0, datetime(2024, 5, 2, 0, 30, 2, tzinfo=timezone.utc), 3.0),
+        ]
+    )
+    assert frame.startswith("0|H0STCNT0|002|005930^093001^71000^")
+    ticks = parse_kis_frame(frame, {"005930": "005930.KS"}, day=date(2024, 5, 2))
+    assert [(t.symbol, t.price, t.volume) for t in ticks] == [("005930.KS", 71000.0, 12.0), ("000660", 180500.0, 3.0)]
+    assert ticks[0].timestamp == datetime(2024, 5, 2, 0, 30, 1, tzinfo=timezone.utc)
+    assert parse_kis_frame('{"header": {"tr_id": "PINGPONG"}}') == []
+
+    async def scenario():
+        server = FakeKISRealtimeServer(rate=20_000, batch=50, total=2_000)
+        async with server:
+            stream = KISRealtimeStream("127.0.0.1", server.port, ["005930.KS", "035720.KQ"])
+            received = [tick async for tick in stream.events()]
+        return server, received
+
+    started = time.perf_counter()
+    server, received = asyncio.run(scenario())
+    assert len(received) == server.sent == 2_000
+    assert {tick.symbol for tick in received} == {"005930.KS", "035720.KQ"}
+    assert all(tick.price > 0 for tick in received)
+    assert time.perf_counter() - started < 2.0
+
+
+def test_bar_aggregator_rolls_ticks_into_higher_timeframes():
+    start = datetime(2024, 5, 2, 9, 0)
+    aggregator = BarAggregator(("1m", "5m", "15m"), maxlen=64)
+    closed = []
+    prices = [100 + (i * 7) % 11 for i in range(40 * 3)]
+    for i, price in enumerate(prices):
+        # 20초 간격 틱: 분당 3개
+        closed.extend(aggregator.add_tick(PriceTick("AAA", float(price), start + timedelta(seconds=20 * i), 1.0)))
+
+    minute = aggregator.bars("AAA", "1m", limit=100)
+    assert len(minute) == 40 and minute[-1].timestamp == start + timedelta(minutes=39)
+    assert minute[0].open == prices[0] and minute[0].close == prices[2] and minute[0].volume == 3.0
+
+    def direct(width):
+        groups = [minute[i : i + width] for i in range(0, len(minute), width)]
+        return [
+            (g[0].timestamp, g[0].open, max(c.high for c in g), min(c.low for c in g), g[-1].close, sum(c.volume for c in g))
+            for g in groups
+        ]
+
+    for timeframe, width in (("5m", 5), ("15m", 15)):
+        rolled = [(c.timestamp, c.open, c.high, c.low, c.close, c.volume) for c in aggregator.bars("AAA", timeframe, limit=100)]
+        assert rolled == direct(width)
+    # 마지막 15분봉(09:30~)은 진행 중, 완성봉 이벤트는 순서대로 발생
+    assert [e.candle.timestamp.minute for e in closed if e.timeframe == "15m"] == [0, 15]
+    assert aggregator.bars("AAA", "15m", limit=2, include_partial=False)[-1].timestamp == start + timedelta(minutes=15)
+    assert [e.timeframe for e in aggregator.close_due(start + timedelta(minutes=45))] == ["1m", "5m", "15m"]
+    with pytest.raises(ValueError):
+        aggregator.bars("AAA", "30m")
+
+
+def test_market_kis_intraday_timeframes_share_one_minute_fetch(monkeypatch, tmp_path):
+    keys_path = tmp_path / "kis.keys.toml"
+    keys_path.write_text('[auth]\nappkey = "a"\nappsecret = "b"\n', encoding="utf-8")
+    settings = types.SimpleNamespace(
+        kis=types.SimpleNamespace(keys_path=str(keys_path), paper=True),
+        market=types.SimpleNamespace(intraday_timeframes=["1m", "5m", "15m"], bar_capacity=512, intraday_refresh_sec=60.0),
+    )
+    clock = {"now": datetime(2024, 5, 2, 9, 40, 30)}
+    monkeypatch.setattr("adapters.market_kis.ensure_token", lambda path, is_vts: "Bearer TEST")
+    monkeypatch.setattr("adapters.market_kis._now_dt", lambda: clock["now"])
+    market = MarketKIS(settings, rate_limiter=KISRateLimiter(1000.0))
+
+    calls: list[str] = []
+
+    def fake_call(path, tr_id, params):
+        assert tr_id == "FHKST03010200"
+        calls.append(params["FID_INPUT_HOUR_1"])
+        hour = datetime.strptime("20240502" + params["FID_INPUT_HOUR_1"], "%Y%m%d%H%M%S").replace(second=0)
+        latest = min(hour, clock["now"].replace(second=0))
+        items = []
+        for back in range(30):
+            ts = latest - timedelta(minutes=back)
+            if ts < datetime(2024, 5, 2, 9, 0):
+                break
+            n = (ts - datetime(2024, 5, 2, 9, 0)).seconds // 60
+            items.append(
+                {
+                    "stck_bsop_date": "20240502",
+                    "stck_cntg_hour": ts.strftime("%H%M%S"),
+                    "stck_oprc": str(100 + n),
+                    "stck_hgpr": str(102 + n),
+                    "stck_lwpr": str(99 + n),
+                    "stck_prpr": str(101 + n),
+                    "cntg_vol": "10",
+                }
+            )
+        return types.SimpleNamespace(json=lambda: {"output2": items})
+
+    monkeypatch.setattr(market, "_call", fake_call)
+
+    minute = list(market.get_candles("005930.KS", timeframe="1m", limit=60))
+    assert calls == ["094030", "091000"]  # 09:40부터 30건, 이어서 09:10 이전
+    assert len(minute) == 41 and minute[0].timestamp == datetime(2024, 5, 2, 9, 0)
+    five = list(market.get_candles("005930.KS", timeframe="5m", limit=20))
+    fifteen = list(market.get_candles("005930.KS", timeframe="15m", limit=20))
+    assert len(calls) == 2  # 상위 타임프레임은 1분봉을 다시 받지 않는다
+    assert [c.timestamp.minute for c in five] == [0, 5, 10, 15, 20, 25, 30, 35, 40]
+    assert five[0].open == 100 and five[0].close == 105 and five[0].high == 106 and five[0].volume == 50
+    assert [c.volume for c in fifteen] == [150, 150, 110]
+
+    # 재조회 간격이 지나면 마지막 저장 분봉 이후만 한 페이지로 받는다.
+    clock["now"] = datetime(2024, 5, 2, 9, 42, 10)
+    market._synced.clear()
+    minute = list(market.get_candles("005930.KS", timeframe="1m", limit=60))
+    assert calls[2:] == ["094210"]
+    assert minute[-1].timestamp == datetime(2024, 5, 2, 9, 42) and len(minute) == 43
+    market.close()
+
+
+def test_bar_ring_wraps_with_zero_copy_windows():
+    start = datetime(2024, 1, 1)
+    bars = [Candle("AAA", start + timedelta(days=i), 100 + i, 102 + i, 99 + i, 101 + i, 10 * i) for i in range(23)]
+    ring = BarRing("AAA", capacity=8)
+    for count, candle in enumerate(bars, start=1):
+        ring.append(candle)
+        held = bars[max(count - 8, 0) : count]
+        assert len(ring) == len(held)
+        for size in (1, 3, 8, 20):
+            window = ring.window(size)
+            assert [c.close for c in window] == [c.close for c in held[-size:]]
+            assert window[0].timestamp == held[-size:][0].timestamp
+    window = ring.window(5)
+    assert np.shares_memory(window.values, ring.window(8).values)
+    ring.update_last(Candle("AAA", bars[-1].timestamp, 1, 2, 0.5, 1.5, 7))
+    assert window.close[-1] == 1.5 and len(ring) == 8
+    assert not ring.upsert(bars[-5])  # 이미 지난 봉은 무시
+    ring.append(Candle("AAA", start + timedelta(days=30), 1, 1, 1, 1, 1))
+    assert window[0].timestamp == bars[-5].timestamp  # N개 창은 capacity-N번 append 동안 유지
+
+    store = BarStore(capacity=8)
+    store.merge("AAA", "D", bars[-2:])
+    assert len(store.window("AAA", "D")) == 2
+    store.merge("AAA", "D", bars[-6:])  # 더 과거까지 받은 시리즈면 다시 채운다
+    assert [c.close for c in store.window("AAA", "D")] == [c.close for c in bars[-6:]]
+    assert len(store.window("BBB", "D")) == 0
+    # 수정주가처럼 과거 봉이 바뀌면 겹치는 구간을 새 값으로 교체한다.
+    adjusted = [Candle("AAA", c.timestamp, c.open / 2, c.high / 2, c.low / 2, c.close / 2, c.volume) for c in bars[-4:-1]]
+    store.merge("AAA", "D", adjusted)
+    assert [c.close for c in store.window("AAA", "D")] == (
+        [c.close for c in bars[-6:-4]] + [c.close for c in adjusted] + [bars[-1].close]
+    )
+    # 같은 거래일이면 시각이 달라도 같은 봉으로 본다.
+    store.merge("AAA", "D", [Candle("AAA", bars[-1].timestamp + timedelta(hours=15), 1, 3, 1, 2, 5)])
+    assert len(store.window("AAA", "D")) == 6 and store.window("AAA", "D").close[-1] == 2
+
+
+def test_bar_store_market_serves_bounded_frames():
+    inner = MarketMock(seed=3)
+    market = BarStoreMarket(inner, capacity=64)
+    frame = market.get_candles("005930.KS", limit=50)
+    expected = list(inner.get_candles("005930.KS", limit=50))
+    assert isinstance(frame, CandleFrame)
+    assert [c.close for c in frame] == [c.close for c in expected]
+    assert len(market.get_candles("005930.KS", limit=200)) == 200  # 용량 초과 요청은 수신 캔들로 응답
+    assert len(market.store.window("005930.KS", "D")) == 64
+    assert market.stats()["series"] == 1
+    frames = fetch_candles(market, ["005930.KS"], limit=30, as_frames=True)
+    assert np.shares_memory(frames["005930.KS"].values, market.store.window("005930.KS", "D").values)
+
+
+def test_bar_store_market_repeated_mock_calls_keep_one_bar_per_day():
+    market = BarStoreMarket(MarketMock(seed=5), capacity=16)
+    frames = [market.get_candles("005930.KS", limit=5) for _ in range(4)]
+    assert all(len(frame) == 5 for frame in frames)
+    assert [c.close for c in frames[0]] == [c.close for c in frames[-1]]
+    days = [c.timestamp.date() for c in market.store.window("005930.KS", "D")]
+    assert len(days) == 5 and len(set(days)) == 5
+
+    # 현재가 폴백 한 봉은 링에 넣지 않고 보유 봉으로 응답한다.
+    quote = Candle("005930.KS", datetime.now(timezone.utc), 7, 7, 7, 7, 1)
+    market.inner = types.SimpleNamespace(get_candles=lambda *args, **kwargs: [quote])
+    assert [c.close for c in market.get_candles("005930.KS", limit=5)] == [c.close for c in frames[0]]
+    assert market.get_candles("000660.KS", limit=5)[0].close == 7
+    assert market.store.get("000660.KS", "D") is None or len(market.store.get("000660.KS", "D")) == 0
+
+
+def test_sqlite_storage_group_commits_concurrent_writes(tmp_path):
+    storage = SQLiteStorage(tmp_path / "wal.db", write_batch=64)
+    reader = sqlite3.connect(tmp_path / "wal.db")
+    assert reader.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def writer(worker: int) -> None:
+        for i in range(50):
+            storage.log_event("info", f"w{worker}-{i}")
+            storage.upsert_symbol(f"{worker:03d}{i:03d}", f"종목{i}")
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert storage.writes == 800
+    assert storage.commits < storage.writes  # 대기 중인 쓰기는 한 트랜잭션으로 묶인다
+    assert reader.execute("SELECT COUNT(*) FROM logs").fetchone()[0] == 400
+    names = []
+    worker = threading.Thread(target=lambda: names.append(storage.get_symbol_name("007049")))
+    worker.start()
+    worker.join()
+    assert names == ["종목49"]
+
+    # 실패한 작업은 같은 배치의 다른 쓰기를 되돌리지 않는다.
+    with pytest.raises(sqlite3.OperationalError):
+        storage._write(lambda conn: conn.execute("INSERT INTO missing VALUES (1)"))
+    storage.log_event("info", "after-error")
+    storage.close()
+    assert reader.execute("SELECT msg FROM logs ORDER BY id DESC LIMIT 1").fetchone()[0] == "after-error"
+    storage.log_event("info", "closed")  # 닫힌 뒤의 쓰기는 경고만 남긴다
+    reader.close()
+
+    # close()와 경쟁하는 쓰기는 커밋되거나 즉시 실패할 뿐 멈추지 않는다.
+    racing = SQLiteStorage(tmp_path / "race.db")
+    outcomes: list[str] = []
+
+    def hammer() -> None:
+        for i in range(200):
+            try:
+                racing._write(lambda conn: conn.execute("INSERT INTO logs(level, msg) VALUES('info', 'x')"))
+            except sqlite3.ProgrammingError:
+                outcomes.append("closed")
+                return
+        outcomes.append("done")
+
+    threads = [threading.Thread(target=hammer, daemon=True) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    racing.close()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads) and len(outcomes) == 4
+
+
+def test_remember_alert_uses_indexed_alerts_table(tmp_path):
+    db_path = tmp_path / "alerts.db"
+    legacy = sqlite3.connect(db_path)
+    legacy.execute("CREATE TABLE logs (id INTEGER PRIMARY KEY AUTOINCREMENT, level TEXT, msg TEXT, ts TEXT)")
+    legacy.execute("INSERT INTO logs(level, msg, ts) VALUES('alert', '005930.KS:stop_loss:2024-05-02', 'x')")
+    legacy.commit()
+    legacy.close()
+
+    storage = SQLiteStorage(db_path)
+    assert storage.remember_alert("005930.KS", "stop_loss", date(2024, 5, 2)) is False  # 이전 로그에서 이관
+    today = date(2024, 5, 3)
+    assert storage.remember_alert("005930.KS", "stop_loss", today) is True
+    writes = storage.writes
+    assert storage.remember_alert("005930.KS", "stop_loss", today) is False
+    assert storage.writes == writes  # 당일 키는 메모리에서 걸러진다
+    assert storage.remember_alert("005930.KS", "trailing", today) is True
+    storage.close()
+
+    reopened = SQLiteStorage(db_path)
+    assert reopened.remember_alert("005930.KS", "trailing", today) is False
+    plan = reopened._reader().execute(
+        "EXPLAIN QUERY PLAN SELECT 1 FROM logs WHERE level = 'risk' AND ts >= date('now')"
+    ).fetchall()
+    assert "idx_logs_level_ts" in " ".join(row[-1] for row in plan)
+    reopened.close()
+
+
+def test_daily_pnl_ledger_from_trades(tmp_path):
+    db_path = tmp_path / "ledger.db"
+    legacy = sqlite3.connect(db_path)  # 원장 테이블 없이 체결만 있는 기존 DB
+    legacy.execute("CREATE TABLE trades (id TEXT PRIMARY KEY, symbol TEXT, side TEXT, qty INTEGER, price REAL, ts TEXT)")
+    legacy.execute("INSERT INTO trades VALUES('b1', 'AAA', 'BUY', 10, 10000, '2024-05-02T00:10:00Z')")
+    legacy.commit()
+    legacy.close()
+
+    storage = SQLiteStorage(db_path, risk_pct=0.05)
+    day = date(2024, 5, 2)
+    # 평균 단가 11000, 1R = 11000 x 5% = 550원/주
+    storage.record_trade("b2", symbol="AAA", side="BUY", qty=10, price=12000, ts="2024-05-02T01:00:00Z")
+    storage.record_trade("s1", symbol="AAA", side="SELL", qty=5, price=9900, ts="2024-05-02T05:00:00Z")
+    storage.record_trade("s1", symbol="AAA", side="SELL", qty=5, price=9900, ts="2024-05-02T05:00:00Z")
+    pnl = storage.daily_pnl(day)
+    assert pnl["trades"] == 1 and pnl["realized"] == pytest.approx(-5500)
+    assert pnl["r"] == pytest.approx(-2.0)
+    assert not storage.is_daily_loss_limit_exceeded(-3.0, day)
+
+    # 보유 원장이 없으면 브로커가 넘긴 평균 단가로 계산하고, 체결가 없는 기록은 건너뛴다.
+    storage.record_trade("s2", avg_cost=20000, symbol="BBB", side="SELL", qty=1, price=18000, ts="2024-05-02T06:00:00Z")
+    storage.record_trade("s3", symbol="AAA", side="SELL", qty=5, price=0.0, ts="2024-05-02T06:00:00Z")
+    assert storage.daily_pnl(day)["r"] == pytest.approx(-4.0)
+
+    # 지정가 1주 + 시장가(체결가 0) 9주를 10주 매도하면 원장에 없는 9주는 브로커 평균 단가로 잡는다.
+    storage.record_trade("c1", symbol="CCC", side="BUY", qty=1, price=1000, ts="2024-05-01T01:00:00Z")
+    storage.record_trade("c2", symbol="CCC", side="BUY", qty=9, price=0.0, ts="2024-05-01T01:01:00Z")
+    storage.record_trade("c3", avg_cost=1000, symbol="CCC", side="SELL", qty=10, price=950, ts="2024-05-01T02:00:00Z")
+    assert storage.daily_pnl(date(2024, 5, 1))["realized"] == pytest.approx(-500)
+    assert storage.is_daily_loss_limit_exceeded(-3.0, day)
+    assert not storage.is_daily_loss_limit_exceeded(0, day)
+
+    # 15:30 UTC는 KST 기준 다음 날 거래로 집계된다.
+    storage.record_trade("s4", symbol="AAA", side="SELL", qty=5, price=11550, ts="2024-05-02T15:30:00Z")
+    assert storage.daily_pnl(date(2024, 5, 3))["r"] == pytest.approx(1.0)
+    plan = storage._reader().execute(
+        "EXPLAIN QUERY PLAN SELECT realized, r, trades FROM daily_pnl WHERE trade_date = ?", ("2024-05-02",)
+    ).fetchall()
+    assert "PRIMARY KEY" in " ".join(row[-1] for row in plan)
+    storage.close()
+
+
+def test_log_retention_trims_by_age_and_rows_with_archive(tmp_path):
+    db_path = tmp_path / "logs.db"
+    legacy = sqlite3.connect(db_path)  # auto_vacuum 없이 만들어진 기존 DB
+    legacy.execute("CREATE TABLE logs (id INTEGER PRIMARY KEY AUTOINCREMENT, level TEXT, msg TEXT, ts TEXT)")
+    legacy.commit()
+    legacy.close()
+    storage = SQLiteStorage(db_path)
+    now = datetime(2024, 5, 10, 12, 0, 0)
+    rows = [("INFO", f"ui {i}", (now - timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S")) for i in range(500)]
+    rows += [("order_ok", f"order {i}", (now - timedelta(days=i)).strftime("%Y-%m-%d %H:%M:%S")) for i in range(40)]
+    storage._write(lambda conn: conn.executemany("INSERT INTO logs(level, msg, ts) VALUES(?, ?, ?)", rows))
+
+    retention = LogRetention(
+        storage,
+        max_age_days={"INFO": 7, "*": 30},
+        max_rows={"INFO": 100},
+        batch_size=64,
+        archive_dir=tmp_path / "archive",
+        clock=lambda: now,
+    )
+    deleted = retention.run_once()
+    # INFO: 7일(168시간) 초과 332건 삭제 후 168건 중 오래된 68건을 더 삭제, order_ok: 30일 초과 9건
+    assert deleted == {"INFO": 400, "order_ok": 9}
+    assert storage.log_level_counts() == {"INFO": 100, "order_ok": 31}
+    assert [row[2] for row in storage.oldest_logs("INFO", 1)] == ["ui 99"]
+    assert retention.run_once() == {}
+
+    with gzip.open(tmp_path / "archive" / "logs-INFO-20240510.jsonl.gz", "rt", encoding="utf-8") as fh:
+        archived = [json.loads(line) for line in fh]
+    assert len(archived) == 400 and archived[0]["msg"] == "ui 499"
+    assert storage._reader().execute("PRAGMA auto_vacuum").fetchone()[0] == 2  # 증분 모드로 전환
+    assert storage.incremental_vacuum() == 0
+
+    storage.retention = retention.start()
+    storage.close()  # 백그라운드 스레드도 함께 정지
+    assert retention._thread is None
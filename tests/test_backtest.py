@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import csv
+import math
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from adapters.storage_sqlite import SQLiteStorage
+from config.schema import RiskSettings, StrategySettings
+from core.backtest import (
+    BacktestConfig,
+    CandlePanel,
+    daily_picks,
+    load_panel,
+    panel_features,
+    run_backtest,
+    score_panel,
+)
+from core.entities import Candle
+from core.risk import RiskConfig
+from core.strategy_v5 import StrategyV5
+from core.sweep import (
+    SweepResult,
+    expand_grid,
+    rank_results,
+    run_sweep,
+    sample_grid,
+    slice_features,
+    validate_sweep,
+    write_results,
+)
+from core.walkforward import cached_features, walk_forward, walk_forward_windows
+
+
+def _series(symbol: str, closes: list[float], base: datetime = datetime(2024, 1, 1)) -> list[Candle]:
+    return [
+        Candle(symbol, base + timedelta(days=day), close, close * 1.01, close * 0.99, close, 1000.0 + day)
+        for day, close in enumerate(closes)
+    ]
+
+
+def test_score_panel_and_picks_match_screen_candidates():
+    rng = random.Random(2)
+    data = {}
+    for idx in range(25):
+        price = rng.uniform(1_000, 50_000)
+        closes = []
+        for _ in range(40):
+            price *= 1 + rng.gauss(0, 0.02)
+            closes.append(price)
+        data[f"B{idx:02d}"] = _series(f"B{idx:02d}", closes)
+    data["B03"] = data["B03"][10:]  # listed later: not eligible for its first 20 days
+    data["B05"][30].close = 0.0  # exercised through the exact scalar path
+
+    panel = CandlePanel.from_candles(data)
+    strategy = StrategyV5(StrategySettings())
+    scores = score_panel(strategy, panel, chunk_days=7)
+    picks = daily_picks(scores, 4)
+
+    day = 35
+    window = {
+        symbol: candles[: len(candles) - (39 - day)][-21:]
+        for symbol, candles in data.items()
+    }
+    expected = strategy.screen_candidates(window, top_n=4)
+    assert [panel.symbols[idx] for idx in picks[day]] == [signal.symbol for signal in expected]
+    for signal in expected:
+        assert scores[panel.symbols.index(signal.symbol), day] == signal.score
+    assert np.isnan(scores[panel.symbols.index("B03"), 29])
+    assert math.isfinite(scores[panel.symbols.index("B03"), 30])
+
+
+def test_run_backtest_fills_next_open_and_applies_exit_rules():
+    # 30 flat bars, then the pick rallies (take profit) while the other symbol slides (stop loss).
+    flat = [100.0] * 30
+    panel = CandlePanel.from_candles(
+        {
+            "UP": _series("UP", flat + [104.0, 110.0, 121.0, 121.0]),
+            "DOWN": _series("DOWN", flat + [99.0, 88.0, 88.0, 88.0]),
+        }
+    )
+    risk = RiskConfig(stop_loss_pct=0.07, take_profit_pct=0.18, trailing_pct=0.0, max_positions=2)
+    config = BacktestConfig(initial_cash=1_000_000, top_n=2, fee_rate=0.0, slippage=0.0)
+
+    result = run_backtest(StrategyV5(StrategySettings()), panel, risk, config)
+
+    # Both are picked on day 20 (first full window) and bought at the day-21 open;
+    # exits trigger on a close and fill at the following open.
+    base = datetime(2024, 1, 1)
+    exits = {trade.symbol: (trade.reason, (trade.exit_date - base).days) for trade in result.trades}
+    assert exits == {"DOWN": ("stop_loss", 32), "UP": ("take_profit", 33)}
+    for trade in result.trades:
+        assert trade.entry_date == base + timedelta(days=21)
+        assert trade.entry_price == 100.0
+    assert result.open_positions == 1  # DOWN is still a top pick and is bought back at 88
+    assert result.hit_rate == 0.5
+    assert result.equity[0] == 1_000_000
+    assert result.equity[-1] == 1_000_000 + sum(trade.pnl for trade in result.trades)
+    assert 0 < result.max_drawdown < 0.1
+
+
+def test_load_panel_reads_candles_table(tmp_path):
+    storage = SQLiteStorage(tmp_path / "bt.db")
+    storage.upsert_candles("D", _series("AAA", [10.0, 11.0, 12.0]))
+    storage.upsert_candles("D", _series("BBB", [20.0, 21.0], base=datetime(2024, 1, 2)))
+
+    panel = load_panel(storage)
+    assert panel.symbols == ["AAA", "BBB"]
+    assert panel.dates == [datetime(2024, 1, 1), datetime(2024, 1, 2), datetime(2024, 1, 3)]
+    assert panel.close[0].tolist() == [10.0, 11.0, 12.0]
+    assert np.isnan(panel.close[1, 0]) and panel.close[1, 1:].tolist() == [20.0, 21.0]
+
+    only = load_panel(storage, ["BBB"], start=datetime(2024, 1, 3).date())
+    assert only.symbols == ["BBB"] and only.close.tolist() == [[21.0]]
+    storage.close()
+
+
+def _random_panel(seed: int, symbols: int = 12, days: int = 90) -> CandlePanel:
+    rng = random.Random(seed)
+    data = {}
+    for idx in range(symbols):
+        price = rng.uniform(1_000, 50_000)
+        closes = []
+        for _ in range(days):
+            price *= 1 + rng.gauss(0.001, 0.03)
+            closes.append(price)
+        data[f"W{idx:02d}"] = _series(f"W{idx:02d}", closes)
+    return CandlePanel.from_candles(data)
+
+
+def test_sweep_grid_helpers():
+    grid = {"intensity": [0.5, 1.0], "stop_loss_pct": [0.05, 0.07, 0.09]}
+    combos = expand_grid(grid)
+    assert len(combos) == 6 and combos[0] == {"intensity": 0.5, "stop_loss_pct": 0.05}
+    assert sample_grid(grid, 4, seed=1) == sample_grid(grid, 4, seed=1)
+    assert len(sample_grid(grid, 4)) == 4 and sample_grid(grid, 0) == combos
+    with pytest.raises(ValueError):
+        expand_grid({"unknown": [1.0]})
+    # 잘못된 순위 기준이나 범위를 벗어난 값은 백테스트 전에 거른다.
+    validate_sweep(StrategySettings(), RiskSettings(), combos, "hit_rate_pct")
+    with pytest.raises(ValueError):
+        validate_sweep(StrategySettings(), RiskSettings(), combos, "total_return")
+    with pytest.raises(ValueError):
+        validate_sweep(StrategySettings(), RiskSettings(), [{"stop_loss_pct": -0.1}], "pnl")
+    with pytest.raises(ValueError):
+        validate_sweep(StrategySettings(), RiskSettings(), combos, "open_positions")
+
+    # 낙폭은 작은 쪽이 우선이고, 같은 값은 조합 순서를 유지한다.
+    results = [
+        SweepResult({"intensity": 0.5}, {"max_drawdown_pct": 12.0, "total_return_pct": 9.0}),
+        SweepResult({"intensity": 1.0}, {"max_drawdown_pct": 4.5, "total_return_pct": 3.0}),
+        SweepResult({"intensity": 1.5}, {"max_drawdown_pct": 4.5, "total_return_pct": 1.0}),
+    ]
+    by_drawdown = rank_results(results, "max_drawdown_pct")
+    assert [r.params["intensity"] for r in by_drawdown] == [1.0, 1.5, 0.5]
+    assert rank_results(results, "total_return_pct")[0].params["intensity"] == 0.5
+
+
+def test_run_sweep_matches_individual_backtests_and_writes_results(tmp_path):
+    panel = _random_panel(6)
+    combos = expand_grid({"intensity": [0.2, 1.5], "take_profit_pct": [0.05, 0.3]})
+    config = BacktestConfig(top_n=3)
+    strategy, risk = StrategySettings(), RiskSettings()
+
+    results = run_sweep(panel, strategy, risk, combos, config=config)
+    pooled = run_sweep(panel, strategy, risk, combos, config=config, workers=2)
+    assert [(r.params, r.summary) for r in pooled] == [(r.params, r.summary) for r in results]
+
+    returns = [result.summary["total_return_pct"] for result in results]
+    assert returns == sorted(returns, reverse=True)
+    for result in results:
+        single = run_backtest(
+            StrategyV5(strategy.model_copy(update={"intensity": result.params["intensity"]})),
+            panel,
+            risk.model_copy(update={"take_profit_pct": result.params["take_profit_pct"]}),
+            config,
+        )
+        assert result.summary == single.summary()
+
+    with write_results(results, tmp_path / "sweep.csv").open(encoding="utf-8") as fh:
+        rows = list(csv.DictReader(fh))
+    assert [row["rank"] for row in rows] == ["1", "2", "3", "4"]
+    assert float(rows[0]["total_return_pct"]) == returns[0]
+
+    write_results(results, tmp_path / "sweep.db")
+    conn = sqlite3.connect(tmp_path / "sweep.db")
+    assert conn.execute("SELECT COUNT(*) FROM sweep_results").fetchone()[0] == 4
+    conn.close()
+
+
+def test_walk_forward_windows_do_not_overlap():
+    assert walk_forward_windows(60, 20, 10) == [((20, 40), (40, 50)), ((30, 50), (50, 60))]
+    assert walk_forward_windows(60, 20, 15, step_days=5)[0] == ((20, 40), (40, 45))
+    assert walk_forward_windows(40, 20, 10) == []
+    with pytest.raises(ValueError):
+        walk_forward_windows(60, 0, 10)
+
+
+def test_walk_forward_uses_cached_features_and_chains_out_of_sample(tmp_path):
+    panel = _random_panel(8, days=120)
+    combos = expand_grid({"intensity": [0.2, 1.5], "stop_loss_pct": [0.03, 0.1]})
+    config = BacktestConfig(top_n=3)
+    strategy, risk = StrategySettings(), RiskSettings()
+
+    features, path = cached_features(panel, tmp_path)
+    assert isinstance(features.change_pct, np.memmap)
+    expected = panel_features(panel)
+    for name in ("change_pct", "momentum_pct", "volatility", "volume_rank", "range_ratio"):
+        np.testing.assert_array_equal(getattr(features, name), getattr(expected, name))
+
+    result = walk_forward(
+        panel, strategy, risk, combos, train_days=40, test_days=20, config=config, cache_dir=tmp_path
+    )
+    assert list(tmp_path.glob("*.npy")) == [path]
+    assert len(result.windows) == 3
+    for window, (train, _) in zip(result.windows, walk_forward_windows(120, 40, 20)):
+        in_sample = [
+            run_backtest(
+                StrategyV5(strategy.model_copy(update={"intensity": params["intensity"]})),
+                panel.slice(*train),
+                risk.model_copy(update={"stop_loss_pct": params["stop_loss_pct"]}),
+                config,
+                features=slice_features(expected, *train),
+            ).summary()
+            for params in combos
+        ]
+        best = max(range(len(combos)), key=lambda idx: in_sample[idx]["total_return_pct"])
+        assert window.params == combos[best] and window.train == in_sample[best]
+        assert window.train_start == panel.dates[train[0]]
+
+    oos = result.out_of_sample
+    assert oos.equity[0] == config.initial_cash
+    assert len(oos.equity) == len(oos.dates) == 61
+    assert oos.dates[1] == result.windows[0].test_start
+    assert result.summary()["windows"] == 3
+
+    pooled = walk_forward(
+        panel, strategy, risk, combos, train_days=40, test_days=20, config=config, cache_dir=tmp_path, workers=2
+    )
+    assert [w.params for w in pooled.windows] == [w.params for w in result.windows]
+    np.testing.assert_array_equal(pooled.out_of_sample.equity, oos.equity)
@@ -1,7 +1,16 @@
 from __future__ import annotations
 
-from core.entities import ExitSignal, Position
-from core.risk import RiskConfig, RiskManager, evaluate_exit
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+from adapters.broker_mock import MockBroker
+from adapters.price_feed import FakePriceFeed
+from adapters.storage_sqlite import SQLiteStorage
+from core.entities import ExitSignal, Position, PriceTick
+from core.monitor import ExitMonitor
+from core.risk import EXIT_TYPES, RiskConfig, RiskManager, evaluate_exit, evaluate_exits, exit_signals
+from core.trailing import TrailingStopTracker
 
 
 def make_position(avg: float, last: float) -> Position:
@@ -31,3 +40,177 @@ def test_risk_manager_capacity():
     manager = RiskManager(RiskConfig(max_positions=3))
     assert manager.can_open_position(2) is True
     assert manager.can_open_position(3) is False
+
+
+def _reference_exit(position: Position, config: RiskConfig) -> str | None:
+    # evaluate_exit 우선순위를 그대로 옮긴 스칼라 기준 구현
+    pnl = position.pnl_pct or (
+        (position.last_price - position.avg_price) / position.avg_price if position.avg_price else 0.0
+    )
+    if pnl <= -config.stop_loss_pct:
+        return "stop_loss"
+    if position.trail_stop and position.last_price <= position.trail_stop * (1 - config.trailing_pct):
+        return "trailing"
+    if pnl >= config.take_profit_pct:
+        return "take_profit"
+    if position.hard_stop and position.last_price <= position.hard_stop:
+        return "hard_stop"
+    return None
+
+
+def test_evaluate_exits_matches_scalar_rules():
+    rng = random.Random(5)
+    config = RiskConfig(stop_loss_pct=0.05, take_profit_pct=0.1, trailing_pct=0.03)
+    positions = []
+    for idx in range(500):
+        avg = rng.choice([0.0, 100.0])
+        positions.append(
+            Position(
+                symbol=f"S{idx}",
+                qty=1,
+                avg_price=avg,
+                last_price=rng.uniform(80, 125),
+                pnl_pct=rng.choice([0.0, 0.0, rng.uniform(-0.1, 0.2)]),
+                trail_stop=rng.choice([0.0, rng.uniform(90, 130)]),
+                hard_stop=rng.choice([0.0, rng.uniform(85, 100)]),
+            )
+        )
+    now = datetime(2024, 1, 2, tzinfo=timezone.utc)
+    fired = exit_signals(positions, config, now=now)
+    by_symbol = {position.symbol: signal for position, signal in fired}
+    for position in positions:
+        signal = by_symbol.get(position.symbol)
+        assert (signal.signal_type if signal else None) == _reference_exit(position, config)
+        if signal:
+            assert signal.message == evaluate_exit(position, config).message
+            assert signal.triggered_at == now
+    assert {signal.signal_type for signal in by_symbol.values()} == set(EXIT_TYPES[1:])
+
+    mask, codes = evaluate_exits([94.0, 101.0, 96.0], [100.0, 100.0, 100.0], [0.0, 0.0, 0.0], [0.0, 0.0, 97.0], config)
+    assert mask.tolist() == [True, False, True]
+    assert [EXIT_TYPES[code] for code in codes] == ["stop_loss", "", "hard_stop"]
+    assert exit_signals([], config) == []
+
+
+def test_trailing_tracker_raises_marks_and_flushes_in_batches(tmp_path):
+    storage = SQLiteStorage(tmp_path / "trail.db")
+    held = Position(symbol="AAA", qty=10, avg_price=100.0, last_price=105.0)
+    other = Position(symbol="BBB", qty=5, avg_price=50.0, last_price=50.0, trail_stop=55.0)
+    for position in (held, other):
+        storage.upsert_position(position, "2024-01-02T00:00:00")
+
+    now = [0.0]
+    tracker = TrailingStopTracker(storage, flush_size=2, flush_interval=60.0, clock=lambda: now[0])
+    tracker.sync([held, other, Position(symbol="CCC", qty=0, avg_price=0.0)])
+    assert len(tracker) == 2 and "CCC" not in tracker
+    assert (held.trail_stop, other.trail_stop) == (105.0, 55.0)
+
+    assert tracker.update("AAA", 112.0) == 112.0
+    assert tracker.update("AAA", 108.0) == 112.0  # 고점은 내려가지 않는다
+    assert (held.trail_stop, held.last_price) == (112.0, 108.0)
+    assert held.pnl_pct == 0.08
+    assert tracker.update("ZZZ", 10.0) is None
+    assert {pos.symbol: pos.trail_stop for pos in storage.get_positions()}["AAA"] == 0.0  # 아직 배치 대기
+
+    tracker.update("BBB", 57.0)  # 두 번째 dirty 종목에서 배치 저장
+    stored = {pos.symbol: pos.trail_stop for pos in storage.get_positions()}
+    assert stored == {"AAA": 112.0, "BBB": 57.0}
+
+    tracker.update("AAA", 120.0)
+    now[0] = 61.0
+    tracker.update("AAA", 119.0)  # 간격이 지나면 한 종목만 있어도 저장
+    assert {pos.symbol: pos.trail_stop for pos in storage.get_positions()}["AAA"] == 120.0
+
+    tracker.sync([other])
+    assert "AAA" not in tracker and tracker.mark("AAA") is None
+    storage.close()
+
+
+def test_risk_manager_on_price_reacts_to_intraday_peak():
+    tracker = TrailingStopTracker()
+    manager = RiskManager(RiskConfig(trailing_pct=0.03, take_profit_pct=0.5), tracker=tracker)
+    position = Position(symbol="AAA", qty=10, avg_price=100.0, last_price=100.0)
+    tracker.sync([position])
+
+    assert manager.on_price("AAA", 110.0) is None
+    signal = manager.on_price("AAA", 106.0)
+    assert signal and signal.signal_type == "trailing"
+    assert manager.on_price("ZZZ", 1.0) is None
+    assert RiskManager().on_price("AAA", 1.0) is None
+
+
+class _RecordingNotifier:
+    def __init__(self) -> None:
+        self.messages: list[str] = []
+
+    def send(self, text: str) -> bool:
+        self.messages.append(text)
+        return True
+
+
+def test_exit_monitor_alerts_on_feed_ticks_for_held_symbols(tmp_path):
+    storage = SQLiteStorage(tmp_path / "monitor.db")
+    storage.upsert_position(Position(symbol="AAA", qty=10, avg_price=100.0, last_price=100.0), "t")
+    storage.upsert_position(Position(symbol="BBB", qty=5, avg_price=50.0, last_price=50.0), "t")
+    notifier = _RecordingNotifier()
+    risk = RiskManager(RiskConfig(stop_loss_pct=0.05, trailing_pct=0.03, take_profit_pct=0.5))
+    feed = FakePriceFeed(
+        [
+            PriceTick("ZZZ", 1.0, datetime.now(timezone.utc)),  # 미보유 종목은 구독하지 않는다
+            PriceTick("AAA", 110.0, datetime.now(timezone.utc)),
+            PriceTick("BBB", 47.0, datetime.now(timezone.utc)),  # -6% 손절
+            PriceTick("AAA", 106.0, datetime.now(timezone.utc)),  # 고점 110 대비 -3.6% 트레일링
+            PriceTick("AAA", 105.0, datetime.now(timezone.utc)),  # 같은 날 같은 신호는 한 번만
+        ],
+        close_when_drained=True,
+    )
+    monitor = ExitMonitor(risk, feed, notifier, storage=storage, broker=MockBroker(storage), resync_sec=0)
+
+    asyncio.run(monitor.run())
+
+    assert [(signal.symbol, signal.signal_type) for signal in monitor.alerts] == [
+        ("BBB", "stop_loss"),
+        ("AAA", "trailing"),
+    ]
+    assert monitor.ticks == 4
+    assert len(notifier.messages) == 2 and "BBB" in notifier.messages[0]
+    assert 0 <= monitor.max_latency < 5
+    # 종료 시 고점이 저장소에 반영되고, 스캔 루프의 중복 알림 기록도 공유한다.
+    assert {pos.symbol: pos.trail_stop for pos in storage.get_positions()}["AAA"] == 110.0
+    assert storage.remember_alert("AAA", "trailing", monitor.alerts[1].triggered_at.date()) is False
+    storage.close()
+
+
+def test_exit_monitor_stops_on_event():
+    risk = RiskManager(tracker=TrailingStopTracker())
+    risk.tracker.sync([Position(symbol="AAA", qty=1, avg_price=100.0, last_price=100.0)])
+    feed = FakePriceFeed()
+    monitor = ExitMonitor(risk, feed, _RecordingNotifier())
+
+    async def scenario() -> None:
+        stop = asyncio.Event()
+        task = asyncio.create_task(monitor.run(stop))
+        feed.push("AAA", 90.0)
+        while not monitor.alerts:
+            await asyncio.sleep(0)
+        stop.set()
+        await asyncio.wait_for(task, 1)
+
+    asyncio.run(scenario())
+    assert monitor.alerts[0].signal_type == "stop_loss"
+
+
+def test_exit_monitor_accepts_naive_kst_ticks():
+    risk = RiskManager(tracker=TrailingStopTracker())
+    risk.tracker.sync([Position(symbol="AAA", qty=1, avg_price=100.0, last_price=100.0)])
+    # KIS 캔들로 기록한 재생 파일처럼 tz 없는 KST 시각
+    naive_now = datetime.now(timezone.utc).astimezone(timezone(timedelta(hours=9))).replace(tzinfo=None)
+    feed = FakePriceFeed([PriceTick("AAA", 90.0, naive_now)], close_when_drained=True)
+    notifier = _RecordingNotifier()
+    monitor = ExitMonitor(risk, feed, notifier)
+
+    asyncio.run(monitor.run())
+
+    assert [signal.signal_type for signal in monitor.alerts] == ["stop_loss"]
+    assert len(notifier.messages) == 1
+    assert 0 <= monitor.max_latency < 5
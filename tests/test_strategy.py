@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import random
+import statistics
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+import numpy as np
+
 from config.schema import StrategySettings
-from core.entities import Candle
+from core import parallel
+from core.entities import Candle, CandleFrame, Signal, top_n_signals
+from core.rolling import RollingScoreState
+from core.scoring import exact_pstdev
 from core.strategy_v5 import StrategyV5
 
 
@@ -34,3 +43,239 @@ def test_screen_candidates_orders_by_score():
     assert [signal.symbol for signal in signals] == ["BBB", "AAA"]
     assert all(signal.score != 0 for signal in signals)
     assert all(signal.reasons for signal in signals)
+
+
+def test_batch_scores_match_score_symbol_bit_for_bit():
+    rng = random.Random(11)
+    base = datetime(2024, 1, 1)
+    data: dict[str, list[Candle]] = {}
+    for idx in range(300):
+        length = rng.choice([5, 9, 10, 15, 20, 21, 40, 120])
+        price = rng.uniform(1_000, 100_000)
+        series = []
+        for day in range(length):
+            price = max(round(price * (1 + rng.gauss(0, 0.03))), 1)
+            volume = rng.choice([1000.0, 2000.0, rng.uniform(1e5, 1e6)])
+            series.append(_make_candle(f"S{idx:03d}", base, day, price, volume))
+        data[f"S{idx:03d}"] = series
+    data["S000"][-3].close = 0.0
+    data["S001"] = [_make_candle("S001", base, day, 500.0, 1000.0) for day in range(25)]
+
+    strategy = StrategyV5(StrategySettings(return_threshold=1.2, intensity=0.8, volume_rank=0.6))
+    signals = strategy.screen_candidates(data, top_n=len(data))
+
+    expected = {symbol: strategy.score_symbol(candles) for symbol, candles in data.items()}
+    assert len(signals) == len(data)
+    for signal in signals:
+        score, reasons = expected[signal.symbol]
+        assert signal.score == score
+        assert signal.reasons == reasons
+
+
+def test_score_batch_matches_per_symbol_scores():
+    rng = random.Random(3)
+    base = datetime(2024, 1, 1)
+    rows = []
+    for idx in range(50):
+        price = rng.uniform(1_000, 50_000)
+        series = []
+        for day in range(30):
+            price *= 1 + rng.gauss(0, 0.02)
+            series.append(_make_candle("X", base, day, price, rng.uniform(1e4, 1e6)))
+        rows.append(series)
+    arrays = [
+        np.array([[getattr(candle, field) for candle in series] for series in rows])
+        for field in ("open", "high", "low", "close", "volume")
+    ]
+    strategy = StrategyV5(StrategySettings())
+
+    scores = strategy.score_batch(*arrays)
+    assert scores.tolist() == [strategy.score_symbol(series)[0] for series in rows]
+
+
+def test_candle_frame_round_trip_and_views():
+    base = datetime(2024, 1, 1)
+    candles = [_make_candle("AAA", base, i, 100 + i, 1000 + i) for i in range(30)]
+    frame = CandleFrame.from_candles(candles)
+
+    assert frame.symbol == "AAA"
+    assert len(frame) == 30
+    assert frame.to_candles() == candles
+    assert frame[-1] == candles[-1]
+    assert frame.close.tolist() == [candle.close for candle in candles]
+
+    window = frame.tail(5)
+    assert np.shares_memory(window.values, frame.values)
+    assert list(window) == candles[-5:]
+
+    df = frame.to_pandas()
+    assert list(df.columns) == ["timestamp", "open", "high", "low", "close", "volume"]
+    assert df["timestamp"].iloc[-1] == candles[-1].timestamp
+    assert df["close"].tolist() == frame.close.tolist()
+
+
+def test_screen_candidates_accepts_candle_frames():
+    rng = random.Random(5)
+    base = datetime(2024, 1, 1)
+    data: dict[str, list[Candle]] = {}
+    for idx in range(40):
+        price = rng.uniform(1_000, 50_000)
+        series = []
+        for day in range(rng.choice([8, 12, 30, 60])):
+            price *= 1 + rng.gauss(0, 0.02)
+            series.append(_make_candle(f"F{idx:02d}", base, day, price, rng.uniform(1e4, 1e6)))
+        data[f"F{idx:02d}"] = series
+    frames = {symbol: CandleFrame.from_candles(series, symbol) for symbol, series in data.items()}
+    strategy = StrategyV5(StrategySettings())
+
+    from_lists = strategy.screen_candidates(data, top_n=10)
+    from_frames = strategy.screen_candidates(frames, top_n=10)
+    assert [(s.symbol, s.score, s.reasons) for s in from_frames] == [
+        (s.symbol, s.score, s.reasons) for s in from_lists
+    ]
+
+
+def test_top_n_signals_keeps_stable_order_for_ties():
+    signals = [Signal(symbol=f"S{idx}", score=float(idx % 4)) for idx in range(20)]
+
+    assert top_n_signals(signals, 6) == sorted(signals, key=lambda s: s.score, reverse=True)[:6]
+    assert top_n_signals(signals, 0) == []
+    assert top_n_signals(iter(signals), 50) == sorted(signals, key=lambda s: s.score, reverse=True)
+
+
+def test_screen_candidates_top_n_is_prefix_of_full_ranking(monkeypatch):
+    rng = random.Random(9)
+    base = datetime(2024, 1, 1)
+    data: dict[str, list[Candle]] = {}
+    for idx in range(60):
+        price = rng.uniform(1_000, 50_000)
+        series = []
+        for day in range(rng.choice([5, 25, 40])):
+            price *= 1 + rng.gauss(0, 0.02)
+            series.append(_make_candle(f"T{idx:02d}", base, day, price, rng.uniform(1e4, 1e6)))
+        data[f"T{idx:02d}"] = series
+    strategy = StrategyV5(StrategySettings())
+    full = strategy.screen_candidates(data, top_n=len(data))
+
+    looked_up: list[str] = []
+    monkeypatch.setattr("core.strategy_v5.get_name", lambda symbol: looked_up.append(symbol) or symbol)
+    top = strategy.screen_candidates(data, top_n=5)
+
+    assert [(s.symbol, s.score, s.reasons) for s in top] == [
+        (s.symbol, s.score, s.reasons) for s in full[:5]
+    ]
+    assert looked_up == [s.symbol for s in top]
+
+
+def test_rolling_state_matches_full_recompute():
+    rng = random.Random(21)
+    base = datetime(2024, 1, 1)
+    strategy = StrategyV5(StrategySettings(return_threshold=1.3, intensity=0.7, volume_rank=0.5))
+    for _ in range(40):
+        series: list[Candle] = []
+        state = RollingScoreState()
+        price = rng.uniform(1_000, 100_000)
+        day = 0
+        for _ in range(60):
+            action = rng.random()
+            if action < 0.5 or not series:
+                price = max(round(price * (1 + rng.gauss(0, 0.03))), 1)
+                series.append(_make_candle("R", base, day, price, rng.uniform(1e4, 1e6)))
+                day += 1
+            elif action < 0.9:
+                close = max(round(price * (1 + rng.gauss(0, 0.01))), 1)
+                series[-1] = _make_candle("R", base, day - 1, close, rng.uniform(1e4, 1e6))
+            else:
+                day += 3  # a gap forces a rebuild from the series tail
+                series.append(_make_candle("R", base, day, price, 1000.0))
+                day += 1
+            state.sync(CandleFrame.from_candles(series) if rng.random() < 0.3 else list(series))
+            assert strategy._score_state(state, with_reasons=True) == strategy.score_symbol(series)
+
+
+def test_rescreen_matches_screen_candidates_across_updates():
+    rng = random.Random(4)
+    base = datetime(2024, 1, 1)
+    data = {
+        f"U{idx:02d}": [
+            _make_candle(f"U{idx:02d}", base, day, 1_000 + rng.uniform(-50, 50) * day, rng.uniform(1e4, 1e6))
+            for day in range(rng.choice([6, 15, 30]))
+        ]
+        for idx in range(30)
+    }
+    strategy = StrategyV5(StrategySettings())
+    for step in range(5):
+        for symbol, series in data.items():
+            last = series[-1]
+            close = last.close * (1 + rng.gauss(0, 0.02))
+            if step % 2:
+                series.append(_make_candle(symbol, base, len(series), close, rng.uniform(1e4, 1e6)))
+            else:
+                series[-1] = _make_candle(symbol, base, len(series) - 1, close, last.volume)
+        incremental = strategy.rescreen(data, top_n=8)
+        full = strategy.screen_candidates(data, top_n=8)
+        assert [(s.symbol, s.score, s.reasons) for s in incremental] == [
+            (s.symbol, s.score, s.reasons) for s in full
+        ]
+
+
+def test_process_pool_screening_matches_single_process():
+    rng = random.Random(8)
+    base = datetime(2024, 1, 1)
+    data: dict[str, CandleFrame] = {}
+    for idx in range(200):
+        price = rng.uniform(1_000, 50_000)
+        series = []
+        for day in range(rng.choice([5, 12, 30])):
+            price = max(round(price * (1 + rng.gauss(0, 0.03))), 1)
+            series.append(_make_candle(f"P{idx:03d}", base, day, price, rng.choice([1000.0, 2000.0])))
+        data[f"P{idx:03d}"] = CandleFrame.from_candles(series)
+
+    single = StrategyV5(StrategySettings())
+    pooled = StrategyV5(StrategySettings(workers=2, parallel_min_symbols=0))
+    try:
+        for top_n in (1, 7, len(data)):
+            expected = single.screen_candidates(data, top_n)
+            actual = pooled.screen_candidates(data, top_n)
+            assert [(s.symbol, s.score, s.reasons) for s in actual] == [
+                (s.symbol, s.score, s.reasons) for s in expected
+            ]
+    finally:
+        pooled.close()
+
+
+def test_process_pool_is_created_once_for_concurrent_scans(monkeypatch):
+    created = []
+
+    class CountingPool(parallel.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            created.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(parallel, "ProcessPoolExecutor", CountingPool)
+    base = datetime(2024, 1, 1)
+    data = {
+        f"Q{idx:02d}": [_make_candle(f"Q{idx:02d}", base, day, 1000.0 + idx * day, 1000.0) for day in range(25)]
+        for idx in range(40)
+    }
+    strategy = StrategyV5(StrategySettings(workers=2, parallel_min_symbols=0))
+    try:
+        with ThreadPoolExecutor(max_workers=4) as threads:
+            results = list(threads.map(lambda _: strategy.screen_candidates(data, 5), range(4)))
+    finally:
+        strategy.close()
+    assert len(created) == 1 and all(result == results[0] for result in results)
+
+
+def test_exact_pstdev_handles_extreme_values_without_warnings():
+    values = np.array([[1e200, -1e200, 3e305], [1.0, 2.0, 3.0], [1e-300, 0.0, 5e-324]])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = exact_pstdev(values)
+    assert result.tolist() == [statistics.pstdev(row) for row in values.tolist()]
+
+
+def test_exact_pstdev_matches_near_underflow():
+    rng = np.random.default_rng(7)
+    values = rng.uniform(0.5, 2.0, size=(200, 20)) * 10.0 ** rng.integers(-156, -152, size=(200, 1))
+    assert exact_pstdev(values).tolist() == [statistics.pstdev(row) for row in values.tolist()]
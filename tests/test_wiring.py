@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from api.deps import DEFAULT_SYMBOLS, build_dependencies, resolve_universe, run_cli
+from api.deps import DEFAULT_SYMBOLS, build_dependencies, enrich_positions, resolve_universe, run_cli
 from config.schema import AppSettings
+from core.entities import Position
 
 
 def test_wiring_produces_named_signals(tmp_path):
@@ -36,3 +37,43 @@ def test_custom_universe_resolution(tmp_path):
         assert symbols == ["AAA", "BBB"]
     finally:
         storage.close()
+
+
+def test_enrich_positions_commits_holdings_once(tmp_path):
+    settings = AppSettings.model_validate(
+        {"db": {"path": str(tmp_path / "holdings.db")}, "notifier": {"type": "none"}}
+    )
+    storage, market, broker, notifier, strategy, risk = build_dependencies(settings)
+    try:
+        positions = [Position(symbol, 10, 100.0) for symbol in DEFAULT_SYMBOLS[:6]]
+        commits = storage.commits
+        enriched = enrich_positions(positions, market, {}, storage, risk.tracker)
+        assert len(enriched) == 6 and storage.commits == commits + 1
+        stored = {position.symbol: position.last_price for position in storage.get_positions()}
+        assert stored == {position.symbol: position.last_price for position in enriched}
+
+        # 값이 그대로인 행은 다시 쓰지 않는다.
+        assert storage.upsert_positions(enriched, "later") == 0
+        enriched[0].last_price += 1
+        assert storage.upsert_positions(enriched, "later") == 1
+    finally:
+        storage.close()
+
+
+def test_log_retention_runs_once_per_database(tmp_path):
+    settings = AppSettings.model_validate(
+        {"db": {"path": str(tmp_path / "rerun.db")}, "notifier": {"type": "none"}}
+    )
+    first = build_dependencies(settings)
+    second = build_dependencies(settings)
+    try:
+        assert first[0].retention is not None and first[0].retention.running
+        assert second[0].retention is None  # 재실행(Streamlit 등)은 정리 스레드를 새로 띄우지 않는다
+    finally:
+        second[0].close()
+        first[0].close()
+    third = build_dependencies(settings)  # 앞의 저장소가 닫히면 다시 시작한다
+    try:
+        assert third[0].retention is not None and third[0].retention.running
+    finally:
+        third[0].close()